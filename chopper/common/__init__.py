@@ -0,0 +1,7 @@
+import pandas as pd
+
+# Cached frames are handed out as shallow views (see cache._view), which keep
+# callers' writes out of the cache only under copy-on-write: always on from
+# pandas 3, opt-in before
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.options.mode.copy_on_write = True
@@ -1,5 +1,7 @@
+import re
+import numpy as np
 from dataclasses import dataclass
-from pandas import DataFrame, Series
+from pandas import Categorical, CategoricalDtype, DataFrame, Series, factorize
 
 
 @dataclass
@@ -58,6 +60,75 @@ def paper_figsize(paper_mode: PaperMode) -> tuple[float, float]:
     return (width_in, height_in)
 
 
+def per_value(func, *columns: Series) -> tuple[list, np.ndarray]:
+    """Evaluate func once per distinct combination of values across columns.
+
+    Kernel tables repeat a few hundred names millions of times, so rules are
+    run on the distinct values (categories, or factorized uniques for other
+    dtypes) and broadcast back through the codes. Missing values are passed
+    to func as None.
+
+    Args:
+        func: Called as func(*values) for each distinct row of values
+        columns: Equal-length Series
+
+    Returns:
+        (results, inverse): results per distinct combination, and the index
+        into results for every row
+    """
+    codes, uniques = [], []
+    for col in columns:
+        if isinstance(col.dtype, CategoricalDtype):
+            c, u = col.cat.codes.to_numpy(), col.cat.categories
+        else:
+            c, u = factorize(col)
+        # Code -1 (missing) wraps around to the trailing None
+        uniques.append(list(u) + [None])
+        codes.append(np.where(c < 0, len(u), c))
+    dims = [len(u) for u in uniques]
+    flat = np.ravel_multi_index(codes, dims)
+    size = int(np.prod(dims))
+    if len(columns) == 1:
+        # Every category is a candidate; evaluating unused ones is cheap
+        keys, inverse = np.arange(size), flat
+    elif size <= max(len(flat), 1 << 16):
+        # Few possible combinations: find the used ones in O(rows), no sort
+        keys = np.flatnonzero(np.bincount(flat, minlength=size))
+        lookup = np.empty(size, dtype=np.int64)
+        lookup[keys] = np.arange(len(keys))
+        inverse = lookup[flat]
+    else:
+        keys, inverse = np.unique(flat, return_inverse=True)
+    results = [func(*(u[i] for u, i in zip(uniques, idx)))
+               for idx in zip(*(i.tolist() for i in np.unravel_index(keys, dims)))]
+    return results, inverse.reshape(-1)
+
+
+def value_mask(func, *columns: Series) -> Series:
+    """Boolean Series of func(*values) per row, evaluated per distinct value (see per_value)."""
+    results, inverse = per_value(func, *columns)
+    return Series(np.array(results, dtype=bool)[inverse], index=columns[0].index)
+
+
+def value_labels(func, *columns: Series) -> Series:
+    """Categorical Series of func(*values) per row, evaluated per distinct value.
+
+    func returns a label string or None (missing). Categories are sorted, so
+    the labels group and sort like plain strings.
+    """
+    results, inverse = per_value(func, *columns)
+    codes, cats = factorize(np.array(results, dtype=object), sort=True)
+    return Series(Categorical.from_codes(codes[inverse], categories=cats), index=columns[0].index)
+
+
+_FSDP_OVERLAP = re.compile('|'.join((
+    'FSDP::post_backward_reduce',
+    'FSDP::pre_forward',
+    'FSDP::all_gather_copy_out',
+    'FSDP::all_gather',
+)))
+
+
 def no_overlap_mask(df: DataFrame) -> Series:
     """Create a boolean mask for non-overlapping computation kernels.
 
@@ -70,93 +141,182 @@ def no_overlap_mask(df: DataFrame) -> Series:
     Returns:
         Boolean Series where True indicates non-overlapping kernels
     """
-    nccl_mask = df["name"].str.startswith("ncclDevKernel")
-    pattern = '|'.join((
-        'FSDP::post_backward_reduce',
-        'FSDP::pre_forward',
-        'FSDP::all_gather_copy_out',
-        'FSDP::all_gather',
-    ))
-    return ~(
-        df["operator-name"].str.contains(pattern, na=False, regex=True)
-        | nccl_mask
-    )
+    nccl_mask = value_mask(lambda name: name is not None and name.startswith("ncclDevKernel"), df["name"])
+    fsdp_mask = value_mask(lambda op: op is not None and _FSDP_OVERLAP.search(op) is not None, df["operator-name"])
+    return ~(fsdp_mask | nccl_mask)
+
+
+def _chunk(op_name: str | None) -> str | None:
+    if op_name is None:
+        return None
+    if op_name.startswith('opt_') or op_name.startswith('Optimizer.'):
+        return 'opt'
+    if op_name.startswith('b_'):
+        return 'bwd'
+    return 'fwd'
 
 
 def assign_chunks(df: DataFrame) -> DataFrame:
     """Assign training phase chunks (forward, backward, optimizer) to trace events.
 
     Categorizes operators into forward pass, backward pass, or optimizer step
-    based on operator name patterns.
+    based on operator name patterns, evaluated once per distinct name.
 
     Args:
         df: DataFrame containing trace data with 'operator-name' column
 
     Returns:
-        DataFrame with added 'chunk' column containing 'fwd', 'bwd', or 'opt'
+        New DataFrame with added categorical 'chunk' column containing
+        'fwd', 'bwd', or 'opt' (missing where operator-name is); df is left
+        unchanged
+    """
+    return df.assign(chunk=value_labels(_chunk, df['operator-name']))
+
+
+def chunk_mask(df: DataFrame, chunks=None) -> Series:
+    """Boolean mask of the rows whose chunk (see assign_chunks) is in chunks.
+
+    Evaluated per distinct operator name, without adding a 'chunk' column.
+
+    Args:
+        df: DataFrame containing trace data with 'operator-name' column
+        chunks: Chunks to keep ('fwd', 'bwd', 'opt'); None keeps every row
+            that has a chunk
+
+    Returns:
+        Boolean Series aligned with df
+    """
+    if chunks is None:
+        return value_mask(lambda op: _chunk(op) is not None, df['operator-name'])
+    chunks = frozenset(chunks)
+    return value_mask(lambda op: _chunk(op) in chunks, df['operator-name'])
+
+
+def map_names(values: Series, func) -> Series:
+    """Apply func to every non-missing value, once per distinct value.
+
+    A categorical column stays categorical (func is applied to its
+    categories, equal results are merged and the categories stay sorted);
+    any other column keeps its dtype.
+
+    Args:
+        values: String or categorical Series
+        func: str -> str
+
+    Returns:
+        Series of mapped values with the same index
     """
-    opt_mask = (df['operator-name'].str.startswith('opt_', na=False) |
-                df['operator-name'].str.startswith('Optimizer.', na=False))
-    bwd_mask = df['operator-name'].str.startswith('b_', na=False) & ~opt_mask
-    fwd_mask = ~opt_mask & ~bwd_mask & ~df['operator-name'].isna()
+    def mapped(v):
+        return None if v is None else func(v)
+
+    if isinstance(values.dtype, CategoricalDtype):
+        return value_labels(mapped, values).rename(values.name)
+    results, inverse = per_value(mapped, values)
+    return Series(np.array(results, dtype=object)[inverse], index=values.index, name=values.name).astype(values.dtype)
 
-    df.loc[fwd_mask, 'chunk'] = 'fwd'
-    df.loc[bwd_mask, 'chunk'] = 'bwd'
-    df.loc[opt_mask, 'chunk'] = 'opt'
-    return df
+
+def _fix_name(name: str) -> str:
+    if name.startswith('f_b_'):
+        name = name.replace('f_b_', 'b_')
+    if name.endswith('Optimizer.step#AdamW.step'):
+        name = 'opt_step'
+    if '_fc_' in name:
+        name = name.replace('_fc_', '_mlp_')
+    if '_ffn_' in name:
+        name = name.replace('_ffn_', '_mlp_')
+    return name
 
 
 def fix_names(df: DataFrame) -> DataFrame:
     """Normalize operator names for consistent analysis.
 
     Applies name transformations to standardize operator naming conventions,
-    such as removing redundant prefixes and normalizing layer names.
+    such as removing redundant prefixes and normalizing layer names. Each
+    distinct name is rewritten once, and a categorical column stays
+    categorical.
 
     Args:
         df: DataFrame containing trace data with 'operator-name' column
 
     Returns:
-        DataFrame with normalized operator names
+        New DataFrame with normalized operator names; df is left unchanged
     """
-    fix_mask = df['operator-name'].str.startswith('f_b_', na=False)
-    df.loc[fix_mask, 'operator-name'] = df.loc[
-        fix_mask,
-        'operator-name'].str.replace('f_b_', 'b_')
-
-    fix_mask = df['operator-name'].str.endswith(
-        'Optimizer.step#AdamW.step', na=False)
-    df.loc[fix_mask, 'operator-name'] = 'opt_step'
+    return df.assign(**{'operator-name': map_names(df['operator-name'], _fix_name)})
 
-    fix_mask = df['operator-name'].str.contains('_fc_', na=False)
-    df.loc[fix_mask, 'operator-name'] = df.loc[
-        fix_mask,
-        'operator-name'].str.replace('_fc_', '_mlp_')
 
-    fix_mask = df['operator-name'].str.contains('_ffn_', na=False)
-    df.loc[fix_mask, 'operator-name'] = df.loc[
-        fix_mask,
-        'operator-name'].str.replace('_ffn_', '_mlp_')
-    return df
+def _operator_type(op_name: str | None) -> str:
+    if op_name is not None:
+        if op_name.endswith('p') and not op_name.endswith('Optimizer.step#AdamW.step'):
+            return 'GEMM'
+        if op_name.endswith('attn_fa'):
+            return 'FA'
+    return 'Vec'
 
 
 def assign_operator_type(df: DataFrame) -> DataFrame:
     """Categorize operators by computational type.
 
     Classifies operators into GEMM (matrix multiply), FlashAttention, or
-    vectorized operations based on operator name patterns.
+    vectorized operations based on operator name patterns, evaluated once
+    per distinct name.
 
     Args:
         df: DataFrame containing trace data with 'operator-name' column
 
     Returns:
-        DataFrame with added 'operator-type' column containing 'GEMM', 'FA', or 'Vec'
+        New DataFrame with added categorical 'operator-type' column
+        containing 'GEMM', 'FA', or 'Vec'; df is left unchanged
     """
-    gemm_mask = df['operator-name'].str.endswith('p', na=False) & ~(
-        df['operator-name'].str.endswith('Optimizer.step#AdamW.step', na=False))
-    fa_mask = df['operator-name'].str.endswith('attn_fa', na=False)
-    vec_mask = ~(gemm_mask | fa_mask)
-
-    df.loc[gemm_mask, 'operator-type'] = 'GEMM'
-    df.loc[fa_mask, 'operator-type'] = 'FA'
-    df.loc[vec_mask, 'operator-type'] = 'Vec'
-    return df
+    return df.assign(**{'operator-type': value_labels(_operator_type, df['operator-name'])})
+
+
+def _kernel_class(name: str | None) -> str:
+    if name is not None:
+        if 'nccl' in name.lower():
+            return 'nccl'
+        if 'Cijk' in name:
+            return 'gemm'
+    return 'other'
+
+
+def kernel_classes(names: Series) -> Series:
+    """Categorize kernels as GEMM, NCCL or other by kernel name.
+
+    NCCL kernels are matched case-insensitively and win over GEMM (Tensile
+    'Cijk') kernels. Evaluated once per distinct name.
+
+    Args:
+        names: Kernel names, e.g. a trace's 'name' column
+
+    Returns:
+        Categorical Series aligned with names, containing 'gemm', 'nccl'
+        or 'other'
+    """
+    return value_labels(_kernel_class, names)
+
+
+def operator_mask(df: DataFrame, names=None, types=None, fixed: bool = False) -> Series:
+    """Boolean mask of the rows of the given operators or operator types.
+
+    Evaluated per distinct operator name, without adding columns.
+
+    Args:
+        df: DataFrame containing trace data with 'operator-name' column
+        names: Operator names to keep (None: any)
+        types: Operator types to keep (see assign_operator_type; None: any)
+        fixed: Match names as fix_names would rewrite them
+
+    Returns:
+        Boolean Series aligned with df
+    """
+    names = None if names is None else frozenset(names)
+    types = None if types is None else frozenset(types)
+
+    def keep(op):
+        if types is not None and _operator_type(op) not in types:
+            return False
+        if names is not None:
+            return op is not None and (_fix_name(op) if fixed else op) in names
+        return True
+
+    return value_mask(keep, df['operator-name'])
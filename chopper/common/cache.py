@@ -1,29 +1,500 @@
-"""Shared cache for loaded data files."""
+"""Shared cache for loaded data files.
 
+Loaded tables live in one LRU cache with a memory budget (see set_budget).
+Every entry remembers the size and mtime of the file it came from and is
+dropped when the file changes, so a rewritten trace is reloaded rather than
+served stale. Hit, miss and eviction counts are available from cache_stats.
+
+Frames derived from a file (see memoize) share the cache, and can also be
+kept on disk across sessions (see set_disk_cache).
+"""
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
 import pandas as pd
-from typing import Dict
+import psutil
+from collections import OrderedDict
+from dataclasses import dataclass
+from loguru import logger
+from typing import Any, Callable, Hashable, List, Optional
+
+from chopper.common.index import TraceIndex, index_path
+from chopper.common.sampling import preview
+from chopper.common.store import INDEX, META, is_store, read_store
+
+# Default budget: a quarter of physical memory, or CHOPPER_CACHE_MB
+_DEFAULT_BUDGET = int(os.environ.get('CHOPPER_CACHE_MB', 0)) << 20 or psutil.virtual_memory().total // 4
+
+# Bump when a memoized function's output changes, to retire disk entries
+DERIVED_VERSION = 2
+
+
+@dataclass
+class CacheStats:
+    """Counters and occupancy of the cache.
+
+    Attributes:
+        hits: Lookups served from the cache
+        misses: Lookups that loaded the file
+        evictions: Entries dropped to stay within the budget
+        invalidations: Entries dropped because their file changed
+        entries: Entries currently cached
+        nbytes: Memory held by the cached entries
+        budget: Memory budget in bytes
+    """
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    nbytes: int = 0
+    budget: int = 0
+
+    def __str__(self) -> str:
+        return (f"cache: {self.entries} entries, {self.nbytes / 2**30:.2f}/{self.budget / 2**30:.1f} GiB, "
+                f"{self.hits} hits, {self.misses} misses, {self.evictions} evicted, "
+                f"{self.invalidations} invalidated")
+
+
+def _stamp(path: str) -> tuple:
+    """(size, mtime) of a file, or of a column store's metadata file."""
+    st = os.stat(os.path.join(path, META) if is_store(path) else path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _mapped(a: Any) -> bool:
+    """True if the array's memory belongs to a memory-mapped file."""
+    while a is not None:
+        if isinstance(a, np.memmap):
+            return True
+        a = getattr(a, 'base', None)
+    return False
+
+
+def _buffers(value: Any) -> List[np.ndarray]:
+    """The numpy buffers of a DataFrame, extension array or ndarray."""
+    if isinstance(value, pd.DataFrame):
+        return [b for col in value.columns for b in _buffers(value[col].array)]
+    if isinstance(value, pd.Categorical):
+        return [value.codes, *_buffers(value.categories.array)]
+    if isinstance(value, pd.arrays.IntegerArray):
+        return [value._data, value._mask]
+    if isinstance(value, pd.arrays.NumpyExtensionArray):
+        return [value.to_numpy()]
+    if isinstance(value, np.ndarray):
+        return [value]
+    if isinstance(value, TraceIndex):
+        return list(vars(value).values())
+    if isinstance(value, tuple):
+        return [b for v in value for b in _buffers(v)]
+    return []
+
+
+def nbytes(value: Any) -> int:
+    """Memory held by a cached value, not counting memory-mapped data.
+
+    Mapped columns live in the page cache, which the OS can reclaim, so they
+    do not count against the budget. Other arrays count their buffers, and
+    string columns (object or str, not categorical) their characters too.
+    Dicts, lists and tuples, such as the device-merged pickles, count their
+    values.
+    """
+    if isinstance(value, dict):
+        return sum(nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(nbytes(v) for v in value)
+    if isinstance(value, pd.DataFrame) and not any(_mapped(b) for b in _buffers(value)):
+        size = value.memory_usage(index=True, deep=False).sum()
+        strings = value.select_dtypes(include=['object', 'string'])
+        if len(strings.columns):
+            size += (strings.memory_usage(index=False, deep=True).sum()
+                     - strings.memory_usage(index=False, deep=False).sum())
+        return int(size)
+    return sum(b.nbytes for b in _buffers(value) if not _mapped(b))
+
+
+def _view(value: Any) -> Any:
+    """A frame sharing the cached frame's data but not the object itself.
+
+    With pandas copy-on-write (enabled by chopper.common before pandas 3),
+    writes to the view (new or replaced columns, .loc assignments) copy
+    only the affected columns and never reach the cached frame, so callers
+    cannot corrupt the cache and need no defensive .copy().
+    """
+    if isinstance(value, tuple):
+        return tuple(_view(v) for v in value)
+    return value.copy(deep=False) if isinstance(value, pd.DataFrame) else value
+
+
+class LRUCache:
+    """Least recently used cache of loaded files, bounded in bytes.
+
+    Each entry is keyed by a tuple whose first element is the source path
+    and holds the path's (size, mtime) at load time. The most recently used
+    entry is always kept, even if it alone exceeds the budget. Cached frames
+    are handed out as views that cannot write back (see _view).
+    """
 
-# Global cache for pickle files
-_pickle_cache: Dict[str, pd.DataFrame] = {}
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.entries: OrderedDict[Hashable, tuple] = OrderedDict()
+        self.stats = CacheStats(budget=budget)
+        self.lock = threading.RLock()
 
+    def get(self, key: tuple, load: Callable[[tuple], Any]) -> Any:
+        """Cached value for key, calling load(stamp) on a miss or a changed file."""
+        stamp = _stamp(key[0])
+        with self.lock:
+            if key in self.entries:
+                value, size, old = self.entries[key]
+                if old == stamp:
+                    self.entries.move_to_end(key)
+                    self.stats.hits += 1
+                    return _view(value)
+                logger.debug(f"{key[0]} changed on disk, reloading")
+                self._drop(key)
+                self.stats.invalidations += 1
+            self.stats.misses += 1
+        value = load(stamp)
+        size = nbytes(value)
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (value, size, stamp)
+            self.stats.entries += 1
+            self.stats.nbytes += size
+            self._shrink()
+        return _view(value)
 
-def load_pickle(path: str) -> pd.DataFrame:
+    def _drop(self, key: Hashable) -> None:
+        _, size, _ = self.entries.pop(key)
+        self.stats.entries -= 1
+        self.stats.nbytes -= size
+
+    def _shrink(self) -> None:
+        # Memory-mapped entries hold no budgeted memory, so they stay
+        victims = [k for k, (_, size, _) in list(self.entries.items())[:-1] if size]
+        for key in victims:
+            if self.stats.nbytes <= self.budget:
+                break
+            logger.debug(f"evicting {key} from the cache")
+            self._drop(key)
+            self.stats.evictions += 1
+
+    def resize(self, budget: int) -> None:
+        with self.lock:
+            self.budget = self.stats.budget = budget
+            self._shrink()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.stats = CacheStats(budget=self.budget)
+
+
+# Global cache for pickle files, column store mappings, indexes and derived frames
+_cache = LRUCache(_DEFAULT_BUDGET)
+
+# Directory for memoized results kept across sessions (None: memory only)
+_disk_dir: Optional[str] = os.environ.get('CHOPPER_DISK_CACHE')
+
+# Size bound of that directory: 4 GiB, or CHOPPER_DISK_CACHE_MB
+_disk_budget = int(os.environ.get('CHOPPER_DISK_CACHE_MB', 0)) << 20 or 4 << 30
+
+
+def load_pickle(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
     """Load a pickle file with caching.
 
-    If the file has been loaded before, returns the cached version.
-    Otherwise loads the file, caches it, and returns it.
+    If the file has been loaded before and not changed since, returns the
+    cached version. Otherwise loads the file, caches it, and returns it. A
+    column store directory (see chopper.common.store) is read from its
+    memory-mapped columns in ts order (see load_rows): only the mapping is
+    cached, and each call copies out the columns it returns.
 
     Args:
-        path: Path to pickle file
+        path: Path to pickle file or column store
+        columns: Columns to return (default: all)
 
     Returns:
         Loaded DataFrame
     """
-    if path not in _pickle_cache:
-        _pickle_cache[path] = pd.read_pickle(path)
-    return _pickle_cache[path]
+    if is_store(path):
+        return load_rows(path, columns=columns)
+    df = _cache.get((path,), lambda _: pd.read_pickle(path))
+    return df if columns is None else df[list(columns)]
+
+
+def load_mapped(path: str) -> pd.DataFrame:
+    """Memory-map a column store with caching.
+
+    Opening costs only the store metadata: columns are backed by the page
+    cache and shared with other processes mapping the same store. The frame
+    is read-only and in store order (see chopper.common.store.read_store).
+
+    Args:
+        path: Path to column store
+
+    Returns:
+        DataFrame backed by the mapped column files
+    """
+    assert is_store(path), f"{path} is not a column store; write one with merge -o <dir>"
+    return _cache.get((path, 'mmap'), lambda _: read_store(path, mmap=True))
+
+
+def load_rows(
+    path: str,
+    rows: Optional[np.ndarray] = None,
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """Rows of a column store copied out of its mapping, in ts order.
+
+    Only the given rows of the given columns are copied; the mapping (see
+    load_mapped) and the ts order of the whole store are what is cached.
+    Rows come out as read_store returns them: stably ts-sorted, so equal
+    timestamps keep store order.
+
+    Args:
+        path: Path to column store
+        rows: Ascending store positions to read (default: all)
+        columns: Columns to read (default: all)
+
+    Returns:
+        DataFrame with a fresh RangeIndex
+    """
+    mapped = load_mapped(path)
+    ts = mapped['ts'].to_numpy()
+    if rows is None:
+        rows = _cache.get((path, 'ts-order'), lambda _: np.argsort(ts, kind='stable'))
+    else:
+        rows = rows[np.argsort(ts[rows], kind='stable')]
+    df = mapped if columns is None else mapped[list(columns)]
+    return df.take(rows).reset_index(drop=True)
+
+
+def load_index(path: str) -> Optional[TraceIndex]:
+    """Memory-map the TraceIndex written with a kernel table, with caching.
+
+    Row numbers index the table as load_pickle returns it for a pickle, and
+    in store order (as load_mapped returns it) for a column store.
+
+    Args:
+        path: Path to pickle file or column store
+
+    Returns:
+        The index, or None if the table has none or it is out of date
+    """
+    if is_store(path):
+        return _cache.get((path, 'index'), lambda _: TraceIndex.load(os.path.join(path, INDEX)))
+    return _cache.get((path, 'index'), lambda _: TraceIndex.load(index_path(path), table=path))
+
+
+def _normalize(value: Any) -> Hashable:
+    """Hashable form of an argument; lists and tuples compare equal."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(v) for v in value)
+    if isinstance(value, dict):
+        # Key order is kept: it decides e.g. the order of aggregated columns
+        return tuple((k, _normalize(v)) for k, v in value.items())
+    return value
+
+
+def _disk_path(func: Callable, path: str, stamp: tuple, key: tuple) -> str:
+    """Where memoize keeps func's result for key on disk.
+
+    The name is <func>-<file>-<stamp>-<key> hashes, so the results of a file
+    under an older stamp or DERIVED_VERSION can be found and removed.
+    """
+    def digest(value):
+        return hashlib.sha1(repr(value).encode()).hexdigest()[:16]
+
+    source = os.path.abspath(path)
+    name = f'{func.__name__}-{digest(source)}-{digest((DERIVED_VERSION, stamp))}-{digest((source, key))}.pkl'
+    return os.path.join(_disk_dir, name)
+
+
+def _disk_load(path: str, compute: Callable[[], Any]) -> Any:
+    """Read a pickled result from path, or compute and write it there.
+
+    Reads touch the file, so pruning drops the least recently used results
+    first (see _prune_disk).
+    """
+    try:
+        with open(path, 'rb') as f:
+            value = pickle.load(f)
+            _touch(f.fileno())
+        return value
+    except FileNotFoundError:
+        pass
+    value = compute()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.partial-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            _touch(f.fileno())
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"could not write {path}: {e}")
+        os.unlink(tmp)
+        return value
+    _prune_disk(os.path.dirname(path), path)
+    return value
+
+
+def _touch(fd: int) -> None:
+    """Mark a disk cache file as used now.
+
+    The time is set explicitly: file systems may stamp writes only at a
+    coarse tick, which would leave recent results tied.
+    """
+    now = time.time_ns()
+    os.utime(fd, ns=(now, now))
+
+
+def _prune_disk(directory: str, keep: Optional[str] = None) -> None:
+    """Bound the disk cache: drop stale results, then the least recently used.
+
+    A result written for a file whose stamp has since changed (keep's file,
+    under another stamp or DERIVED_VERSION) can never be read again. The
+    rest go oldest read first until the directory fits the disk budget.
+
+    Args:
+        directory: Disk cache directory
+        keep: Result just written, which stays
+    """
+    _, source, stamp, _ = os.path.basename(keep).split('-') if keep else (None,) * 4
+    entries, total = [], 0
+    with os.scandir(directory) as it:
+        for entry in it:
+            if not entry.name.endswith('.pkl') or entry.path == keep:
+                continue
+            parts = entry.name[:-len('.pkl')].split('-')
+            if len(parts) == 4 and parts[1] == source and parts[2] != stamp:
+                _remove(entry.path)
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                # Pruned by another process (e.g. a pool worker)
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, entry.path))
+            total += st.st_size
+    if keep is not None and os.path.exists(keep):
+        total += os.path.getsize(keep)
+    for _, size, victim in sorted(entries):
+        if total <= _disk_budget:
+            break
+        _remove(victim)
+        total -= size
+
+
+def _remove(path: str) -> None:
+    """Delete a disk cache file that another process may have removed already."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def memoize(func: Optional[Callable] = None, *, disk: bool = True) -> Callable:
+    """Cache func's results by the identity of its file and its arguments.
+
+    func's first parameter is the data file. Arguments are normalized before
+    they form the key, so defaults, positional and keyword spellings, lists
+    and tuples, and an empty iter_idxs all hit the same entry. Results live
+    in the LRU cache, are dropped when the file changes, and are handed out
+    as views (see _view). With a disk cache set, they are also pickled
+    there, keyed by the file's size and mtime as well.
+
+    Previews (a preview set, or passed as a 'preview' argument; see
+    chopper.common.sampling) are computed afresh and not cached.
+
+    Args:
+        func: Function to memoize; without it, returns a decorator
+        disk: Keep results in the disk cache too. Intermediate frames that
+            the derived ones are computed from stay in memory only.
+    """
+    if func is None:
+        return functools.partial(memoize, disk=disk)
+    sig = inspect.signature(func)
+    file_arg = next(iter(sig.parameters))
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = sig.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        path = arguments.pop(file_arg)
+        if not arguments.get('iter_idxs', True):
+            arguments['iter_idxs'] = None
+        if preview() is not None or arguments.get('preview') is not None:
+            return func(*bound.args, **bound.kwargs)
+        key = (path, func.__qualname__, _normalize(arguments))
+
+        def load(stamp):
+            if _disk_dir is None or not disk:
+                return func(*bound.args, **bound.kwargs)
+            return _disk_load(_disk_path(func, path, stamp, key[1:]), lambda: func(*bound.args, **bound.kwargs))
+
+        return _cache.get(key, load)
+
+    return wrapper
+
+
+def set_disk_cache(directory: Optional[str], budget: Optional[int] = None) -> None:
+    """Also keep memoized results as pickles under directory (None: stop).
+
+    The disk cache is off unless set here (or by CHOPPER_DISK_CACHE).
+
+    Args:
+        directory: Cache directory, created on the first write
+        budget: Bytes the directory may hold (default: unchanged; 4 GiB,
+            or CHOPPER_DISK_CACHE_MB, to begin with)
+    """
+    global _disk_dir, _disk_budget
+    _disk_dir = directory
+    if budget is not None:
+        _disk_budget = budget
+    if directory is not None and os.path.isdir(directory):
+        _prune_disk(directory)
+
+
+def disk_cache() -> Optional[str]:
+    """Directory of the disk cache, or None if results are kept in memory only."""
+    return _disk_dir
+
+
+def disk_budget() -> int:
+    """Bytes the disk cache may hold."""
+    return _disk_budget
 
 
-def clear_cache():
-    """Clear the pickle cache."""
-    _pickle_cache.clear()
+def set_budget(budget: int) -> None:
+    """Set the cache's memory budget in bytes, evicting entries beyond it."""
+    _cache.resize(budget)
+
+
+def cache_stats() -> CacheStats:
+    """Snapshot of the cache's counters and occupancy."""
+    with _cache.lock:
+        return CacheStats(**vars(_cache.stats))
+
+
+def clear_cache(disk: bool = False):
+    """Clear the cache and its statistics.
+
+    Args:
+        disk: Also delete the memoized results on disk
+    """
+    _cache.clear()
+    if disk and _disk_dir is not None:
+        shutil.rmtree(_disk_dir, ignore_errors=True)
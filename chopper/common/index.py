@@ -0,0 +1,253 @@
+"""Row indexes over merged kernel tables.
+
+Two lookups come up in every analysis: the rows of some (gpu, iteration)
+pairs, and the kernels of one GPU active in a time window. TraceIndex answers
+both with binary searches over small sorted arrays instead of scanning the
+table. merge persists one next to every table it writes (inside a column
+store, or as a <table>.index directory beside a pickle).
+"""
+
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, fields
+from typing import Optional, Sequence
+
+from chopper.common.intervals import sorted_overlap
+
+INDEX_VERSION = 3
+
+# Partition key for a missing gpu or iteration
+NONE = -1
+
+
+def partition_keys(df: pd.DataFrame, col: str) -> np.ndarray:
+    """Integer partition key per row, NONE where the column is missing."""
+    if col not in df.columns:
+        return np.full(len(df), NONE, dtype=np.int64)
+    values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.where(np.isnan(values), NONE, values).astype(np.int64)
+
+
+def partition(df: pd.DataFrame) -> tuple[np.ndarray, dict]:
+    """Group the rows of df by (gpu, iteration), ts-sorted within each group.
+
+    Returns:
+        (order, partitions): the rows in partition order, and per-partition
+        arrays gpu, iteration, start, stop (a range of order) and ts_first
+    """
+    gpu, iteration = partition_keys(df, 'gpu'), partition_keys(df, 'iteration')
+    ts = df['ts'].to_numpy()
+    order = np.lexsort((ts, iteration, gpu))
+    gpu, iteration, ts = gpu[order], iteration[order], ts[order]
+    new = np.ones(len(df), dtype=bool)
+    new[1:] = (gpu[1:] != gpu[:-1]) | (iteration[1:] != iteration[:-1])
+    starts = np.flatnonzero(new)
+    stops = np.append(starts[1:], len(df)) if len(df) else starts
+    return order, {
+        'gpu': gpu[starts],
+        'iteration': iteration[starts],
+        'start': starts,
+        'stop': stops,
+        'ts_first': ts[starts],
+    }
+
+
+def iteration_order(partitions: dict) -> np.ndarray:
+    """Iteration numbers in order of first appearance in ts, like select_iters."""
+    it = partitions['iteration']
+    numbered = it != NONE
+    uniq, inv = np.unique(it[numbered], return_inverse=True)
+    first = np.full(len(uniq), np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first, inv, partitions['ts_first'][numbered])
+    return uniq[np.argsort(first, kind='stable')]
+
+
+def select_rows(
+    partitions: dict,
+    gpus: Optional[Sequence[int]] = None,
+    iterations: Optional[Sequence[int]] = None,
+    iter_idxs: Optional[Sequence[int]] = None,
+) -> Optional[np.ndarray]:
+    """Positions of the partitions matching the predicates, or None for all.
+
+    Args:
+        partitions: Partition table from partition
+        gpus: GPU ids to keep
+        iterations: Iteration numbers to keep
+        iter_idxs: Iteration positions to keep (see iteration_order)
+    """
+    if gpus is None and iterations is None and not iter_idxs:
+        return None
+    keep = np.ones(len(partitions['start']), dtype=bool)
+    if gpus is not None:
+        keep &= np.isin(partitions['gpu'], list(gpus))
+    if iterations is not None:
+        keep &= np.isin(partitions['iteration'], list(iterations))
+    if iter_idxs:
+        order = iteration_order(partitions)
+        keep &= np.isin(partitions['iteration'], [order[i] for i in iter_idxs])
+    starts, stops = partitions['start'][keep], partitions['stop'][keep]
+    lengths = stops - starts
+    # Concatenated aranges: each row's offset within its partition plus the start
+    offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return np.arange(lengths.sum(), dtype=np.int64) + offsets
+
+
+@dataclass
+class TraceIndex:
+    """Iteration row ranges and per-GPU interval index of a kernel table.
+
+    Attributes:
+        order: Table rows grouped by (gpu, iteration), ts-sorted within each
+        part_gpu, part_iteration, part_start, part_stop, part_ts_first:
+            Partition table over order (see partition)
+        by_ts: Table rows sorted by (gpu, ts)
+        gpu_ids, gpu_start, gpu_stop: Range of by_ts holding each GPU
+        start, end: Kernel start and end (ts + dur) of by_ts rows
+        reach: Running max of end within each GPU, so the kernels that can
+            still be active at t start where reach first exceeds t
+    """
+    order: np.ndarray
+    part_gpu: np.ndarray
+    part_iteration: np.ndarray
+    part_start: np.ndarray
+    part_stop: np.ndarray
+    part_ts_first: np.ndarray
+    by_ts: np.ndarray
+    gpu_ids: np.ndarray
+    gpu_start: np.ndarray
+    gpu_stop: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    reach: np.ndarray
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> 'TraceIndex':
+        """Index a kernel table with ts and dur (and usually gpu, iteration) columns."""
+        order, parts = partition(df)
+        gpu = partition_keys(df, 'gpu')
+        ts = df['ts'].to_numpy()
+        end = ts + df['dur'].to_numpy()
+        by_ts = np.lexsort((ts, gpu))
+        gpu_ids, gpu_start = np.unique(gpu[by_ts], return_index=True)
+        gpu_stop = np.append(gpu_start[1:], len(df))
+        start, end = ts[by_ts], end[by_ts]
+        reach = end.copy()
+        for lo, hi in zip(gpu_start.tolist(), gpu_stop.tolist()):
+            np.maximum.accumulate(reach[lo:hi], out=reach[lo:hi])
+        return cls(order, *(parts[k] for k in ('gpu', 'iteration', 'start', 'stop', 'ts_first')),
+                   by_ts, gpu_ids, gpu_start, gpu_stop, start, end, reach)
+
+    @property
+    def partitions(self) -> dict:
+        return {
+            'gpu': self.part_gpu,
+            'iteration': self.part_iteration,
+            'start': self.part_start,
+            'stop': self.part_stop,
+            'ts_first': self.part_ts_first,
+        }
+
+    def iteration_rows(
+        self,
+        gpus: Optional[Sequence[int]] = None,
+        iterations: Optional[Sequence[int]] = None,
+        iter_idxs: Optional[Sequence[int]] = None,
+    ) -> np.ndarray:
+        """Sorted table rows of the matching (gpu, iteration) partitions.
+
+        Args:
+            gpus: GPU ids to keep
+            iterations: Iteration numbers to keep
+            iter_idxs: Iteration positions to keep, as in load.select_iters
+        """
+        pos = select_rows(self.partitions, gpus, iterations, iter_idxs)
+        return np.sort(self.order if pos is None else self.order[pos])
+
+    def _gpu_range(self, gpu: int) -> tuple[int, int]:
+        """Range of by_ts holding gpu's kernels (empty if it has none)."""
+        g = int(np.searchsorted(self.gpu_ids, gpu))
+        if g == len(self.gpu_ids) or self.gpu_ids[g] != gpu:
+            return 0, 0
+        return int(self.gpu_start[g]), int(self.gpu_stop[g])
+
+    def active_rows(self, gpu: int, t0: int, t1: int) -> np.ndarray:
+        """Table rows of the kernels on gpu overlapping [t0, t1], by start time.
+
+        Two binary searches bound the candidates: kernels starting after t1
+        are past the end of the ts-sorted run, and those before the first
+        reach >= t0 all ended before t0. Only the candidates are then checked.
+        """
+        lo, hi = self._gpu_range(gpu)
+        hi = lo + int(np.searchsorted(self.start[lo:hi], t1, side='right'))
+        lo = lo + int(np.searchsorted(self.reach[lo:hi], t0, side='left'))
+        return self.by_ts[lo:hi][self.end[lo:hi] >= t0]
+
+    def active_at(self, gpu: int, times: np.ndarray) -> np.ndarray:
+        """Whether some kernel on gpu is running at each time (ends inclusive).
+
+        A time is covered iff the kernels starting at or before it reach it,
+        so each costs one binary search.
+        """
+        lo, hi = self._gpu_range(gpu)
+        times = np.asarray(times)
+        if lo == hi:
+            return np.zeros(len(times), dtype=bool)
+        k = np.searchsorted(self.start[lo:hi], times, side='right')
+        return (k > 0) & (self.reach[lo:hi][np.maximum(k - 1, 0)] >= times)
+
+    def overlap(self, gpu: int, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Length of each [start, end] covered by the union of gpu's kernels.
+
+        See intervals.sorted_overlap; the sorted starts and reach it needs
+        are already in the index.
+        """
+        lo, hi = self._gpu_range(gpu)
+        return sorted_overlap(self.start[lo:hi], self.reach[lo:hi], starts, ends)
+
+    def save(self, path: str, table: Optional[str] = None) -> None:
+        """Write the index as a directory of .npy files.
+
+        Args:
+            path: Index directory, replaced if it exists
+            table: Indexed file, whose size and mtime are recorded so a
+                rewritten table does not pick up a stale index
+        """
+        parent = os.path.dirname(os.path.abspath(path))
+        scratch = tempfile.mkdtemp(dir=parent, prefix='.partial-')
+        try:
+            for f in fields(self):
+                np.save(os.path.join(scratch, f'{f.name}.npy'), getattr(self, f.name))
+            np.save(os.path.join(scratch, 'version.npy'),
+                    np.array([INDEX_VERSION, *_stat(table)], dtype=np.int64))
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            os.rename(scratch, path)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str, table: Optional[str] = None) -> Optional['TraceIndex']:
+        """Memory-map an index written by save, or None if missing or stale."""
+        try:
+            version = np.load(os.path.join(path, 'version.npy')).tolist()
+        except FileNotFoundError:
+            return None
+        if version != [INDEX_VERSION, *_stat(table)]:
+            return None
+        return cls(**{f.name: np.load(os.path.join(path, f'{f.name}.npy'), mmap_mode='r') for f in fields(cls)})
+
+
+def _stat(table: Optional[str]) -> list:
+    if table is None:
+        return []
+    st = os.stat(table)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def index_path(table: str) -> str:
+    """Where the index of a pickled table lives."""
+    return f'{table}.index'
@@ -0,0 +1,139 @@
+"""Interval queries shared by trace merging and analysis."""
+
+import heapq
+import numpy as np
+
+
+def innermost(points, starts, ends) -> np.ndarray:
+    """Index of the shortest [start, end] range containing each point.
+
+    Ties in length go to the later range; points outside every range get -1.
+    Ranges may nest or partially overlap arbitrarily.
+
+    A sweep over the 2R range endpoints, with a heap of active ranges keyed by
+    length, turns the ranges into a piecewise-constant "innermost range"
+    function. Points are then resolved with one binary search each, for
+    O((N + R) log R) total instead of overwriting every covered point.
+
+    Args:
+        points: N query timestamps
+        starts: R range starts (inclusive)
+        ends: R range ends (inclusive)
+
+    Returns:
+        int64 array of range indices, -1 where no range contains the point
+    """
+    points = np.asarray(points)
+    starts = np.asarray(starts)
+    ends = np.asarray(ends)
+    out = np.full(len(points), -1, dtype=np.int64)
+    if len(points) == 0 or len(starts) == 0:
+        return out
+
+    lengths = ends - starts
+    # Work with half-open [start, stop) so a range is dead at its stop
+    if np.issubdtype(ends.dtype, np.integer) and np.issubdtype(points.dtype, np.integer):
+        stops = ends + 1
+    else:
+        starts = starts.astype(float)
+        stops = np.nextafter(ends.astype(float), np.inf)
+
+    order = np.flatnonzero(stops > starts)
+    order = order[np.argsort(starts[order], kind='stable')]
+    bounds = np.unique(np.concatenate([starts[order], stops[order]]))
+
+    # Ranges are pushed in start order, a bound at a time
+    n_starting = np.bincount(np.searchsorted(bounds, starts[order]), minlength=len(bounds))
+    entries = list(zip(lengths[order].tolist(), (-order).tolist(), stops[order].tolist()))
+    labels = []
+    active: list = []
+    push, pop = heapq.heappush, heapq.heappop
+    j = 0
+    for b, n in zip(bounds.tolist(), n_starting.tolist()):
+        for _ in range(n):
+            push(active, entries[j])
+            j += 1
+        # Lazily drop ranges that ended; only the top has to be alive
+        while active and active[0][2] <= b:
+            pop(active)
+        labels.append(-active[0][1] if active else -1)
+
+    seg = np.searchsorted(bounds, points, side='right') - 1
+    hit = seg >= 0
+    out[hit] = np.asarray(labels, dtype=np.int64)[seg[hit]]
+    return out
+
+
+def union_overlap(starts, ends, groups, other_starts, other_ends, other_groups) -> np.ndarray:
+    """Length of each [start, end] covered by the union of the other ranges.
+
+    Only other ranges of the same group count (e.g. the communication
+    kernels of the same GPU), and time covered by several of them counts
+    once. Per group, the other ranges are sorted once and merged into
+    disjoint runs with a running max of their ends; a prefix sum of run
+    lengths then gives the covered time before any t with one binary
+    search, so each query costs O(log R) instead of a scan of every range.
+
+    Args:
+        starts, ends: N query ranges
+        groups: N group keys of the queries
+        other_starts, other_ends: R ranges to overlap with
+        other_groups: R group keys of those ranges
+
+    Returns:
+        Array of N overlap lengths, 0 for queries with no overlap
+    """
+    starts, ends, groups = np.asarray(starts), np.asarray(ends), np.asarray(groups)
+    other_starts, other_ends = np.asarray(other_starts), np.asarray(other_ends)
+    other_groups = np.asarray(other_groups)
+    out = np.zeros(len(starts), dtype=np.result_type(starts, ends, other_starts, other_ends))
+    if len(starts) == 0 or len(other_starts) == 0:
+        return out
+
+    order = np.lexsort((other_starts, other_groups))
+    o_starts, o_ends, o_groups = other_starts[order], other_ends[order], other_groups[order]
+    keys, lo = np.unique(o_groups, return_index=True)
+    hi = np.append(lo[1:], len(order))
+    q_order = np.argsort(groups, kind='stable')
+    q_groups = groups[q_order]
+
+    for key, a, b in zip(keys.tolist(), lo.tolist(), hi.tolist()):
+        q = q_order[np.searchsorted(q_groups, key, 'left'):np.searchsorted(q_groups, key, 'right')]
+        if len(q) == 0:
+            continue
+        out[q] = sorted_overlap(o_starts[a:b], np.maximum.accumulate(o_ends[a:b]), starts[q], ends[q])
+    return out
+
+
+def sorted_overlap(other_starts, reach, starts, ends) -> np.ndarray:
+    """Length of each [start, end] covered by the union of sorted ranges.
+
+    The ranges come as their ascending starts and the running max of their
+    ends (reach), as union_overlap and TraceIndex keep them. They merge into
+    disjoint runs wherever a range begins after reach; a prefix sum of run
+    lengths then gives the covered time before any t with one binary search.
+
+    Args:
+        other_starts: R range starts, ascending
+        reach: Running max of the R range ends
+        starts, ends: N query ranges
+
+    Returns:
+        Array of N overlap lengths
+    """
+    s, reach = np.asarray(other_starts), np.asarray(reach)
+    starts, ends = np.asarray(starts), np.asarray(ends)
+    if len(s) == 0:
+        return np.zeros(len(starts), dtype=np.result_type(starts, ends, s, reach))
+    # A run starts where a range begins after everything before it ended
+    first = np.flatnonzero(np.r_[True, s[1:] > reach[:-1]])
+    run_starts = s[first]
+    run_ends = reach[np.r_[first[1:] - 1, len(s) - 1]]
+    covered = np.r_[0, np.cumsum(run_ends - run_starts)]
+
+    def covered_before(t):
+        k = np.searchsorted(run_starts, t, side='right')
+        tail = np.maximum(run_ends[np.maximum(k - 1, 0)] - t, 0)
+        return covered[k] - np.where(k > 0, tail, 0)
+
+    return np.maximum(covered_before(ends) - covered_before(starts), 0)
@@ -1,15 +1,26 @@
 """Data loading and preprocessing utilities for trace analysis."""
 
+import numpy as np
 import pandas as pd
-from typing import Optional, List, Dict
+from dataclasses import dataclass, fields, replace
+from typing import Any, Callable, Optional, Iterator, List, Dict, Sequence
 
 from chopper.common.annotations import (
+    chunk_mask,
     no_overlap_mask,
+    operator_mask,
     assign_operator_type,
     assign_chunks as do_assign_chunks,
     fix_names as do_fix_names,
 )
-from chopper.common.cache import load_pickle
+from chopper.common.cache import load_index, load_mapped, load_pickle, load_rows, memoize
+from chopper.common.index import NONE, TraceIndex, iteration_order, partition_keys, select_rows
+from chopper.common.parallel import map_partitions, map_tasks, pooled
+from chopper.common.sampling import Preview, Sample, record_sample, sample_kernels, select
+from chopper.common.sampling import preview as current_preview
+from chopper.common.store import is_store, iter_store, read_meta
+
+MEMCPY = 'Memcpy HtoD (Host -> Device)'
 
 
 def select_iters(df: pd.DataFrame, iters: List) -> pd.DataFrame:
@@ -27,6 +38,61 @@ def select_iters(df: pd.DataFrame, iters: List) -> pd.DataFrame:
     return df[df['iteration'].isin(iters)]
 
 
+def load_configs(
+    load: Callable[..., Any],
+    files: Sequence[str],
+    configs: Sequence[str],
+    *args: Any,
+) -> Dict[str, Any]:
+    """Load and preprocess several configs concurrently.
+
+    Plots compare configs that load independently, so each config's
+    load(file, *args) runs in its own worker process instead of one after
+    another (see parallel.map_tasks; parallel.set_workers(0) turns the
+    pool off).
+
+    Args:
+        load: Module-level function taking a file path (e.g. get_overlap_df,
+            or a plot's per-config loader); its result must be picklable
+        files: Trace file per config
+        configs: Config labels
+        args: Further arguments for load, the same for every config
+
+    Returns:
+        Dict mapping config to load's result, in config order
+    """
+    pairs = list(zip(configs, files))
+    results = map_tasks(load, [(fn, *args) for _, fn in pairs])
+    return {config: result for (config, _), result in zip(pairs, results)}
+
+
+def _needed_columns(
+    columns: List[str],
+    iter_idxs: Optional[List],
+    gpus: Optional[List[int]],
+    group_arr: Optional[List],
+    group_map: Optional[Dict[str, List[str]]],
+    operator_name: bool,
+    available: List[str],
+) -> List[str]:
+    """columns plus the ones get_df reads for its other options.
+
+    Group aggregations that name a column weigh by it, so those are loaded
+    too; derived columns (e.g. 'chunk') are not in the file and are skipped.
+    """
+    needed = list(columns) + ['name', 'layer']
+    if iter_idxs:
+        needed.append('iteration')
+    if gpus is not None:
+        needed.append('gpu')
+    if operator_name:
+        needed.append('operator-name')
+    needed += group_arr or []
+    for metric, aggs in (group_map or {}).items():
+        needed += [metric, *aggs]
+    return [c for c in dict.fromkeys(needed) if c in available]
+
+
 def get_df(
     fn: str,
     iter_idxs: Optional[List] = None,
@@ -38,14 +104,29 @@ def get_df(
     group_arr: Optional[List] = None,
     group_map: Optional[Dict[str, List[str]]] = None,
     sort_value: Optional[str] = None,
+    gpus: Optional[List[int]] = None,
+    columns: Optional[List[str]] = None,
+    chunk_rows: Optional[int] = None,
+    preview: Optional[Preview] = None,
 ) -> pd.DataFrame:
     """Load and preprocess trace data with optional transformations.
 
     Main entry point for loading trace files with flexible preprocessing options
     including filtering, grouping, and aggregation.
 
+    For a column store (see chopper.common.store), iter_idxs, gpus and columns
+    are pushed down to the read, so only matching partitions and columns are
+    loaded. A pickle with a TraceIndex selects iterations and GPUs by row
+    ranges instead of scanning the iteration and gpu columns.
+
+    Runs as a TraceQuery, whose results are memoized in memory per file and
+    arguments (see cache.memoize), as are those of the derived frames below;
+    a disk cache, if set, keeps only the derived frames. With a
+    worker pool (see parallel.set_workers), groupings led by 'gpu' are
+    aggregated per GPU partition in worker processes.
+
     Args:
-        fn: Path to trace pickle file
+        fn: Path to trace pickle file or column store
         iter_idxs: Optional list of iteration indices to select
         assign_chunks: If True, assign training phase chunks (fwd/bwd/opt)
         assign_optype: If True, categorize operators by type (GEMM/FA/Vec)
@@ -55,83 +136,564 @@ def get_df(
         group_arr: Optional list of columns to group by for aggregation
         group_map: Optional dict mapping columns to aggregation functions
         sort_value: Optional column name to sort by after grouping
+        gpus: Optional list of GPU ids to select
+        columns: Optional list of columns to load; columns needed by the
+            other options are added
+        chunk_rows: With group_arr, aggregate this many rows at a time and
+            merge the partial results, for tables that do not fit in memory
+            (see TraceQuery.streaming)
+        preview: Read only a sample of the trace (see chopper.common.sampling;
+            default: the preview set with set_preview, if any)
 
     Returns:
         Processed DataFrame with applied transformations
     """
+    return TraceQuery(
+        fn,
+        iter_idxs=iter_idxs,
+        gpus=gpus,
+        assign_chunks=assign_chunks,
+        assign_optype=assign_optype,
+        remove_nan_chunks=remove_nan_chunks,
+        remove_overlap=remove_overlap,
+        fix_names=fix_names,
+        columns=columns,
+        group_arr=group_arr,
+        group_map=group_map,
+        sort_value=sort_value,
+        chunk_rows=chunk_rows,
+        preview=preview,
+    ).collect()
+
+
+@dataclass(frozen=True)
+class TraceQuery:
+    """Lazy query over a merged kernel table.
+
+    Builder methods return a new query; nothing is read until collect().
+    The vocabulary is get_df's, plus chunk and operator filters, and
+    get_df is itself a TraceQuery. On collect(), iteration and GPU
+    selections and the column projection are pushed into the load (see
+    get_df), every row filter is evaluated per distinct name and combined
+    into one mask applied once, and derived columns are computed only for
+    the surviving rows. Results are memoized like get_df's.
+
+    Example:
+        TraceQuery(fn).iterations(-2, -1).in_chunks('fwd').without_overlap()
+            .with_fixed_names().group_by(['gpu', 'operator-name'], {'dur': ['sum']}).collect()
+
+    Attributes:
+        fn: Path to trace pickle file or column store
+        iter_idxs: Iteration positions to select, as in select_iters
+        gpus: GPU ids to select
+        chunks: Chunks ('fwd', 'bwd', 'opt') to select
+        operators: Operator names to select, after fix_names if set
+        operator_types: Operator types ('GEMM', 'FA', 'Vec') to select
+        assign_chunks, assign_optype, remove_nan_chunks, remove_overlap,
+        fix_names, columns, group_arr, group_map, sort_value, chunk_rows,
+        preview: As in get_df
+    """
+    fn: str
+    iter_idxs: Optional[Sequence[int]] = None
+    gpus: Optional[Sequence[int]] = None
+    chunks: Optional[Sequence[str]] = None
+    operators: Optional[Sequence[str]] = None
+    operator_types: Optional[Sequence[str]] = None
+    assign_chunks: bool = False
+    assign_optype: bool = False
+    remove_nan_chunks: bool = False
+    remove_overlap: bool = False
+    fix_names: bool = False
+    columns: Optional[Sequence[str]] = None
+    group_arr: Optional[Sequence[str]] = None
+    group_map: Optional[Dict[str, List[str]]] = None
+    sort_value: Optional[str] = None
+    chunk_rows: Optional[int] = None
+    preview: Optional[Preview] = None
+
+    def iterations(self, *iter_idxs: int) -> 'TraceQuery':
+        """Keep the iterations at these positions (negative from the end)."""
+        return replace(self, iter_idxs=iter_idxs)
+
+    def on_gpus(self, *gpus: int) -> 'TraceQuery':
+        """Keep these GPUs."""
+        return replace(self, gpus=gpus)
+
+    def in_chunks(self, *chunks: str) -> 'TraceQuery':
+        """Keep these training phases; adds the 'chunk' column."""
+        return replace(self, chunks=chunks, assign_chunks=True)
+
+    def for_operators(self, *names: str) -> 'TraceQuery':
+        """Keep these operators (names as fix_names leaves them, if set)."""
+        return replace(self, operators=names)
+
+    def of_types(self, *types: str) -> 'TraceQuery':
+        """Keep these operator types; adds the 'operator-type' column."""
+        return replace(self, operator_types=types, assign_optype=True)
+
+    def with_chunks(self, drop_nan: bool = True) -> 'TraceQuery':
+        """Add the 'chunk' column, dropping rows without one unless told not to."""
+        return replace(self, assign_chunks=True, remove_nan_chunks=drop_nan)
+
+    def with_operator_type(self) -> 'TraceQuery':
+        """Add the 'operator-type' column."""
+        return replace(self, assign_optype=True)
+
+    def with_fixed_names(self) -> 'TraceQuery':
+        """Normalize operator names (see annotations.fix_names)."""
+        return replace(self, fix_names=True)
+
+    def without_overlap(self) -> 'TraceQuery':
+        """Drop communication and communication-overlapped kernels."""
+        return replace(self, remove_overlap=True)
+
+    def select(self, *columns: str) -> 'TraceQuery':
+        """Load only these columns (plus those the query itself needs)."""
+        return replace(self, columns=columns)
+
+    def group_by(
+        self,
+        group_arr: Sequence[str],
+        group_map: Dict[str, List[str]],
+        sort_value: Optional[str] = None,
+    ) -> 'TraceQuery':
+        """Aggregate the result, as get_df's group_arr/group_map/sort_value."""
+        return replace(self, group_arr=group_arr, group_map=group_map, sort_value=sort_value)
+
+    def streaming(self, chunk_rows: int = 1 << 22) -> 'TraceQuery':
+        """Aggregate chunk_rows rows at a time (needs group_by).
+
+        Memory then scales with the chunk and the number of groups instead
+        of the table: a column store is read chunk by chunk from its mapped
+        files. Aggregations are limited to STREAM_AGGS and weights.
+        """
+        return replace(self, chunk_rows=chunk_rows)
+
+    def sampled(self, preview: Preview = Preview()) -> 'TraceQuery':
+        """Read only a sample of the trace (see chopper.common.sampling)."""
+        return replace(self, preview=preview)
+
+    def collect(self) -> pd.DataFrame:
+        """Run the query, as a preview if one is set (see set_preview)."""
+        query = self if self.preview is not None else replace(self, preview=current_preview())
+        return _run_query(**{f.name: getattr(query, f.name) for f in fields(query)})
+
+    def _needed_columns(self, columns: List[str]) -> List[str]:
+        """columns plus those the query reads, among the table's columns."""
+        store = is_store(self.fn)
+        return _needed_columns(
+            columns, self.iter_idxs, self.gpus, self.group_arr, self.group_map,
+            self.assign_chunks or self.assign_optype or self.remove_overlap or self.fix_names
+            or self.chunks is not None or self.operators is not None or self.operator_types is not None
+            or (self.preview is not None and self.preview.kernels is not None),
+            list(read_meta(self.fn)['columns']) if store else load_pickle(self.fn).columns.tolist(),
+        )
+
+    def _keep(self, df: pd.DataFrame, selected: bool, iter_values: Optional[list] = None) -> np.ndarray:
+        """One mask for every row filter, applied once.
+
+        Args:
+            df: Loaded rows
+            selected: Iterations and GPUs were already selected on load
+            iter_values: Iteration numbers to keep otherwise (see _iteration_values)
+        """
+        keep = (df['name'] != MEMCPY).to_numpy(copy=True)
+        if not selected:
+            if iter_values is not None:
+                keep &= df['iteration'].isin(iter_values).to_numpy()
+            if self.gpus is not None:
+                keep &= df['gpu'].isin(self.gpus).to_numpy()
+        if self.remove_overlap:
+            keep &= no_overlap_mask(df).to_numpy()
+        if self.chunks is not None or (self.assign_chunks and self.remove_nan_chunks):
+            keep &= chunk_mask(df, self.chunks).to_numpy()
+        if self.operators is not None or self.operator_types is not None:
+            keep &= operator_mask(df, self.operators, self.operator_types, fixed=self.fix_names).to_numpy()
+        return keep
+
+    def _derive(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Add the derived columns to the kept rows."""
+        # Derived columns go on a new frame; the cached one is never written
+        df = df.assign(layer=df['layer'].fillna(-1))
+        if self.assign_optype:
+            df = assign_operator_type(df)
+        if self.assign_chunks:
+            df = do_assign_chunks(df)
+        if self.fix_names:
+            df = do_fix_names(df)
+        return df
+
+
+@memoize(disk=False)
+def _run_query(
+    fn: str,
+    iter_idxs: Optional[Sequence[int]] = None,
+    gpus: Optional[Sequence[int]] = None,
+    chunks: Optional[Sequence[str]] = None,
+    operators: Optional[Sequence[str]] = None,
+    operator_types: Optional[Sequence[str]] = None,
+    assign_chunks: bool = False,
+    assign_optype: bool = False,
+    remove_nan_chunks: bool = False,
+    remove_overlap: bool = False,
+    fix_names: bool = False,
+    columns: Optional[Sequence[str]] = None,
+    group_arr: Optional[Sequence[str]] = None,
+    group_map: Optional[Dict[str, List[str]]] = None,
+    sort_value: Optional[str] = None,
+    chunk_rows: Optional[int] = None,
+    preview: Optional[Preview] = None,
+) -> pd.DataFrame:
+    """Execute a TraceQuery; see its fields for the arguments."""
+    sample = None
+    if preview is not None:
+        iter_idxs, gpus, sample = _preview_selection(fn, preview, iter_idxs, gpus)
+    q = TraceQuery(
+        fn, iter_idxs=iter_idxs, gpus=gpus, chunks=chunks, operators=operators,
+        operator_types=operator_types, assign_chunks=assign_chunks, assign_optype=assign_optype,
+        remove_nan_chunks=remove_nan_chunks, remove_overlap=remove_overlap, fix_names=fix_names,
+        columns=columns, group_arr=group_arr, group_map=group_map, sort_value=sort_value,
+        chunk_rows=chunk_rows, preview=preview,
+    )
+    if group_arr and chunk_rows:
+        assert sample is None or preview.kernels is None, "kernel previews cannot be streamed"
+        if sample is not None:
+            record_sample(sample)
+        return _stream_aggregate(q)
+
+    store = is_store(fn)
+    if columns is not None:
+        columns = q._needed_columns(list(columns))
+    if store:
+        df = _store_rows(q, columns)
+    else:
+        df = load_pickle(fn)
+        index = load_index(fn) if iter_idxs or gpus is not None else None
+        if index is not None:
+            df = df.take(index.iteration_rows(gpus, iter_idxs=iter_idxs))
+        if columns is not None:
+            df = df[columns]
+        selected = index is not None
+        keep = q._keep(df, selected, None if selected or not iter_idxs else _iteration_values(df, iter_idxs))
+        if not keep.all():
+            df = df[keep]
+    df = q._derive(df)
+    if sample is not None:
+        if preview.kernels is not None:
+            drawn = sample_kernels(df['operator-name' if 'operator-name' in df.columns else 'name'],
+                                   preview.kernels, preview.seed)
+            sample = replace(sample, kernels=(int(drawn.sum()), len(df)))
+            df = df[drawn]
+        record_sample(sample)
+
+    if group_arr:
+        group_arr = list(group_arr)
+        by = group_arr[:2] if group_arr[:2] == ['gpu', 'iteration'] else group_arr[:1]
+        if by[0] == 'gpu' and pooled(len(df)):
+            # No group spans GPUs: aggregate partitions in workers, sort here
+            df = map_partitions(_aggregate, df, by, (group_arr, group_map, None), ignore_index=True)
+            if sort_value:
+                df = df.sort_values(sort_value).reset_index(drop=True)
+        else:
+            df = _aggregate(df, group_arr, group_map, sort_value)
+    return df
+
+
+def _preview_selection(
+    fn: str,
+    preview: Preview,
+    iter_idxs: Optional[Sequence[int]],
+    gpus: Optional[Sequence[int]],
+) -> tuple:
+    """iter_idxs and gpus narrowed to preview's stratified sample.
+
+    The sample is drawn from the selected iterations and GPUs, or from all
+    of the trace's. A selection the preview keeps whole is returned as it
+    was.
+
+    Returns:
+        (iter_idxs, gpus, Sample)
+    """
+    n_iters, all_gpus = _sample_space(fn)
+    iters = list(iter_idxs) if iter_idxs else list(range(n_iters))
+    gpu_ids = list(gpus) if gpus is not None else all_gpus
+    kept_iters = select(iters, preview.iterations)
+    kept_gpus = select(gpu_ids, preview.gpus)
+    sample = Sample(
+        fn,
+        (len(iters if kept_iters is None else kept_iters), len(iters)),
+        (len(gpu_ids if kept_gpus is None else kept_gpus), len(gpu_ids)),
+    )
+    return (iter_idxs if kept_iters is None else kept_iters,
+            gpus if kept_gpus is None else kept_gpus, sample)
+
+
+def _sample_space(fn: str) -> tuple[int, list]:
+    """Number of iterations and the GPU ids of a trace, from its partition
+    table where it has one."""
+    parts = read_meta(fn)['partitions'] if is_store(fn) else None
+    if parts is None:
+        index = load_index(fn)
+        parts = None if index is None else index.partitions
+    if parts is not None:
+        gpus = np.unique(parts['gpu'])
+        return len(iteration_order(parts)), gpus[gpus != NONE].tolist()
     df = load_pickle(fn)
-    df['layer'] = df['layer'].fillna(-1)
-    df = df[df['name'] != 'Memcpy HtoD (Host -> Device)']
+    n_iters = 0
+    if 'iteration' in df.columns:
+        numbered = (df['name'] != MEMCPY).to_numpy() & df['iteration'].notna().to_numpy()
+        n_iters = df['iteration'][numbered].nunique()
+    gpus = np.sort(df['gpu'].dropna().unique()).tolist() if 'gpu' in df.columns else []
+    return n_iters, gpus
 
-    if iter_idxs:
-        df = select_iters(df, iter_idxs)
 
-    if remove_overlap:
-        df = df[no_overlap_mask(df)]
-    if assign_optype:
-        df = assign_operator_type(df)
+def _store_rows(q: TraceQuery, columns: Optional[List[str]]) -> pd.DataFrame:
+    """The rows a query keeps from a column store, copied out in ts order.
 
-    if assign_chunks:
-        df = do_assign_chunks(df)
-        if remove_nan_chunks:
-            df = df[~df['chunk'].isna()]
+    The store is memory-mapped (see load_mapped): partitions are selected
+    from its metadata and the row filters run on the mapped name columns,
+    so only the kept rows of the needed columns are copied.
+    """
+    mapped = load_mapped(q.fn)
+    rows = select_rows(read_meta(q.fn)['partitions'], q.gpus, None, q.iter_idxs)
+    names = mapped[[c for c in ('name', 'operator-name') if c in mapped.columns]]
+    keep = q._keep(names if rows is None else names.take(rows), True)
+    if rows is not None or not keep.all():
+        rows = np.flatnonzero(keep) if rows is None else rows[keep]
+    return load_rows(q.fn, rows, columns)
+
+
+def _iteration_values(df: pd.DataFrame, iter_idxs: Sequence[int]) -> list:
+    """Iteration numbers at positions iter_idxs, as select_iters picks them."""
+    iteration = df['iteration']
+    numbered = (df['name'] != MEMCPY).to_numpy() & iteration.notna().to_numpy()
+    u_iters = iteration[numbered].unique()
+    return [u_iters[i] for i in iter_idxs]
+
+
+def _agg_plan(
+    group_map: Dict[str, List[str]],
+    columns: Sequence[str],
+) -> tuple[Dict[str, tuple], Dict[str, List[str]]]:
+    """group_map as named aggregations, plus the metrics weighted by a column.
+
+    An aggregation naming a column weighs the metric by it: metric * weight
+    and weight are summed, and the sums divided afterwards.
+    """
+    weight_metrics: dict[str, list[str]] = {}
+    new_group_map = {}
+    for metric, aggs in group_map.items():
+        for agg in aggs:
+            if agg in columns:
+                weight_metrics.setdefault(metric, []).append(agg)
+                new_group_map[agg] = (agg, 'sum')
+                new_group_map[metric] = (metric, 'sum')
+            else:
+                new_group_map[metric if agg ==
+                              'sum' else f"{metric}_{agg}"] = (metric, agg)
+    for metric, weights in weight_metrics.items():
+        assert len(weights) == 1, "cannot weigh by multiple metrics"
+    return new_group_map, weight_metrics
+
+
+def _finish(
+    df: pd.DataFrame,
+    weight_metrics: Dict[str, List[str]],
+    sort_value: Optional[str],
+) -> pd.DataFrame:
+    """Divide weighted sums by their weights and sort a grouped frame."""
+    for metric, weights in weight_metrics.items():
+        df[metric] /= df[weights[0]]
 
-    if fix_names:
-        df = do_fix_names(df)
+    if sort_value:
+        df = df.sort_values(sort_value).reset_index()
+    else:
+        df = df.reset_index()
+    return df
 
-    if group_arr:
-        assert group_map, f"Null group_map is invalid with non-null group_arr: {group_arr}"
-        assert all(col in df.columns.tolist() for col in group_map.keys())
-
-        missing_cols = tuple(col for col in group_map.keys()
-                             if col not in df.columns.tolist())
-        assert len(missing_cols) == 0, f"Missing: {missing_cols}"
-
-        weight_metrics: dict[str, list[str]] = {}
-        new_group_map = {}
-        for metric, aggs in group_map.items():
-            for agg in aggs:
-                if agg in df.columns.tolist():
-                    weight_metrics.setdefault(metric, []).append(agg)
-                    new_group_map[agg] = (agg, 'sum')
-                    new_group_map[metric] = (metric, 'sum')
-                else:
-                    new_group_map[metric if agg ==
-                                  'sum' else f"{metric}_{agg}"] = (metric, agg)
 
-        for metric, weights in weight_metrics.items():
-            assert len(weights) == 1, "cannot weigh by multiple metrics"
-            df[metric] *= df[weights[0]]
+def _aggregate(
+    df: pd.DataFrame,
+    group_arr: List[str],
+    group_map: Optional[Dict[str, List[str]]],
+    sort_value: Optional[str],
+) -> pd.DataFrame:
+    """get_df's group_arr/group_map/sort_value aggregation."""
+    assert group_map, f"Null group_map is invalid with non-null group_arr: {group_arr}"
+    assert all(col in df.columns.tolist() for col in group_map.keys())
 
-        df = df.groupby(group_arr, dropna=False).agg(**new_group_map)
+    missing_cols = tuple(col for col in group_map.keys()
+                         if col not in df.columns.tolist())
+    assert len(missing_cols) == 0, f"Missing: {missing_cols}"
+
+    new_group_map, weight_metrics = _agg_plan(group_map, df.columns.tolist())
+    for metric, weights in weight_metrics.items():
+        df[metric] *= df[weights[0]]
+
+    df = df.groupby(group_arr, dropna=False, observed=True).agg(**new_group_map)
+    return _finish(df, weight_metrics, sort_value)
+
+
+# Aggregations _stream_aggregate can merge across chunks
+STREAM_AGGS = ('sum', 'count', 'min', 'max', 'mean', 'first', 'last')
+
+
+def _chunks(q: 'TraceQuery', columns: List[str]) -> Iterator[tuple]:
+    """The query's candidate rows a chunk at a time, for _stream_aggregate.
+
+    Yields:
+        (chunk, selected, order): the chunk with only columns; whether
+        iterations and GPUs are already selected; and the chunk's sort key
+        columns in in-memory order -- position for a pickle, (ts, store
+        position) for a store, whose in-memory rows are stably ts-sorted
+    """
+    if is_store(q.fn):
+        for rows, chunk in iter_store(q.fn, columns + ['ts'] * ('ts' not in columns),
+                                      q.gpus, q.iter_idxs, q.chunk_rows):
+            order = np.argsort(chunk['ts'].to_numpy(), kind='stable')
+            chunk = chunk.take(order).assign(_pos=rows[order])
+            yield chunk.assign(_ts=chunk['ts'])[columns + ['_ts', '_pos']], True, ['_ts', '_pos']
+        return
+    df = load_pickle(q.fn)
+    index = load_index(q.fn) if q.iter_idxs or q.gpus is not None else None
+    rows = None if index is None else index.iteration_rows(q.gpus, iter_idxs=q.iter_idxs)
+    n = len(df) if rows is None else len(rows)
+    for lo in range(0, max(n, 1), q.chunk_rows):
+        pos = np.arange(lo, min(lo + q.chunk_rows, n))
+        chunk = df.iloc[lo:lo + len(pos)] if rows is None else df.take(rows[pos])
+        yield chunk[columns].assign(_pos=pos), index is not None, ['_pos']
+
+
+def _partial(
+    df: pd.DataFrame,
+    group_arr: List[str],
+    plan: Dict[str, tuple],
+    order: List[str],
+) -> pd.DataFrame:
+    """Mergeable aggregates of one chunk, one row per group (see _merge)."""
+    named = {}
+    for i, (out, (src, agg)) in enumerate(plan.items()):
+        if agg == 'mean':
+            named[f'{i}.sum'] = (src, 'sum')
+            named[f'{i}.count'] = (src, 'count')
+        elif agg in ('first', 'last'):
+            # The row that wins for src, found again when merging by its sort key
+            missing = df[src].isna().to_numpy()
+            named[f'{i}.{agg}'] = (src, agg)
+            for key in order:
+                values = df[key].to_numpy()
+                df[f'{i}.{key}'] = pd.arrays.IntegerArray(values, missing) if missing.any() else values
+                named[f'{i}.{agg}.{key}'] = (f'{i}.{key}', agg)
+        else:
+            assert agg in STREAM_AGGS, f"{out}: '{agg}' cannot be merged across chunks; use one of {STREAM_AGGS}"
+            named[f'{i}.{agg}'] = (src, agg)
+    return df.groupby(group_arr, dropna=False, observed=True).agg(**named).reset_index()
 
-        for metric, weights in weight_metrics.items():
-            df[metric] /= df[weights[0]]
 
-        if sort_value:
-            df = df.sort_values(sort_value).reset_index()
+def _merge(
+    partials: List[pd.DataFrame],
+    group_arr: List[str],
+    plan: Dict[str, tuple],
+    order: List[str],
+) -> pd.DataFrame:
+    """Combine _partial frames into one, still in _partial's form."""
+    df = pd.concat(_union_categories(partials), ignore_index=True)
+    groups = df.groupby(group_arr, dropna=False, observed=True)
+    merged = []
+    for i, (src, agg) in enumerate(plan.values()):
+        if agg == 'mean':
+            merged.append(groups[[f'{i}.sum', f'{i}.count']].sum())
+        elif agg in ('first', 'last'):
+            # Missing values have missing keys, which sort last
+            cols = [f'{i}.{agg}'] + [f'{i}.{agg}.{key}' for key in order]
+            ranked = df.sort_values(cols[1:], kind='stable', na_position='last')
+            merged.append(ranked.groupby(group_arr, dropna=False, observed=True)[cols].agg(agg))
         else:
-            df = df.reset_index()
+            merged.append(groups[[f'{i}.{agg}']].agg('sum' if agg == 'count' else agg))
+    return pd.concat(merged, axis=1).reset_index()
 
-    return df
+
+def _merged_values(df: pd.DataFrame, group_arr: List[str], plan: Dict[str, tuple]) -> pd.DataFrame:
+    """The plan's aggregates from a merged _partial frame, indexed by group."""
+    df = df.set_index(group_arr)
+    values = {}
+    for i, (out, (src, agg)) in enumerate(plan.items()):
+        if agg == 'mean':
+            values[out] = df[f'{i}.sum'] / df[f'{i}.count']
+        else:
+            values[out] = df[f'{i}.{agg}']
+    return pd.DataFrame(values)
+
+
+def _union_categories(frames: List[pd.DataFrame]) -> List[pd.DataFrame]:
+    """frames with every categorical column over the union of its categories.
+
+    Derived labels (e.g. 'chunk' from a string column) only take the
+    categories present in their chunk; concat would turn them into objects.
+    """
+    dtypes = {}
+    for col in frames[0].columns:
+        cats = [df[col].cat.categories for df in frames if isinstance(df[col].dtype, pd.CategoricalDtype)]
+        if len(cats) == len(frames) and any(not c.equals(cats[0]) for c in cats):
+            dtypes[col] = pd.CategoricalDtype(cats[0].append(cats[1:]).unique().sort_values())
+    return [df.astype(dtypes) for df in frames] if dtypes else frames
+
+
+def _stream_aggregate(q: 'TraceQuery') -> pd.DataFrame:
+    """Run a grouped query chunk by chunk, merging partial aggregates.
+
+    Only one chunk of rows (q.chunk_rows) is in memory at a time: a column
+    store is read from its mapped files, and a pickle's derived columns and
+    filters are applied per chunk. sum, count, min, max and mean merge
+    directly; first and last keep the sort key of the winning row, so the
+    result matches the in-memory path (float sums up to summation order).
+    """
+    group_arr = list(q.group_arr)
+    assert q.group_map, f"Null group_map is invalid with non-null group_arr: {group_arr}"
+    columns = q._needed_columns(list(q.columns or []))
+    plan, weight_metrics = _agg_plan(q.group_map, columns)
+    missing = [col for col in q.group_map if col not in columns]
+    assert not missing, f"Missing: {missing}"
+
+    iter_values = None
+    partials: List[pd.DataFrame] = []
+    for chunk, selected, order in _chunks(q, columns):
+        if not selected and q.iter_idxs and iter_values is None:
+            iter_values = _iteration_values(load_pickle(q.fn), q.iter_idxs)
+        keep = q._keep(chunk, selected, iter_values)
+        chunk = q._derive(chunk if keep.all() else chunk[keep])
+        for metric, weights in weight_metrics.items():
+            chunk[metric] *= chunk[weights[0]]
+        if len(chunk) or not partials:
+            partials.append(_partial(chunk, group_arr, plan, order))
+        if len(partials) > 16:
+            # Memory grows with the number of groups, not of chunks
+            partials = [_merge(partials, group_arr, plan, order)]
+
+    df = _merged_values(_merge(partials, group_arr, plan, order), group_arr, plan)
+    return _finish(df, weight_metrics, q.sort_value)
 
 
+@memoize
 def get_straggler_df(
     fn: str,
     iter_idxs: Optional[List] = None,
     agg_meth: str = 'max',
     kernel_name: bool = False,
+    preview: Optional[Preview] = None,
 ) -> pd.DataFrame:
     """Load and compute straggler metrics from trace data.
 
     Processes trace data to identify performance stragglers by computing
-    how much each GPU lags behind the slowest GPU for each operation.
+    how much each GPU lags behind the slowest GPU for each operation. The
+    per-operator rows come from get_df; straggler_values adds the metrics.
 
     Args:
         fn: Path to trace pickle file
         iter_idxs: Optional list of iteration indices to select
         agg_meth: Aggregation method ('max', 'min', 'mean') for straggler reference
         kernel_name: If True, include kernel names in grouping
+        preview: Sample the trace, as in get_df
 
     Returns:
         DataFrame with straggler metrics including 's-value' (lag time) and
@@ -152,34 +714,110 @@ def get_straggler_df(
             'dur': ['sum', 'last'],
         },
         sort_value='ts_first',
+        preview=preview,
     )
-    agg_df = df.groupby(
-        group_arr,
-        dropna=False
-    ).agg(
-        **{f'ts_first_{agg_meth}': ('ts_first', agg_meth)}
-    ).sort_values(f'ts_first_{agg_meth}').reset_index()
+    return straggler_values(df, group_arr, agg_meth)
 
-    df = df.merge(
-        agg_df,
-        on=group_arr,
-        how='left'
-    )
 
-    df['s-value'] = (
-        df[f'ts_first_{agg_meth}'] - df['ts_first'])
+def straggler_values(
+    df: pd.DataFrame,
+    group_arr: List[str],
+    agg_meth: str = 'max',
+) -> pd.DataFrame:
+    """Add the straggler columns of get_straggler_df to per-GPU operator rows.
 
-    df['s-delta'] = df.groupby(
-        'gpu'
-    )['s-value'].transform(lambda x: x.shift(-1) - x)
+    Operators are matched across GPUs by hashing group_arr, and the
+    reference ts_first of each is reduced over its GPUs in place (ufunc.at)
+    and read back per row, instead of aggregating and merging. s-delta
+    walks each GPU's operators along one stable sort by GPU. Every step is
+    linear in the rows, so the cost grows with the number of ranks and
+    nothing else.
 
-    last_op_of_iter_mask = df.groupby(
-        ['gpu', 'iteration']).cumcount(ascending=False) == 0
-    df.loc[last_op_of_iter_mask, 's-delta'] = 0
+    Args:
+        df: One row per GPU and operator, in ts_first order, with 'gpu',
+            'iteration', 'ts_first' and the group_arr columns
+        group_arr: Columns identifying an operator on every GPU
+        agg_meth: Reference ts_first across GPUs ('max', 'min', 'mean', or
+            any other groupby aggregation)
 
+    Returns:
+        df with f'ts_first_{agg_meth}', 's-value' and 's-delta' columns
+    """
+    df = df.assign(**{f'ts_first_{agg_meth}': _across_gpus(df, group_arr, agg_meth)})
+    df['s-value'] = df[f'ts_first_{agg_meth}'] - df['ts_first']
+    df['s-delta'] = map_partitions(_straggler_delta, df[['gpu', 'iteration', 's-value']])
     return df
 
 
+def _across_gpus(df: pd.DataFrame, group_arr: List[str], agg_meth: str) -> np.ndarray:
+    """agg_meth of ts_first over the GPUs running each row's operator."""
+    codes = _operator_codes(df, group_arr)
+    ts = df['ts_first'].to_numpy()
+    if agg_meth not in ('max', 'min', 'mean') or ts.dtype.kind != 'i':
+        return df['ts_first'].groupby(codes).transform(agg_meth).to_numpy()
+    n = int(codes.max()) + 1 if len(codes) else 0
+    if agg_meth == 'max':
+        hi = np.full(n, np.iinfo(ts.dtype).min, dtype=ts.dtype)
+        np.maximum.at(hi, codes, ts)
+        return hi[codes]
+    lo = np.full(n, np.iinfo(ts.dtype).max, dtype=ts.dtype)
+    np.minimum.at(lo, codes, ts)
+    if agg_meth == 'min':
+        return lo[codes]
+    # Summing offsets from the minimum keeps epoch timestamps from overflowing
+    offset = np.zeros(n, dtype=np.int64)
+    np.add.at(offset, codes, ts - lo[codes])
+    return lo[codes] + (offset / np.bincount(codes, minlength=n))[codes]
+
+
+def _operator_codes(df: pd.DataFrame, group_arr: List[str]) -> np.ndarray:
+    """Dense code per row of its group_arr values, missing values included.
+
+    Each column is factorized on its own (categoricals by their codes) and
+    the codes combined into one integer, so only that integer is hashed.
+    """
+    codes, dims = [], []
+    for col in group_arr:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Code -1 (missing) becomes 0
+            codes.append(values.cat.codes.to_numpy().astype(np.int64) + 1)
+            dims.append(len(values.cat.categories) + 1)
+        else:
+            c, uniques = pd.factorize(values, use_na_sentinel=False)
+            codes.append(c)
+            dims.append(max(len(uniques), 1))
+    if np.prod(dims, dtype=np.float64) >= np.iinfo(np.int64).max:
+        return df.groupby(group_arr, dropna=False, observed=True, sort=False).ngroup().to_numpy()
+    return pd.factorize(np.ravel_multi_index(codes, dims))[0]
+
+
+def _straggler_delta(df: pd.DataFrame) -> pd.Series:
+    """Per-GPU stage of get_straggler_df: change in s-value to the next
+    operator, 0 for the last operator of each iteration."""
+    s_value = df['s-value'].to_numpy(dtype=np.float64)
+    gpu, iteration = partition_keys(df, 'gpu'), partition_keys(df, 'iteration')
+    # Stable, so each GPU's operators keep their ts_first order; 16-bit
+    # keys take numpy's radix sort, linear in the rows
+    narrow = len(gpu) and gpu.max() < np.iinfo(np.int16).max
+    order = np.argsort(gpu.astype(np.int16) if narrow else gpu, kind='stable')
+    cur, nxt = order[:-1], order[1:]
+    same = (gpu[cur] == gpu[nxt]) & (gpu[cur] != NONE)
+    delta = np.full(len(df), np.nan)
+    delta[cur[same]] = s_value[nxt[same]] - s_value[cur[same]]
+
+    it_cur, it_nxt = iteration[cur], iteration[nxt]
+    if (it_nxt[same] >= it_cur[same]).all():
+        # Iterations run in order on every GPU: the last operator of one is
+        # the last on its GPU or followed by the next iteration
+        last = np.ones(len(df), dtype=bool)
+        last[cur[same & (it_cur == it_nxt)]] = False
+    else:
+        last = ~pd.DataFrame({'gpu': gpu, 'iteration': iteration}).duplicated(keep='last').to_numpy()
+    delta[last & (gpu != NONE) & (iteration != NONE)] = 0
+    return pd.Series(delta, index=df.index)
+
+
 def get_straggler_contributors(
     df: pd.DataFrame,
     group_arr: List[str] = ['gpu', 'operator-name'],
@@ -197,27 +835,32 @@ def get_straggler_contributors(
     Returns:
         DataFrame with aggregated straggler contributions
     """
-    return df.groupby(group_arr)[
+    return df.groupby(group_arr, observed=True)[
         's-delta' if delta else 's-value'
     ].agg(list(agg_cols)).reset_index()
 
 
+@memoize
 def get_overlap_df(
     fn: str,
     iter_idxs: Optional[List] = None,
     kernel_name: bool = False,
     include_comm_df: bool = False,
+    preview: Optional[Preview] = None,
 ):
     """Compute communication-computation overlap ratios.
 
     Analyzes how much computation overlaps with communication operations
-    to assess pipeline efficiency.
+    to assess pipeline efficiency. An operator's overlap is the part of its
+    span covered by any communication kernel on its GPU (see
+    TraceIndex.overlap).
 
     Args:
         fn: Path to trace pickle file
         iter_idxs: Optional list of iteration indices to select
         kernel_name: If True, include kernel names in grouping
         include_comm_df: If True, return both overlap and communication DataFrames
+        preview: Sample the trace, as in get_df
 
     Returns:
         If include_comm_df is False: DataFrame with overlap_ratio column
@@ -227,6 +870,7 @@ def get_overlap_df(
         fn,
         iter_idxs=iter_idxs,
         sort_value='ts',
+        preview=preview,
     )
     comm_df = comm_df[~no_overlap_mask(comm_df)]
     comm_df['end_ts'] = comm_df['ts'] + comm_df['dur']
@@ -245,47 +889,47 @@ def get_overlap_df(
             'dur': ['sum', 'last'],
         },
         sort_value='ts_first',
+        preview=preview,
     )
     comp_df['end_ts'] = comp_df['ts_last'] + comp_df['dur_last']
     comp_df['elapsed'] = comp_df['end_ts'] - comp_df['ts_first']
 
-    def add_overlap(group):
-        gpu = group.name
-        gpu_comm_df = comm_df[comm_df['gpu'] == gpu]
-
-        for op_idx, operation in group.iterrows():
-            start = operation['ts_first']
-            end = operation['end_ts']
-            elapsed = operation['elapsed']
-            overlapped_comm = gpu_comm_df[
-                (gpu_comm_df['ts'] <= end) &
-                (gpu_comm_df['end_ts'] >= start)
-            ]
-
-            # FIXME maybe double counts some overlap
-            total_ovr = 0
-            for _, comm_kern in overlapped_comm.iterrows():
-                ovr_start = max(start, comm_kern['ts'])
-                ovr_end = min(end, comm_kern['end_ts'])
-                total_ovr += max(0, ovr_end - ovr_start)
-
-            total_ovr = min(elapsed, total_ovr)
-            ratio = 100 * total_ovr / elapsed
-            group.loc[op_idx, "overlap_ratio"] = ratio
-        return group
-
-    ovr_df = comp_df.groupby('gpu').apply(add_overlap).reset_index(level=0)
+    overlap = map_partitions(
+        _overlap,
+        [comp_df[['gpu', 'ts_first', 'end_ts']], comm_df[['gpu', 'ts', 'dur']]],
+    )
+    comp_df['overlap_ratio'] = 100 * overlap / comp_df['elapsed']
+    ovr_df = comp_df.sort_values('gpu', kind='stable')
     if include_comm_df:
         return ovr_df, comm_df
     else:
         return ovr_df
 
 
+def _overlap(comp_df: pd.DataFrame, comm_df: pd.DataFrame) -> pd.Series:
+    """Per-GPU stage of get_overlap_df: span of each operator covered by
+    communication, counting time under several kernels once.
+
+    The communication kernels' interval index (see TraceIndex.overlap)
+    answers each GPU's operators with binary searches.
+    """
+    index = TraceIndex.build(comm_df)
+    gpu = partition_keys(comp_df, 'gpu')
+    starts, ends = comp_df['ts_first'].to_numpy(), comp_df['end_ts'].to_numpy()
+    out = np.zeros(len(comp_df), dtype=np.result_type(starts, ends, comm_df['ts'].dtype, comm_df['dur'].dtype))
+    for g in np.unique(gpu).tolist():
+        on_gpu = gpu == g
+        out[on_gpu] = index.overlap(g, starts[on_gpu], ends[on_gpu])
+    return pd.Series(out, index=comp_df.index)
+
+
+@memoize
 def get_slack_adv_df(
     fn: str,
     iter_idxs: Optional[List] = None,
     kernel_name: bool = False,
     agg_meth: str = 'max',
+    preview: Optional[Preview] = None,
 ):
     """Compute slack advantage metrics for communication operations.
 
@@ -297,6 +941,7 @@ def get_slack_adv_df(
         iter_idxs: Optional list of iteration indices to select
         kernel_name: If True, include kernel names in grouping
         agg_meth: Aggregation method ('max', 'min', 'mean') for slack reference
+        preview: Sample the trace, as in get_df
 
     Returns:
         Tuple of (comm_df, comp_df) with timing and straggler information
@@ -312,9 +957,10 @@ def get_slack_adv_df(
             'dur': ['sum', 'last'],
         },
         sort_value='ts_first',
+        preview=preview,
     )
     comm_df = comm_df[~no_overlap_mask(comm_df)]
-    comm_df = comm_df[comm_df['name'] != 'Memcpy HtoD (Host -> Device)']
+    comm_df = comm_df[comm_df['name'] != MEMCPY]
     comm_df['end_ts'] = comm_df['ts_last'] + comm_df['dur']
     comm_df['elapsed'] = comm_df['end_ts'] - comm_df['ts_first']
 
@@ -331,13 +977,15 @@ def get_slack_adv_df(
             'dur': ['sum', 'last'],
         },
         sort_value='ts_first',
+        preview=preview,
     )
     comp_df['end_ts'] = comp_df['ts_last'] + comp_df['dur_last']
     comp_df['elapsed'] = comp_df['end_ts'] - comp_df['ts_first']
 
     agg_df = comm_df.groupby(
         group_arr,
-        dropna=False
+        dropna=False,
+        observed=True,
     ).agg(
         **{f'ts_{agg_meth}': ('ts_first', agg_meth)}
     ).sort_values(f'ts_{agg_meth}').reset_index()
@@ -0,0 +1,320 @@
+"""Process-pool execution over the GPU partitions of kernel tables.
+
+Most of an analysis is independent per GPU: grouping a GPU's kernels,
+shifting along its timeline, the overlap of its operators with its own
+communication. map_partitions splits tables by (gpu[, iteration]), runs such
+a stage on groups of whole partitions in worker processes and concatenates
+the results in partition order, leaving only the cross-GPU reductions to the
+caller. Columns travel through shared memory: each table is copied into it
+once, already in partition order, and a worker copies out just the rows of
+its partitions.
+
+map_tasks runs whole independent jobs (e.g. loading one config each) on
+the same pool.
+
+By default map_tasks starts a worker per task (up to one per core), while
+partitions run in-process until set_workers (or CHOPPER_WORKERS) asks for
+more than one worker; set_workers(0) keeps both in-process. Small tables
+always run in-process.
+"""
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from loguru import logger
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, List, Optional, Sequence, Union
+
+from chopper.common.cache import cache_stats, disk_budget, disk_cache, set_budget, set_disk_cache
+from chopper.common.index import NONE, partition_keys
+from chopper.common.sampling import Preview, clear_samples, preview, record_sample, samples, set_preview
+
+# Worker processes (0 or 1: run in-process; None: pool tasks only), or CHOPPER_WORKERS
+_workers: Optional[int] = int(os.environ['CHOPPER_WORKERS']) if 'CHOPPER_WORKERS' in os.environ else None
+
+# Below this many rows, shipping the table costs more than the stage
+MIN_ROWS = 1 << 18
+
+# Tasks per worker, so uneven partitions still balance
+_TASKS_PER_WORKER = 4
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_lock = threading.Lock()
+
+_MASKED = (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)
+
+
+def set_workers(workers: Optional[int]) -> None:
+    """Set the number of worker processes (None: one per core, 0 or 1: none)."""
+    global _workers, _pool
+    with _lock:
+        _workers = (os.cpu_count() or 1) if workers is None else workers
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+
+
+def workers() -> int:
+    """Number of worker processes in use (0 or 1: partitions run in-process)."""
+    return _workers or 0
+
+
+def pooled(rows: int) -> bool:
+    """True if a stage over this many rows runs on the process pool."""
+    return workers() > 1 and rows >= MIN_ROWS
+
+
+def _pool_size(tasks: int) -> int:
+    """Workers for this many independent tasks (see map_tasks)."""
+    if _workers is not None:
+        return _workers
+    return min(tasks, os.cpu_count() or 1)
+
+
+def _init_worker(disk_dir: Optional[str], disk_bytes: int, budget: int) -> None:
+    """Workers run their tasks serially, share the cache budget and disk cache."""
+    global _workers
+    _workers = 0
+    set_disk_cache(disk_dir, disk_bytes)
+    set_budget(budget)
+
+
+def _get_pool(size: int) -> ProcessPoolExecutor:
+    """The process pool, (re)started if it has fewer than size workers."""
+    global _pool, _pool_workers
+    with _lock:
+        if _pool is not None and _pool_workers < size:
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            logger.debug(f"starting {size} worker processes")
+            # Spawned workers do not inherit the parent's threads (e.g. Qt's)
+            _pool = ProcessPoolExecutor(
+                size,
+                mp_context=get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(disk_cache(), disk_budget(), cache_stats().budget // size),
+            )
+            _pool_workers = size
+        return _pool
+
+
+def map_tasks(func: Callable, tasks: Sequence[tuple]) -> List[Any]:
+    """func(*args) for every args in tasks, on the process pool.
+
+    Unless set_workers chose a size, the pool gets a worker per task, up to
+    one per core. With set_workers(0) or 1, or for a single task, the calls
+    run in-process. func must be a module-level function (it is pickled by
+    reference), and its arguments and results picklable. Workers load with
+    the caller's preview, and the samples they draw are recorded here (see
+    chopper.common.sampling).
+
+    Returns:
+        func's results in task order
+    """
+    size = _pool_size(len(tasks))
+    if size <= 1 or len(tasks) < 2:
+        return [func(*args) for args in tasks]
+    pool = _get_pool(size)
+    futures = [pool.submit(_run_job, preview(), func, args) for args in tasks]
+    results = []
+    for f in futures:
+        result, drawn = f.result()
+        record_sample(*drawn)
+        results.append(result)
+    return results
+
+
+def _run_job(job_preview: Optional[Preview], func: Callable, args: tuple) -> tuple:
+    """Worker side of map_tasks: func(*args) and the samples it drew."""
+    set_preview(job_preview)
+    clear_samples()
+    return func(*args), samples()
+
+
+@dataclass
+class _Column:
+    """A column (or the index) stored as shared arrays, and how to rebuild it.
+
+    kind is 'numpy' (values), 'categorical' (codes; extra is the dtype),
+    'masked' (values and NA mask; extra is the array type) or 'factorized'
+    (codes; extra is (uniques, dtype)).
+    """
+    name: Any
+    kind: str
+    buffers: List[tuple]
+    extra: Any = None
+
+
+def _column_arrays(values: pd.Series) -> tuple[str, List[np.ndarray], Any]:
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return 'categorical', [values.cat.codes.to_numpy()], dtype
+    if isinstance(values.array, _MASKED):
+        data = values.to_numpy(dtype=dtype.numpy_dtype, na_value=dtype.numpy_dtype.type(0))
+        return 'masked', [data, values.isna().to_numpy()], type(values.array)
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+        return 'numpy', [values.to_numpy()], None
+    codes, uniques = pd.factorize(values)
+    return 'factorized', [codes], (uniques, dtype)
+
+
+def _rebuild(column: _Column, arrays: List[np.ndarray]) -> Union[np.ndarray, pd.api.extensions.ExtensionArray]:
+    if column.kind == 'categorical':
+        return pd.Categorical.from_codes(arrays[0], dtype=column.extra)
+    if column.kind == 'masked':
+        return column.extra(arrays[0], arrays[1])
+    if column.kind == 'factorized':
+        uniques, dtype = column.extra
+        return pd.Categorical.from_codes(arrays[0], categories=uniques).astype(dtype)
+    return arrays[0]
+
+
+class _SharedFrame:
+    """A DataFrame's columns and index copied into shared memory in a row order."""
+
+    def __init__(self, df: pd.DataFrame, order: np.ndarray):
+        assert not isinstance(df.index, pd.MultiIndex), "MultiIndex frames are not supported"
+        self.blocks: List[SharedMemory] = []
+        self.rows = len(order)
+        try:
+            self.columns = [self._share(name, df[name], order) for name in df.columns]
+            self.index = self._share(df.index.name, df.index.to_series(), order)
+        except BaseException:
+            self.close()
+            raise
+
+    def _share(self, name: Any, values: pd.Series, order: np.ndarray) -> _Column:
+        kind, arrays, extra = _column_arrays(values)
+        buffers = []
+        for a in arrays:
+            block = SharedMemory(create=True, size=max(a.nbytes, 1))
+            self.blocks.append(block)
+            np.take(a, order, out=np.ndarray(len(order), dtype=a.dtype, buffer=block.buf))
+            buffers.append((block.name, a.dtype.str))
+        return _Column(name, kind, buffers, extra)
+
+    def spec(self) -> tuple:
+        return self.columns, self.index
+
+    def close(self) -> None:
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def _read_rows(spec: tuple, start: int, stop: int) -> pd.DataFrame:
+    """Rows [start, stop) of a shared frame, copied out of shared memory."""
+    columns, index = spec
+
+    def read(column: _Column):
+        arrays = []
+        for name, dtype in column.buffers:
+            block = SharedMemory(name=name)
+            try:
+                view = np.ndarray(stop, dtype=np.dtype(dtype), buffer=block.buf)
+                arrays.append(view[start:stop].copy())
+                del view
+            finally:
+                block.close()
+        return _rebuild(column, arrays)
+
+    def dtype(column: _Column):
+        return column.extra[1] if column.kind == 'factorized' else None
+
+    # pandas 3 infers its str dtype for object strings unless told otherwise
+    df = pd.DataFrame(
+        {c.name: read(c) for c in columns},
+        index=pd.Index(read(index), name=index.name, dtype=dtype(index)),
+    )
+    return df.astype({c.name: dtype(c) for c in columns if c.kind == 'factorized'})
+
+
+def _run_task(func: Callable, specs: List[tuple], bounds: List[tuple], args: tuple) -> Any:
+    """Worker side of map_partitions: func on each frame's rows in bounds."""
+    return func(*(_read_rows(spec, start, stop) for spec, (start, stop) in zip(specs, bounds)), *args)
+
+
+def _partition_codes(frames: Sequence[pd.DataFrame], by: Sequence[str]) -> List[np.ndarray]:
+    """Per frame, the rank of each row's partition among all frames' partitions.
+
+    Partitions rank like a groupby on the by columns: ascending, missing
+    values last.
+    """
+    keys = []
+    for df in frames:
+        k = np.column_stack([partition_keys(df, col) for col in by])
+        keys.append(np.where(k == NONE, np.iinfo(np.int64).max, k))
+    _, codes = np.unique(np.concatenate(keys), axis=0, return_inverse=True)
+    codes = codes.reshape(-1)
+    splits = np.cumsum([len(df) for df in frames])[:-1]
+    return np.split(codes, splits)
+
+
+def map_partitions(
+    func: Callable,
+    frames: Union[pd.DataFrame, Sequence[pd.DataFrame]],
+    by: Union[str, Sequence[str]] = 'gpu',
+    args: tuple = (),
+    ignore_index: bool = False,
+) -> Union[pd.DataFrame, pd.Series]:
+    """Run a per-partition stage over frames, on the process pool if enabled.
+
+    func is called as func(*parts, *args), where parts holds the rows of
+    some whole partitions of every frame (matched on the by columns), in
+    their original relative order and with their original index. It must
+    treat partitions independently -- typically by grouping on the by
+    columns itself -- so any grouping of partitions, including all of them
+    at once, gives the same rows. Without a pool (see pooled) func runs once
+    on the frames as they are.
+
+    Args:
+        func: Module-level function (it is pickled by reference) returning a
+            DataFrame or Series
+        frames: DataFrame, or DataFrames partitioned together
+        by: Partition column(s), e.g. 'gpu' or ['gpu', 'iteration']
+        args: Extra arguments for func
+        ignore_index: Renumber the concatenated result instead of keeping
+            the labels func returned
+
+    Returns:
+        func's results concatenated in partition order
+    """
+    frames = [frames] if isinstance(frames, pd.DataFrame) else list(frames)
+    by = [by] if isinstance(by, str) else list(by)
+    if not pooled(sum(len(df) for df in frames)):
+        result = func(*frames, *args)
+        return result.reset_index(drop=True) if ignore_index else result
+
+    codes = _partition_codes(frames, by)
+    n_parts = max(int(c.max()) + 1 for c in codes if len(c))
+    orders = [np.argsort(c, kind='stable') for c in codes]
+    # starts[f][p]: first row of partition p in frame f's partition order
+    starts = [np.searchsorted(c[o], np.arange(n_parts + 1)) for c, o in zip(codes, orders)]
+
+    # Contiguous runs of partitions with about the same number of rows
+    rows = np.sum([np.diff(s) for s in starts], axis=0).cumsum()
+    n_tasks = min(n_parts, workers() * _TASKS_PER_WORKER)
+    cuts = np.unique(np.r_[0, np.searchsorted(rows, rows[-1] * np.arange(1, n_tasks) / n_tasks), n_parts])
+
+    shared = []
+    try:
+        for df, order in zip(frames, orders):
+            shared.append(_SharedFrame(df, order))
+        specs = [s.spec() for s in shared]
+        pool = _get_pool(workers())
+        futures = [
+            pool.submit(_run_task, func, specs, [(s[lo], s[hi]) for s in starts], args)
+            for lo, hi in zip(cuts[:-1], cuts[1:])
+        ]
+        results = [f.result() for f in futures]
+    finally:
+        for s in shared:
+            s.close()
+    return pd.concat(results, ignore_index=ignore_index)
@@ -0,0 +1,149 @@
+"""Sampled previews of kernel tables for interactive exploration.
+
+A Preview keeps a stratified sample of a trace -- a few iterations spread
+evenly over the run and GPUs spread evenly over the ranks -- and optionally
+at most a number of kernels per operator, drawn uniformly. The draw is
+seeded, so the same preview always shows the same rows.
+
+While a preview is set (see set_preview), get_df and the loaders built on
+it read only the sample. Memoized results are bypassed rather than cached:
+a preview is cheap to redo, and the full results already cached stay
+there for the full-fidelity reload. Every sample drawn is recorded with its
+sampling factor (see samples), so a plot can say how much of the trace it
+shows.
+"""
+
+import threading
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+
+@dataclass(frozen=True)
+class Preview:
+    """What a preview keeps of a trace.
+
+    Attributes:
+        iterations: Iterations to keep, one per equal stratum of the run
+            (None: all)
+        gpus: GPUs to keep, one per equal stratum of the ranks (None: all)
+        kernels: Kernels to keep per operator, drawn uniformly (None: all)
+        seed: Seed of the kernel draw
+    """
+    iterations: Optional[int] = 4
+    gpus: Optional[int] = 8
+    kernels: Optional[int] = None
+    seed: int = 0
+
+
+@dataclass(frozen=True)
+class Sample:
+    """One sample drawn from a trace, as (kept, total) counts.
+
+    Attributes:
+        fn: Trace file
+        iterations: Iterations kept and available
+        gpus: GPUs kept and available
+        kernels: Rows kept by the per-operator draw, and rows drawn from
+            (None: no draw)
+    """
+    fn: str
+    iterations: tuple[int, int]
+    gpus: tuple[int, int]
+    kernels: Optional[tuple[int, int]] = None
+
+    @property
+    def factor(self) -> float:
+        """Estimated fraction of the trace's kernels in the sample."""
+        factor = 1.0
+        for kept, total in (self.iterations, self.gpus, self.kernels or (1, 1)):
+            factor *= kept / total if total else 1.0
+        return factor
+
+    def __str__(self) -> str:
+        parts = [f"{self.iterations[0]}/{self.iterations[1]} iterations",
+                 f"{self.gpus[0]}/{self.gpus[1]} GPUs"]
+        if self.kernels is not None:
+            parts.append(f"{self.kernels[0]}/{self.kernels[1]} kernels")
+        return f"{self.fn}: {', '.join(parts)} ({self.factor:.2%})"
+
+
+_preview: Optional[Preview] = None
+_samples: List[Sample] = []
+_lock = threading.Lock()
+
+
+def set_preview(preview: Optional[Preview]) -> None:
+    """Load previews from now on (None: full traces)."""
+    global _preview
+    _preview = preview
+
+
+def preview() -> Optional[Preview]:
+    """The preview in effect, or None if traces load in full."""
+    return _preview
+
+
+def record_sample(*samples: Sample) -> None:
+    """Add drawn samples to those reported by samples()."""
+    with _lock:
+        _samples.extend(samples)
+
+
+def samples() -> List[Sample]:
+    """Samples drawn since the last clear_samples, in order."""
+    with _lock:
+        return list(_samples)
+
+
+def clear_samples() -> None:
+    """Forget the recorded samples."""
+    with _lock:
+        _samples.clear()
+
+
+def spread(n: int, k: Optional[int]) -> np.ndarray:
+    """Positions of a stratified sample of k out of n ordered items.
+
+    The items are cut into k equal strata and the middle of each is kept,
+    so the sample covers the whole range (and skips a first warm-up
+    iteration unless k is close to n). All n are kept if k is None or not
+    smaller.
+    """
+    if k is None or k >= n:
+        return np.arange(n)
+    return ((np.arange(k) + 0.5) * n / k).astype(np.int64)
+
+
+def sample_kernels(keys: pd.Series, kernels: int, seed: int = 0) -> np.ndarray:
+    """Mask keeping at most kernels rows of every distinct key, drawn uniformly.
+
+    Every row gets a random priority and the lowest of each key are kept:
+    the same uniform subset a reservoir sample draws, found with one sort.
+    Missing keys form a group of their own.
+
+    Args:
+        keys: Group of every row (e.g. 'operator-name')
+        kernels: Rows to keep per key
+        seed: Seed of the draw
+
+    Returns:
+        Boolean ndarray aligned with keys
+    """
+    codes, _ = pd.factorize(keys, use_na_sentinel=False)
+    n = len(codes)
+    order = np.lexsort((np.random.default_rng(seed).random(n), codes))
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    rank = np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+    keep = np.empty(n, dtype=bool)
+    keep[order] = rank < kernels
+    return keep
+
+
+def select(items: Sequence, k: Optional[int]) -> Optional[list]:
+    """The spread() sample of items, or None if it would keep them all."""
+    if k is None or k >= len(items):
+        return None
+    return [items[i] for i in spread(len(items), k)]
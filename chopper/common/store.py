@@ -0,0 +1,267 @@
+"""Partitioned column store for merged kernel tables.
+
+A store is a directory with one .npy file per column plus meta.pkl. Rows are
+grouped into (gpu, iteration) partitions, ts-sorted within each, and meta.pkl
+records every partition's row range. Readers therefore touch only the column
+files and row ranges a query needs; the .npy files can be memory-mapped.
+The index/ subdirectory holds a TraceIndex (chopper.common.index) whose rows
+are positions in store order.
+
+Columns use the compact kernel schema (see KERNEL_SCHEMA) and are stored by
+save_column, which merge also uses for its spill files: strings and
+categoricals as codes (-1 for missing) with the categories in the spec,
+nullable integers as values plus a missing-value mask. Codes use the
+narrowest integer type pandas would pick for a Categorical, so a
+memory-mapped read can wrap them without a copy.
+"""
+
+import os
+import pickle
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, List, Optional, Sequence
+from chopper.common.index import TraceIndex, partition, select_rows
+
+STORE_VERSION = 2
+META = 'meta.pkl'
+INDEX = 'index'
+
+
+def is_store(path: str) -> bool:
+    """True if path is a column store directory."""
+    return os.path.isfile(os.path.join(path, META))
+
+
+# dtypes of the merged kernel table
+KERNEL_SCHEMA = {
+    'name': 'category',
+    'ts': 'int64',
+    'dur': 'int64',
+    'ts_cuda_runtime': 'int64',
+    'name_cpu_op': 'category',
+    'operator-name': 'category',
+    'layer': 'Int16',
+    'iteration': 'Int32',
+    'gpu': 'int16',
+}
+
+
+def _code_dtype(n: int) -> type:
+    """Integer type pandas uses for the codes of n categories."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def categorical(codes: np.ndarray, categories: Sequence[str]) -> pd.Categorical:
+    """Categorical of categories[code] (-1: missing) with sorted categories.
+
+    Groupbys and sorts order a categorical by its categories, so keeping
+    them sorted makes results come out in the same order as plain strings.
+    """
+    categories = np.asarray(categories, dtype=object)
+    order = np.argsort(categories, kind='stable')
+    if (order[1:] < order[:-1]).any():
+        rank = np.empty(len(order) + 1, dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        rank[-1] = -1
+        codes, categories = rank[codes], categories[order]
+    return pd.Categorical.from_codes(codes, categories=categories.tolist(), validate=False)
+
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast the KERNEL_SCHEMA columns of df to their compact dtypes.
+
+    Tables from older merges hold object strings and float layer/iteration
+    columns; this converts them. Other columns are left as they are.
+    Categories come out sorted (see categorical).
+    """
+    dtypes = {c: t for c, t in KERNEL_SCHEMA.items() if c in df.columns and df[c].dtype != t}
+    return df.astype(dtypes) if dtypes else df
+
+
+def save_column(values: pd.Series, outdir: str, stem: str) -> tuple:
+    """Write one column under outdir as stem.npy (plus stem.mask.npy).
+
+    Returns:
+        (file, categories, mask file) spec; categories is None for numeric
+        columns and the mask file is None unless the column is a nullable
+        integer
+    """
+    fn = f'{stem}.npy'
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        values = pd.Series(categorical(values.cat.codes.to_numpy(), dtype.categories))
+        cats = values.cat.categories.tolist()
+        np.save(os.path.join(outdir, fn), values.cat.codes.to_numpy().astype(_code_dtype(len(cats))))
+        return fn, cats, None
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype) and dtype.kind in 'iu':
+        np.save(os.path.join(outdir, fn), values.to_numpy(dtype=dtype.numpy_dtype, na_value=0))
+        np.save(os.path.join(outdir, f'{stem}.mask.npy'), values.isna().to_numpy())
+        return fn, None, f'{stem}.mask.npy'
+    if dtype.kind in 'biuf':
+        np.save(os.path.join(outdir, fn), values.to_numpy())
+        return fn, None, None
+    # Missing values get code -1
+    codes, uniques = pd.factorize(values, sort=True)
+    cats = uniques.tolist()
+    np.save(os.path.join(outdir, fn), codes.astype(_code_dtype(len(cats))))
+    return fn, cats, None
+
+
+def load_column(outdir: str, spec: tuple, rows: Optional[np.ndarray] = None):
+    """Read back a save_column column, memory-mapped unless rows are given.
+
+    Args:
+        outdir: Directory the spec's files are relative to
+        spec: (file, categories, mask file) from save_column
+        rows: Rows to read (default: all, without copying)
+
+    Returns:
+        ndarray, Categorical or IntegerArray
+    """
+    fn, cats, mask = spec
+    values = np.load(os.path.join(outdir, fn), mmap_mode='r')
+    if rows is not None:
+        values = values[rows]
+    if cats is not None:
+        # save_column wrote sorted categories, so codes are used as they are
+        return pd.Categorical.from_codes(values, categories=cats, validate=False)
+    if mask is not None:
+        missing = np.load(os.path.join(outdir, mask), mmap_mode='r')
+        return pd.arrays.IntegerArray(values, missing if rows is None else missing[rows])
+    return values
+
+
+def write_store(df: pd.DataFrame, path: str) -> None:
+    """Write a kernel table as a store partitioned by gpu and iteration.
+
+    Columns are cast to KERNEL_SCHEMA first. The store is built in a scratch
+    directory next to path and renamed into place, replacing any existing
+    store at path.
+
+    Args:
+        df: Kernel table with at least a 'ts' column
+        path: Output directory
+    """
+    order, partitions = partition(df)
+    parent = os.path.dirname(os.path.abspath(path))
+    scratch = tempfile.mkdtemp(dir=parent, prefix='.partial-')
+    try:
+        df = compact(df).take(order)
+        columns: Dict[str, tuple] = {}
+        for i, col in enumerate(df.columns):
+            columns[col] = save_column(df[col], scratch, str(i))
+        meta = {
+            'version': STORE_VERSION,
+            'rows': len(df),
+            'columns': columns,
+            'partitions': partitions,
+        }
+        with open(os.path.join(scratch, META), 'wb') as f:
+            pickle.dump(meta, f)
+        TraceIndex.build(df.reset_index(drop=True)).save(os.path.join(scratch, INDEX))
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.rename(scratch, path)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def read_meta(path: str) -> dict:
+    """Load a store's meta.pkl."""
+    with open(os.path.join(path, META), 'rb') as f:
+        meta = pickle.load(f)
+    assert meta['version'] == STORE_VERSION, f"{path}: store version {meta['version']}, expected {STORE_VERSION}"
+    return meta
+
+
+def read_store(
+    path: str,
+    columns: Optional[List[str]] = None,
+    gpus: Optional[Sequence[int]] = None,
+    iterations: Optional[Sequence[int]] = None,
+    iter_idxs: Optional[Sequence[int]] = None,
+    mmap: bool = False,
+) -> pd.DataFrame:
+    """Read the selected columns and partitions of a store.
+
+    Only the requested column files are opened, and only the row ranges of
+    matching partitions are read from them. Rows are returned in ts order,
+    matching the single-pickle layout.
+
+    With mmap=True nothing is copied: columns are read-only views of the
+    memory-mapped files (Categoricals and IntegerArrays wrap mapped codes
+    and masks), so the data lives in the page cache and is shared by every
+    process that maps it. Rows then stay in store order (grouped by gpu and
+    iteration, ts-sorted within each). Predicates still apply, at the cost
+    of copying the selected rows.
+
+    Args:
+        path: Store directory
+        columns: Columns to read (default: all)
+        gpus: GPU ids to keep
+        iterations: Iteration numbers to keep
+        iter_idxs: Iteration positions to keep, as in load.select_iters
+        mmap: Map the column files instead of reading them
+
+    Returns:
+        DataFrame with the selected rows and columns
+    """
+    meta = read_meta(path)
+    spec = meta['columns']
+    if columns is None:
+        columns = list(spec)
+    missing = [c for c in columns if c not in spec]
+    assert not missing, f"{path}: no columns {missing}"
+
+    rows = select_rows(meta['partitions'], gpus, iterations, iter_idxs)
+    if not mmap:
+        ts = load_column(path, spec['ts'], rows)
+        order = np.argsort(ts, kind='stable')
+        rows = rows[order] if rows is not None else order
+
+    data = {col: load_column(path, spec[col], rows) for col in columns}
+    return pd.DataFrame(data, columns=columns, copy=False)
+
+
+def iter_store(
+    path: str,
+    columns: Optional[List[str]] = None,
+    gpus: Optional[Sequence[int]] = None,
+    iter_idxs: Optional[Sequence[int]] = None,
+    chunk_rows: int = 1 << 22,
+) -> Iterator[tuple]:
+    """Read the selected columns and partitions of a store a chunk at a time.
+
+    Chunks follow store order (see read_store) and are copied out of the
+    memory-mapped column files, so only one chunk is held in memory. At
+    least one chunk is yielded, empty if no rows match.
+
+    Args:
+        path: Store directory
+        columns: Columns to read (default: all)
+        gpus: GPU ids to keep
+        iter_idxs: Iteration positions to keep, as in load.select_iters
+        chunk_rows: Maximum rows per chunk
+
+    Yields:
+        (rows, chunk): store positions of the chunk's rows, and the chunk
+    """
+    meta = read_meta(path)
+    spec = meta['columns']
+    if columns is None:
+        columns = list(spec)
+    missing = [c for c in columns if c not in spec]
+    assert not missing, f"{path}: no columns {missing}"
+
+    rows = select_rows(meta['partitions'], gpus, None, iter_idxs)
+    if rows is None:
+        rows = np.arange(meta['rows'], dtype=np.int64)
+    for lo in range(0, max(len(rows), 1), chunk_rows):
+        chunk = rows[lo:lo + chunk_rows]
+        data = {col: load_column(path, spec[col], chunk) for col in columns}
+        yield chunk, pd.DataFrame(data, columns=columns, copy=False)
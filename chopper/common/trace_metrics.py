@@ -1,33 +1,110 @@
 """Metric derivation functions for trace analysis."""
 
 import numpy as np
-from pandas import DataFrame
+from pandas import DataFrame, MultiIndex, Series
+from typing import Optional, Sequence
 
+from chopper.common.intervals import union_overlap
 
-def derive_launch_overhead(df: DataFrame) -> DataFrame:
-    """Compute kernel launch overhead (gap between kernel completions).
 
-    Calculates the time gap between the end of one kernel and the start
-    of the next kernel on the same GPU within the same iteration.
+OVERHEADS = ('Launch Overhead', 'Prep Overhead', 'Call Overhead')
+
+
+def derive_overheads(
+    df: DataFrame,
+    metrics: Optional[Sequence[str]] = None,
+    iter_start: Optional[Series] = None,
+    scale: float = 1e-6,
+) -> DataFrame:
+    """Compute launch, prep and call overhead of every kernel in one pass.
+
+    Sorts by (gpu, iteration, ts) once and takes each kernel's predecessor
+    from the shifted end times, instead of a groupby().shift() per metric.
+    Within an iteration, with prev_end the end of the previous kernel:
+
+    - Launch Overhead: ts - prev_end (the idle gap), at least 0
+    - Prep Overhead: ts_cuda_runtime - prev_end, at least 0
+    - Call Overhead: ts - ts_cuda_runtime, capped at the idle gap
+
+    The first kernel of an iteration has no predecessor: its launch and
+    prep overhead are 0 and its call overhead is uncapped. With iter_start,
+    its idle gap is measured from the iteration start instead: launch
+    overhead becomes that gap and prep overhead the gap minus the call
+    overhead. Kernels without a gpu or iteration get NaN.
 
     Args:
-        df: DataFrame with 'gpu', 'iteration', 'ts', and 'dur' columns
+        df: DataFrame with 'gpu', 'iteration', 'ts' and 'dur' columns, and
+            'ts_cuda_runtime' for prep and call overhead
+        metrics: Columns to add, from OVERHEADS (default: all that df
+            has the inputs for)
+        iter_start: Start ts of each iteration, indexed by (gpu, iteration),
+            e.g. the first kernel including communication
+        scale: Factor from ts units to the output unit (default ns to ms)
 
     Returns:
-        DataFrame with added 'Launch Overhead' column in milliseconds
+        DataFrame sorted by (gpu, iteration, ts) with the metric columns added
     """
     grp = ['gpu', 'iteration']
+    if metrics is None:
+        metrics = OVERHEADS if 'ts_cuda_runtime' in df.columns else OVERHEADS[:1]
+    assert 'ts_cuda_runtime' in df.columns or list(metrics) == ['Launch Overhead'], \
+        f"{metrics} need a 'ts_cuda_runtime' column"
     df = df.sort_values(grp + ['ts']).reset_index(drop=True)
 
-    prev_end_time = (df.groupby(grp)['ts'].shift(1) +
-                     df.groupby(grp)['dur'].shift(1))
+    ts = df['ts'].to_numpy()
+    end = ts + df['dur'].to_numpy()
+    gpu = df['gpu'].to_numpy(dtype=np.float64, na_value=np.nan)
+    iteration = df['iteration'].to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = ~(np.isnan(gpu) | np.isnan(iteration))
+    # Missing keys sort last, so a valid kernel never follows a missing one
+    first = valid.copy()
+    first[1:] &= (gpu[1:] != gpu[:-1]) | (iteration[1:] != iteration[:-1])
+    has_prev = valid & ~first
+
+    gap = np.full(len(df), np.nan)
+    gap[1:] = ts[1:] - end[:-1]
+    gap[~has_prev] = np.nan
+    gap = np.maximum(0, gap)
+    if iter_start is not None:
+        start = iter_start.reindex(MultiIndex.from_arrays([df[c][first] for c in grp])).to_numpy(dtype=np.float64)
+        first_gap = np.maximum(0, ts[first] - start)
+    else:
+        first_gap = np.zeros(first.sum())
+
+    if 'ts_cuda_runtime' in df.columns:
+        runtime = df['ts_cuda_runtime'].to_numpy()
+        call = (ts - runtime).astype(float)
+        call[has_prev] = np.minimum(call[has_prev], gap[has_prev])
+        call[~valid] = np.nan
+    if 'Launch Overhead' in metrics:
+        launch = gap.copy()
+        launch[first] = first_gap
+        df['Launch Overhead'] = launch * scale
+    if 'Prep Overhead' in metrics:
+        prep = np.full(len(df), np.nan)
+        prep[1:] = runtime[1:] - end[:-1]
+        prep[~has_prev] = np.nan
+        prep = np.maximum(0, prep)
+        prep[first] = first_gap - call[first] if iter_start is not None else 0
+        df['Prep Overhead'] = prep * scale
+    if 'Call Overhead' in metrics:
+        df['Call Overhead'] = call * scale
+    return df
 
-    df['Launch Overhead'] = np.maximum(
-        0, df['ts'] - prev_end_time).astype(float) * 1e-6
 
-    df.loc[df.groupby(grp).head(1).index, 'Launch Overhead'] = 0
+def derive_launch_overhead(df: DataFrame) -> DataFrame:
+    """Compute kernel launch overhead (gap between kernel completions).
+
+    Calculates the time gap between the end of one kernel and the start
+    of the next kernel on the same GPU within the same iteration.
 
-    return df
+    Args:
+        df: DataFrame with 'gpu', 'iteration', 'ts', and 'dur' columns
+
+    Returns:
+        DataFrame with added 'Launch Overhead' column in milliseconds
+    """
+    return derive_overheads(df, ['Launch Overhead'])
 
 
 def derive_prep_overhead(df: DataFrame) -> DataFrame:
@@ -43,17 +120,7 @@ def derive_prep_overhead(df: DataFrame) -> DataFrame:
     Returns:
         DataFrame with added 'Prep Overhead' column in milliseconds
     """
-    grp = ['gpu', 'iteration']
-    df = df.sort_values(grp + ['ts']).reset_index(drop=True)
-
-    prev_end_time = (df.groupby(grp)['ts'].shift(1) +
-                     df.groupby(grp)['dur'].shift(1))
-    df['Prep Overhead'] = np.maximum(
-        0, df['ts_cuda_runtime'] - prev_end_time).astype(float) * 1e-6
-
-    df.loc[df.groupby(grp).head(1).index, 'Prep Overhead'] = 0
-
-    return df
+    return derive_overheads(df, ['Prep Overhead'])
 
 
 def derive_call_overhead(df: DataFrame) -> DataFrame:
@@ -69,22 +136,7 @@ def derive_call_overhead(df: DataFrame) -> DataFrame:
     Returns:
         DataFrame with added 'Call Overhead' column in milliseconds
     """
-    grp = ['gpu', 'iteration']
-    df = df.sort_values(grp + ['ts']).reset_index(drop=True)
-
-    prev_end_time = (df.groupby(grp)['ts'].shift(1) +
-                     df.groupby(grp)['dur'].shift(1))
-
-    tklqt = df['ts'] - df['ts_cuda_runtime']
-    lo = np.maximum(0, df['ts'] - prev_end_time)
-    df['Call Overhead'] = np.minimum(tklqt, lo).astype(float) * 1e-6
-
-    first_idx = df.groupby(grp).head(1).index
-    df.loc[first_idx, 'Call Overhead'] = (
-        (df.loc[first_idx, 'ts'] - df.loc[first_idx, 'ts_cuda_runtime']).astype(float) * 1e-6
-    )
-
-    return df
+    return derive_overheads(df, ['Call Overhead'])
 
 
 def compute_overlap_cdf(
@@ -95,7 +147,8 @@ def compute_overlap_cdf(
     """Compute cumulative distribution of communication overlap ratios.
 
     Analyzes what fraction of computation kernels have communication overlap,
-    producing a CDF for visualization.
+    producing a CDF for visualization. Overlap is measured against the union
+    of the GPU's communication kernels (see intervals.union_overlap).
 
     Args:
         kernel_df: DataFrame containing computation kernels
@@ -103,53 +156,25 @@ def compute_overlap_cdf(
         sort_ratio: If True, sort by overlap ratio before computing CDF
 
     Returns:
-        DataFrame with 'overlap_ratio', 'cdf', and 'op_idx' columns
+        DataFrame with 'overlap_ratio', 'cdf', and 'op_idx' columns, per GPU
+        in GPU order
     """
-    cdf_df = kernel_df.copy().sort_values('ts_first').reset_index()
+    cdf_df = kernel_df.sort_values('ts_first').reset_index()
     cdf_df['end_ts'] = cdf_df['ts_last'] + cdf_df['dur_last']
     cdf_df['elapsed'] = cdf_df['end_ts'] - cdf_df['ts_first']
 
-    ov_df = overlap_df.copy()
-    ov_df['end_ts'] = ov_df['ts'] + ov_df['dur']
-
-    def compute_overlap_ratio(group: DataFrame) -> DataFrame:
-        gpu = group.name
-        gpu_ov = ov_df[ov_df['gpu'] == gpu]
-        ratios = []
-
-        for _, row in group.iterrows():
-            start = row['ts_first']
-            end = row['end_ts']
-            elapsed = row['elapsed']
-
-            overlaps = gpu_ov[
-                (gpu_ov['ts'] <= end) &
-                (gpu_ov['end_ts'] >= start)
-            ]
-
-            total_overlap = 0
-            for _, ov_row in overlaps.iterrows():
-                overlap_start = max(start, ov_row['ts'])
-                overlap_end = min(end, ov_row['end_ts'])
-                overlap = max(0, overlap_end - overlap_start)
-                total_overlap += overlap
-
-            total_overlap = min(elapsed, total_overlap)
-            ratio = 100 * total_overlap / elapsed if elapsed > 0 else 0
-            ratios.append(ratio)
-
-        group = group.copy()
-        group['overlap_ratio'] = ratios
-        sort_by = ['ts_first']
-        if sort_ratio:
-            sort_by = ['overlap_ratio'] + sort_by
-
-        group = group.sort_values(
-            sort_by).reset_index(drop=True)
-        group['cdf'] = 100 * (group.index + 1) / len(group)
-        group['op_idx'] = group.index
-        return group
-
-    return cdf_df.groupby('gpu').apply(
-        compute_overlap_ratio
-    ).reset_index(drop=True)
+    # Time covered by several overlapping kernels counts once
+    overlap = union_overlap(
+        cdf_df['ts_first'].to_numpy(), cdf_df['end_ts'].to_numpy(), cdf_df['gpu'].to_numpy(),
+        overlap_df['ts'].to_numpy(), (overlap_df['ts'] + overlap_df['dur']).to_numpy(), overlap_df['gpu'].to_numpy(),
+    )
+    elapsed = cdf_df['elapsed'].to_numpy()
+    cdf_df['overlap_ratio'] = np.where(elapsed > 0, 100 * overlap / np.maximum(elapsed, 1), 0.0)
+
+    sort_by = ['gpu', 'overlap_ratio', 'ts_first'] if sort_ratio else ['gpu', 'ts_first']
+    cdf_df = cdf_df.sort_values(sort_by, kind='stable').reset_index(drop=True)
+    by_gpu = cdf_df.groupby('gpu')
+    op_idx = by_gpu.cumcount()
+    cdf_df['cdf'] = 100 * (op_idx + 1) / by_gpu['gpu'].transform('size')
+    cdf_df['op_idx'] = op_idx
+    return cdf_df
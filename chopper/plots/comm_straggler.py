@@ -12,11 +12,45 @@ from matplotlib.figure import Figure
 
 from chopper.common.colors import rgb
 from chopper.common.cache import load_pickle
+from chopper.common.load import load_configs
 from chopper.common.annotations import (
     PaperMode, apply_paper_rcparams, paper_figsize, assign_chunks, fix_names,
 )
 
 
+def _load_config(ts_file: str, iteration: int):
+    """AG/RS kernel durations of one config in one iteration (see get_data)."""
+    df = load_pickle(ts_file, columns=["name", "operator-name", "gpu", "iteration", "ts", "dur"])
+    df = df[~df["iteration"].isna()]
+    df = assign_chunks(df)
+    df = fix_names(df)
+
+    iters = sorted(df["iteration"].unique())
+    it_val = iters[iteration]
+    it = df[df["iteration"] == it_val]
+
+    nccl = it[it["name"].str.startswith("ncclDevKernel", na=False)]
+
+    ag_mask = (
+        nccl["operator-name"].str.contains("all_gather", na=False)
+        & ~nccl["operator-name"].str.startswith("b_", na=False)
+    )
+    rs_mask = (
+        nccl["operator-name"].str.contains("post_backward_reduce", na=False)
+        | nccl["operator-name"].str.startswith("b_FSDP::pre_forward", na=False)
+    )
+
+    nccl.loc[ag_mask, "comm_type"] = "AG"
+    nccl.loc[rs_mask, "comm_type"] = "RS"
+    nccl = nccl[nccl["comm_type"].isin(["AG", "RS"])]
+
+    nccl = nccl.sort_values(["gpu", "ts"])
+    nccl["kernel_idx"] = nccl.groupby("gpu").cumcount()
+    nccl["dur_ms"] = nccl["dur"] * 1e-6
+
+    return nccl[["gpu", "kernel_idx", "dur_ms", "comm_type"]]
+
+
 def get_data(
     ts_files: list[str] = ["./ts.pkl"],
     configs: list[str] = ["default"],
@@ -36,39 +70,7 @@ def get_data(
         Dict mapping config -> DataFrame with columns:
         gpu, kernel_idx, dur_ms, comm_type
     """
-    data = {}
-    for ts_file, config in zip(ts_files, configs):
-        df = load_pickle(ts_file)
-        df = df[~df["iteration"].isna()]
-        df = assign_chunks(df)
-        df = fix_names(df)
-
-        iters = sorted(df["iteration"].unique())
-        it_val = iters[iteration]
-        it = df[df["iteration"] == it_val].copy()
-
-        nccl = it[it["name"].str.startswith("ncclDevKernel", na=False)].copy()
-
-        ag_mask = (
-            nccl["operator-name"].str.contains("all_gather", na=False)
-            & ~nccl["operator-name"].str.startswith("b_", na=False)
-        )
-        rs_mask = (
-            nccl["operator-name"].str.contains("post_backward_reduce", na=False)
-            | nccl["operator-name"].str.startswith("b_FSDP::pre_forward", na=False)
-        )
-
-        nccl.loc[ag_mask, "comm_type"] = "AG"
-        nccl.loc[rs_mask, "comm_type"] = "RS"
-        nccl = nccl[nccl["comm_type"].isin(["AG", "RS"])]
-
-        nccl = nccl.sort_values(["gpu", "ts"])
-        nccl["kernel_idx"] = nccl.groupby("gpu").cumcount()
-        nccl["dur_ms"] = nccl["dur"] * 1e-6
-
-        data[config] = nccl[["gpu", "kernel_idx", "dur_ms", "comm_type"]].copy()
-
-    return data
+    return load_configs(_load_config, ts_files, configs, iteration)
 
 
 def draw(
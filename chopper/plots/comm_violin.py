@@ -12,9 +12,44 @@ from matplotlib.ticker import MaxNLocator
 
 from chopper.common.colors import rgb
 from chopper.common.cache import load_pickle
+from chopper.common.load import load_configs
 from chopper.common.annotations import (
     PaperMode, apply_paper_rcparams, paper_figsize, no_overlap_mask, assign_chunks,
 )
+
+
+def _load_config(ts_file: str) -> dict:
+    """Comm kernel durations of one config per (gpu, iteration), by kind."""
+    df = load_pickle(ts_file, columns=["name", "operator-name", "gpu", "iteration", "layer", "dur"])
+    df = df[df["iteration"].notna() & df["layer"].notna()]
+    last_iter = df["iteration"].max()
+    df = df[df["iteration"] != last_iter]
+
+    df = assign_chunks(df)
+    overlap_mask = no_overlap_mask(df)
+    nccl_mask = df["name"].str.startswith("ncclDevKernel", na=False)
+
+    allgather_mask = nccl_mask & df["operator-name"].str.contains("all_gather", na=False)
+    reduce_scatter_mask = nccl_mask & (
+        df["operator-name"].str.contains("post_backward_reduce", na=False)
+        | df["operator-name"].str.startswith("b_FSDP::pre_forward", na=False)
+    )
+    other_mask = ~overlap_mask & ~allgather_mask & ~reduce_scatter_mask
+
+    overlaps = {
+        "ag": allgather_mask,
+        "rs": reduce_scatter_mask,
+        "other": other_mask,
+    }
+    ov_dfs = {}
+    for ov, ov_mask in overlaps.items():
+        ov_dfs[ov] = df[ov_mask].groupby(
+            ["gpu", "iteration", "layer", "operator-name"], dropna=False, observed=True
+        ).agg(dur=("dur", "sum")).reset_index()
+        ov_dfs[ov]["Duration"] = ov_dfs[ov]["dur"].astype(float) * 1e-6
+    return ov_dfs
+
+
 def get_data(
     ts_files: list[str] = ["./ts.pkl"],
     configs: list[str] = ["default"],
@@ -32,39 +67,12 @@ def get_data(
     Returns:
         Dict mapping config -> {"ag", "rs", "other"} -> aggregated DataFrame
     """
-    data = {config: load_pickle(fn) for config, fn in zip(configs, ts_files)}
-    overlap_data = {config: {} for config in configs}
+    overlap_data = load_configs(_load_config, ts_files, configs)
 
     overlaps_keys = ("ag", "rs", "other")
     max_dur = 0
-    for setup in configs:
-        df = data[setup]
-        df = df[df["iteration"].notna() & df["layer"].notna()].copy()
-        last_iter = df["iteration"].max()
-        df = df[df["iteration"] != last_iter]
-
-        df = assign_chunks(df)
-        overlap_mask = no_overlap_mask(df)
-        nccl_mask = df["name"].str.startswith("ncclDevKernel", na=False)
-
-        allgather_mask = nccl_mask & df["operator-name"].str.contains("all_gather", na=False)
-        reduce_scatter_mask = nccl_mask & (
-            df["operator-name"].str.contains("post_backward_reduce", na=False)
-            | df["operator-name"].str.startswith("b_FSDP::pre_forward", na=False)
-        )
-        other_mask = ~overlap_mask & ~allgather_mask & ~reduce_scatter_mask
-
-        overlaps = {
-            "ag": allgather_mask,
-            "rs": reduce_scatter_mask,
-            "other": other_mask,
-        }
-        for ov, ov_mask in overlaps.items():
-            ov_df = df[ov_mask].groupby(
-                ["gpu", "iteration", "layer", "operator-name"], dropna=False
-            ).agg(dur=("dur", "sum")).reset_index()
-            ov_df["Duration"] = ov_df["dur"].astype(float) * 1e-6
-            overlap_data[setup][ov] = ov_df
+    for ov_dfs in overlap_data.values():
+        for ov_df in ov_dfs.values():
             max_dur = max(max_dur, ov_df["Duration"].max())
 
     for setup in configs:
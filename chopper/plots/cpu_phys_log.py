@@ -51,7 +51,7 @@ def draw(
         paper_mode: PaperMode settings for publication-quality figures
     """
     df, lp_cpu = input_data
-    df = df.copy()
+    df = df.copy(deep=False)
     df["samp_idx"] = (df["ts"] != df["ts"].shift()).cumsum() - 1
     df["phys_cpu"] = df["cpu"].apply(lambda log_cpu: lp_cpu[log_cpu])
 
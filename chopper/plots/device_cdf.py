@@ -16,8 +16,10 @@ from matplotlib.figure import Figure
 from chopper.common.annotations import (
     PaperMode,
     apply_paper_rcparams,
+    kernel_classes,
     paper_figsize,
 )
+from chopper.common.index import TraceIndex
 from chopper.common.rocm_metrics import derive_tensor_util_rocm
 
 
@@ -37,30 +39,24 @@ def get_data(
     samples = group["samples"]
     kernels = group["kernels"]
 
-    gpu_samples = samples[samples["gpu"] == target_gpu].copy()
+    gpu_samples = samples[samples["gpu"] == target_gpu]
     gpu_samples = gpu_samples.sort_values("timestamp_ns").reset_index(drop=True)
-    gpu_kernels = kernels[kernels["gpu"] == target_gpu].copy()
+    gpu_kernels = kernels[kernels["gpu"] == target_gpu]
 
     # Derive MFMA util
     derive_tensor_util_rocm(gpu_samples)
     gpu_samples.rename(columns={"Tensor Util": "mfma_util"}, inplace=True)
 
     # Classify kernels
-    gpu_kernels["type"] = "other"
-    gpu_kernels.loc[gpu_kernels["name"].str.contains("Cijk", na=False), "type"] = "gemm"
-    gpu_kernels.loc[gpu_kernels["name"].str.contains("nccl", na=False, case=False), "type"] = "nccl"
+    gpu_kernels["type"] = kernel_classes(gpu_kernels["name"])
 
     gemm = gpu_kernels[gpu_kernels["type"] == "gemm"]
     nccl = gpu_kernels[gpu_kernels["type"] == "nccl"]
 
+    # A binary search per sample in each class's interval index
     ts = gpu_samples["timestamp_ns"].values
-    gemm_active = np.zeros(len(gpu_samples), dtype=bool)
-    nccl_active = np.zeros(len(gpu_samples), dtype=bool)
-
-    for _, row in gemm.iterrows():
-        gemm_active |= (ts >= row["ts"]) & (ts <= row["ts"] + row["dur"])
-    for _, row in nccl.iterrows():
-        nccl_active |= (ts >= row["ts"]) & (ts <= row["ts"] + row["dur"])
+    gemm_active = TraceIndex.build(gemm).active_at(target_gpu, ts)
+    nccl_active = TraceIndex.build(nccl).active_at(target_gpu, ts)
 
     return {
         "gemm_only": gpu_samples.loc[gemm_active & ~nccl_active, "mfma_util"].values,
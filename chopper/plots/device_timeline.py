@@ -17,8 +17,11 @@ import matplotlib.patches as mpatches
 from chopper.common.annotations import (
     PaperMode,
     apply_paper_rcparams,
+    kernel_classes,
     paper_figsize,
+    value_labels,
 )
+from chopper.common.index import TraceIndex
 from chopper.common.rocm_metrics import (
     derive_tensor_util_rocm,
     derive_l2_fabric_read_bw,
@@ -93,11 +96,11 @@ def _derive_metrics(piv, metric):
 def _prepare_group(group_data, target_gpus, metric):
     """Build per-GPU sample time-series for one group."""
     samples = group_data["samples"]
-    kernels = group_data["kernels"].copy()
+    kernels = group_data["kernels"].copy(deep=False)
 
     per_gpu = {}
     for gpu in target_gpus:
-        gpu_samples = samples[samples["gpu"] == gpu].copy()
+        gpu_samples = samples[samples["gpu"] == gpu]
         gpu_samples = gpu_samples.sort_values("timestamp_ns").reset_index(drop=True)
         gpu_samples["dt_ms"] = gpu_samples["timestamp_ns"].diff() / 1e6
         gpu_samples = gpu_samples.iloc[1:].reset_index(drop=True)
@@ -105,9 +108,7 @@ def _prepare_group(group_data, target_gpus, metric):
         per_gpu[gpu] = gpu_samples
 
     # Classify kernels
-    kernels["type"] = "other"
-    kernels.loc[kernels["name"].str.contains("Cijk", na=False), "type"] = "gemm"
-    kernels.loc[kernels["name"].str.contains("nccl", na=False, case=False), "type"] = "nccl"
+    kernels["type"] = kernel_classes(kernels["name"])
 
     # Time normalization
     t0 = kernels["ts"].min()
@@ -167,6 +168,8 @@ def get_data(
     return {
         "per_gpu": per_gpu,
         "kernels": kernels,
+        "index": TraceIndex.build(kernels),
+        "t0": t0,
         "n_gpus": len(all_gpus),
         "panels": panels,
     }
@@ -197,6 +200,23 @@ def _get_window(kernels, samples, last_iters=0):
     return sorted_t[0] - 0.5, sorted_t[-1] + 1.0
 
 
+def _window_rows(kernels, index, t0, t_start, t_span, lo, hi):
+    """Sorted positions of the kernels overlapping the normalized window (lo, hi).
+
+    The interval index narrows every GPU's kernels to those active around
+    the window; the test on t_norm then keeps exactly the rows a scan of
+    the whole table would.
+    """
+    # Back to trace ns, widened by a tick so rounding cannot drop a kernel
+    a = t0 + int(np.floor((t_start + lo * t_span) * 1e9)) - 1
+    b = t0 + int(np.ceil((t_start + hi * t_span) * 1e9)) + 1
+    rows = np.sort(np.concatenate(
+        [np.empty(0, dtype=np.int64)] + [index.active_rows(g, a, b) for g in index.gpu_ids.tolist()]
+    ))
+    cand = kernels.iloc[rows]
+    return rows[((cand["t_norm_end"] > lo) & (cand["t_norm_start"] < hi)).to_numpy()]
+
+
 def _plot_metric(ax, per_gpu, t_start, t_end, metric, ylabel, color, ylim=None, t_col="t_sec"):
     """Plot each GPU as a separate line with same color and alpha."""
     n_gpus = len(per_gpu)
@@ -339,10 +359,11 @@ def draw(
             gap_ax.set_visible(False)
 
     # Classify kernels in full window (using normalized time)
-    wk = kernels[(kernels["t_norm_end"] > 0) &
-                  (kernels["t_norm_start"] < 1)].copy()
-    wk["ktype"] = [_classify_kernel_type(n, o) for n, o in zip(wk["name"], wk["operator-name"])]
-    wk["phase"] = wk["operator-name"].apply(_classify_phase)
+    index, t0 = input_data["index"], input_data["t0"]
+    w_rows = _window_rows(kernels, index, t0, t_start, t_span, 0, 1)
+    wk = kernels.iloc[w_rows]
+    wk["ktype"] = value_labels(_classify_kernel_type, wk["name"], wk["operator-name"])
+    wk["phase"] = value_labels(_classify_phase, wk["operator-name"])
 
     phase_colors = {"fwd": "#2ecc71", "bwd": "#e74c3c", "opt": "#f39c12"}
     phase_labels = {"fwd": "Forward", "bwd": "Backward", "opt": "Optimizer"}
@@ -375,7 +396,8 @@ def draw(
             ax_idx += 1
 
         # Phase backgrounds on all panels for this range
-        rk = wk[(wk["t_norm_end"] > vs) & (wk["t_norm_start"] < ve)]
+        r_rows = _window_rows(kernels, index, t0, t_start, t_span, vs, ve)
+        rk = wk.iloc[np.searchsorted(w_rows, np.intersect1d(w_rows, r_rows))]
         for phase, color in phase_colors.items():
             phase_k = rk[rk["phase"] == phase]
             if len(phase_k) == 0:
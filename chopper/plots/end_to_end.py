@@ -11,10 +11,47 @@ from matplotlib.figure import Figure
 from matplotlib.ticker import MaxNLocator
 
 from chopper.common.colors import okabe_ito
-from chopper.common.load import get_df
+from chopper.common.load import get_df, load_configs
+from chopper.common.trace_metrics import derive_overheads
 from chopper.common.annotations import PaperMode, apply_paper_rcparams, paper_figsize
 
 
+def _load_config(ts_file: str):
+    """Per-kernel launch overhead, then kernels grouped per operator, for one config."""
+    # Load all kernels first to get iteration start timestamps
+    all_df = get_df(ts_file, iter_idxs=None, columns=["gpu", "iteration", "ts"])
+    iter_start = all_df.groupby(["gpu", "iteration"])["ts"].min()
+
+    df = get_df(
+        ts_file,
+        iter_idxs=None,
+        assign_chunks=True,
+        assign_optype=True,
+        remove_nan_chunks=True,
+        remove_overlap=True,
+        fix_names=True,
+    )
+    # Per-kernel launch overhead (intra-iteration only); the first
+    # compute kernel counts its gap from the first kernel (including comm)
+    df = derive_overheads(
+        df, ["Launch Overhead"], iter_start=iter_start, scale=1
+    ).rename(columns={"Launch Overhead": "launch_overhead"})
+
+    # Now group, summing launch_overhead alongside dur/ts
+    return df.groupby(
+        ["gpu", "chunk", "iteration", "layer",
+         "operator-type", "operator-name", "name"],
+        dropna=False,
+        observed=True,
+    ).agg(
+        dur=("dur", "sum"),
+        dur_last=("dur", "last"),
+        ts_first=("ts", "first"),
+        ts_last=("ts", "last"),
+        launch_overhead=("launch_overhead", "sum"),
+    ).sort_values("ts_first").reset_index()
+
+
 def get_data(
     ts_files: list[str] = ["./ts.pkl"],
     configs: list[str] = ["b1s4"],
@@ -31,50 +68,7 @@ def get_data(
     Returns:
         Dict mapping config name to aggregated DataFrame
     """
-    dfs = {}
-    for ts_file, config in zip(ts_files, configs):
-        # Load all kernels first to get iteration start timestamps
-        all_df = get_df(ts_file, iter_idxs=None)
-        iter_start = all_df.groupby(["gpu", "iteration"])["ts"].min()
-
-        df = get_df(
-            ts_file,
-            iter_idxs=None,
-            assign_chunks=True,
-            assign_optype=True,
-            remove_nan_chunks=True,
-            remove_overlap=True,
-            fix_names=True,
-        )
-        # Compute per-kernel launch overhead (intra-iteration only)
-        df = df.sort_values(["gpu", "iteration", "ts"]).reset_index(drop=True)
-        prev_end = (
-            df.groupby(["gpu", "iteration"])["ts"].shift(1)
-            + df.groupby(["gpu", "iteration"])["dur"].shift(1)
-        )
-        df["launch_overhead"] = np.maximum(0, df["ts"] - prev_end)
-        # First compute kernel: gap from first kernel (including comm)
-        first_idx = df.groupby(["gpu", "iteration"]).head(1).index
-        for idx in first_idx:
-            row = df.loc[idx]
-            start_ts = iter_start.loc[(row["gpu"], row["iteration"])]
-            df.loc[idx, "launch_overhead"] = max(0, row["ts"] - start_ts)
-
-        # Now group, summing launch_overhead alongside dur/ts
-        df = df.groupby(
-            ["gpu", "chunk", "iteration", "layer",
-             "operator-type", "operator-name", "name"],
-            dropna=False,
-        ).agg(
-            dur=("dur", "sum"),
-            dur_last=("dur", "last"),
-            ts_first=("ts", "first"),
-            ts_last=("ts", "last"),
-            launch_overhead=("launch_overhead", "sum"),
-        ).sort_values("ts_first").reset_index()
-
-        dfs[config] = df
-    return dfs
+    return load_configs(_load_config, ts_files, configs)
 
 
 def draw(
@@ -9,10 +9,31 @@ import matplotlib.patches as mpatches
 from matplotlib.figure import Figure
 
 from chopper.common.colors import rgb
-from chopper.common.load import get_df
+from chopper.common.load import TraceQuery, load_configs
 from chopper.common.annotations import PaperMode, apply_paper_rcparams, paper_figsize
 
 
+def _load_config(ts_file: str, ops: tuple):
+    """Kernels of the given GEMM operators in one config, grouped per operator."""
+    group_arr = ["iteration", "layer", "operator-name"]
+    return (
+        TraceQuery(ts_file)
+        .with_chunks()
+        .without_overlap()
+        .with_fixed_names()
+        .for_operators(*ops)
+        .group_by(
+            ["gpu"] + group_arr,
+            {
+                "ts": ["first", "last"],
+                "dur": ["sum", "last"],
+            },
+            sort_value="ts_first",
+        )
+        .collect()
+    )
+
+
 def get_data(
     ts_files: list[str] = ["./ts.pkl"],
     configs: list[str] = ["default"],
@@ -37,25 +58,8 @@ def get_data(
         Tuple of (data, fops, bops) where data maps config -> aggregated DataFrame
         normalized by global maximum elapsed time
     """
-    group_arr = ["iteration", "layer", "operator-name"]
-    data = {}
-    for ts_file, config in zip(ts_files, configs):
-        df = get_df(
-            ts_file,
-            assign_chunks=True,
-            remove_nan_chunks=True,
-            remove_overlap=True,
-            fix_names=True,
-            group_arr=["gpu"] + group_arr,
-            group_map={
-                "ts": ["first", "last"],
-                "dur": ["sum", "last"],
-            },
-            sort_value="ts_first",
-        )
-        data[config] = df
+    data = load_configs(_load_config, ts_files, configs, tuple(bops) + tuple(fops))
 
-    ops = tuple(bops) + tuple(fops)
     max_dur = 0
     for setup in data.keys():
         data[setup]["elapsed_time"] = (
@@ -63,12 +67,10 @@ def get_data(
         )
         data[setup] = (
             data[setup]
-            .groupby(["gpu", "iteration", "operator-name"], dropna=False)
+            .groupby(["gpu", "iteration", "operator-name"], dropna=False, observed=True)
             .agg(elapsed_time=("elapsed_time", "sum"))
             .reset_index()
         )
-        op_mask = data[setup]["operator-name"].isin(ops)
-        data[setup] = data[setup][op_mask]
         max_dur = max(data[setup]["elapsed_time"].max(), max_dur)
 
     for setup in data.keys():
@@ -9,6 +9,7 @@ from matplotlib import rcParams
 
 from chopper.common.colors import rgb
 from chopper.common.cache import load_pickle
+from chopper.common.load import load_configs
 from chopper.common.annotations import (
     PaperMode,
     apply_paper_rcparams,
@@ -17,10 +18,7 @@ from chopper.common.annotations import (
     assign_chunks,
     fix_names,
 )
-from chopper.common.trace_metrics import (
-    derive_prep_overhead,
-    derive_call_overhead,
-)
+from chopper.common.trace_metrics import derive_overheads
 
 
 def agg(
@@ -51,7 +49,7 @@ def agg(
             df = derive_col(df)
 
     df_summed = (
-        df.groupby(group_arr, dropna=False)
+        df.groupby(group_arr, dropna=False, observed=True)
         .agg(
             {
                 **sum_cols_map,
@@ -81,21 +79,56 @@ def _load_device_kernels(path):
     return data["groups"][0]["kernels"]
 
 
-def _derive_gap_overhead(df):
-    """Compute total inter-kernel gap when ts_cuda_runtime is unavailable.
+def _load_config(ts_file: str):
+    """Median launch overhead per operator for one config (see get_data)."""
+    df = load_pickle(ts_file)
+    if isinstance(df, dict) and "groups" in df:
+        df = _load_device_kernels(ts_file)
 
-    Returns DataFrame with 'Launch Overhead' column (ms) -- the positive
-    gap between previous kernel end and current kernel start.
-    """
-    grp = ['gpu', 'iteration']
-    df = df.sort_values(grp + ['ts']).reset_index(drop=True)
+    has_cuda_ts = "ts_cuda_runtime" in df.columns
+
+    if has_cuda_ts:
+        metrics = ("Prep Overhead", "Call Overhead")
+    else:
+        metrics = ("Launch Overhead",)
 
-    prev_end = (df.groupby(grp)['ts'].shift(1) +
-                df.groupby(grp)['dur'].shift(1))
-    df['Launch Overhead'] = np.maximum(0, df['ts'] - prev_end).astype(float) * 1e-6
-    df.loc[df.groupby(grp).head(1).index, 'Launch Overhead'] = 0
+    df["layer"] = df["layer"].fillna(-1)
+    weird_mask = df["iteration"].isna()
+    if weird_mask.any():
+        if has_cuda_ts:
+            assert df[~weird_mask]["ts"].min() > df[weird_mask]["ts"].max(), (
+                "NaN iteration isn't at the start"
+            )
+        df = df[~weird_mask]
 
-    return df
+    df = df[df["name"] != "Memcpy HtoD (Host -> Device)"]
+
+    # First kernel ts per (gpu, iteration) from ALL kernels (including comm)
+    iter_start = df.groupby(["gpu", "iteration"])["ts"].min()
+
+    df = assign_chunks(df)
+    df = df[~df["chunk"].isna()]
+    df = fix_names(df)
+    overlap_mask = no_overlap_mask(df)
+    df = df[overlap_mask]
+
+    # The first compute kernel per iteration counts its gap from the
+    # iteration's first kernel (including comm)
+    df = derive_overheads(df, metrics, iter_start=iter_start)
+
+    # Sum across layers per (gpu, iteration, operator-name)
+    agg_df = (
+        df.groupby(["gpu", "iteration", "operator-name"], observed=True)
+        .agg({m: "sum" for m in metrics})
+        .reset_index()
+    )
+    # Median across (gpu, iteration) per operator
+    op_df = (
+        agg_df.groupby("operator-name", observed=True)
+        .agg({m: "median" for m in metrics})
+        .reset_index()
+    )
+    return op_df
 
 
 def get_data(
@@ -118,78 +151,7 @@ def get_data(
     Returns:
         Dict mapping config names to processed DataFrames with normalized overhead metrics
     """
-    raw = {}
-    for ts_file, config in zip(ts_files, configs):
-        loaded = load_pickle(ts_file)
-        if isinstance(loaded, dict) and "groups" in loaded:
-            raw[config] = _load_device_kernels(ts_file)
-        else:
-            raw[config] = loaded
-
-    data = {}
-    for setup, df in raw.items():
-        has_cuda_ts = "ts_cuda_runtime" in df.columns
-
-        if has_cuda_ts:
-            metrics = ("Prep Overhead", "Call Overhead")
-        else:
-            metrics = ("Launch Overhead",)
-
-        df["layer"] = df["layer"].fillna(-1)
-        weird_mask = df["iteration"].isna()
-        if weird_mask.any():
-            if has_cuda_ts:
-                assert df[~weird_mask]["ts"].min() > df[weird_mask]["ts"].max(), (
-                    "NaN iteration isn't at the start"
-                )
-            df = df[~weird_mask]
-
-        df = df[df["name"] != "Memcpy HtoD (Host -> Device)"]
-
-        # First kernel ts per (gpu, iteration) from ALL kernels (including comm)
-        iter_start = df.groupby(["gpu", "iteration"])["ts"].min()
-
-        df = assign_chunks(df)
-        df = df[~df["chunk"].isna()]
-        df = fix_names(df)
-        overlap_mask = no_overlap_mask(df)
-        df = df[overlap_mask].copy()
-
-        if has_cuda_ts:
-            df = derive_prep_overhead(df)
-            df = derive_call_overhead(df)
-        else:
-            df = _derive_gap_overhead(df)
-
-        # For the first compute kernel per iteration, override with gap
-        # from the iteration's first kernel (including comm)
-        first_idx = df.groupby(["gpu", "iteration"]).head(1).index
-        for idx in first_idx:
-            row = df.loc[idx]
-            start_ts = iter_start.loc[(row["gpu"], row["iteration"])]
-            gap = max(0, row["ts"] - start_ts) * 1e-6
-            if "Prep Overhead" in df.columns:
-                call = df.loc[idx, "Call Overhead"]
-                df.loc[idx, "Prep Overhead"] = gap - call
-                # Call Overhead already set by derive_call_overhead
-            else:
-                df.loc[idx, "Launch Overhead"] = gap
-
-        # Sum across layers per (gpu, iteration, operator-name)
-        agg_df = (
-            df.groupby(["gpu", "iteration", "operator-name"])
-            .agg({m: "sum" for m in metrics})
-            .reset_index()
-        )
-        # Median across (gpu, iteration) per operator
-        op_df = (
-            agg_df.groupby("operator-name")
-            .agg({m: "median" for m in metrics})
-            .reset_index()
-        )
-        data[setup] = op_df
-
-    return data
+    return load_configs(_load_config, ts_files, configs)
 
 
 def draw(
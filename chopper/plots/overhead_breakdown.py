@@ -14,6 +14,7 @@ from matplotlib.ticker import MaxNLocator
 
 from chopper.common.colors import rgb
 from chopper.common.cache import load_pickle
+from chopper.common.load import load_configs
 from chopper.common.annotations import (
     PaperMode, apply_paper_rcparams, paper_figsize,
     no_overlap_mask, assign_chunks, assign_operator_type, fix_names,
@@ -32,7 +33,7 @@ def _agg(df, group_arr, derive_cols_before=None, derive_cols_after=None, sum_col
     if derive_cols_before is not None:
         for derive_col in derive_cols_before:
             df = derive_col(df)
-    df_summed = df.groupby(group_arr, dropna=False).agg({**sum_cols_map}).reset_index()
+    df_summed = df.groupby(group_arr, dropna=False, observed=True).agg({**sum_cols_map}).reset_index()
     df_summed.columns = [
         "_".join(col).strip("_") if col[1] != "sum" else col[0]
         for col in df_summed.columns
@@ -69,39 +70,17 @@ def _calc_thr_flops(bs: int, cl: int) -> dict:
     }
 
 
-def get_data(
-    counter_files: list[str] = ["./counters.pkl"],
-    configs: list[str] = ["default"],
-    target_gpu: int = 0,
-):
-    """Load counters and pre-aggregate per-operator metrics for one GPU.
-
-    For each config, filters to non-overlapping compute kernels of the target
-    GPU, aggregates by (chunk, iteration, operator-name, layer), derives Tensor
-    Flops / Tensor Util / Cycle Duration via rocm_metrics, and additionally
-    computes the per-operator overlap CDF against communication kernels.
-
-    Args:
-        counter_files: List of paths to counters.pkl files
-        configs: Config labels (e.g. "b1s4", "b2s8")
-        target_gpu: Single GPU index to extract (matches paper figure)
-
-    Returns:
-        Dict mapping config -> {"data": agg DataFrame, "cdf": {op -> overlap CDF DataFrame}}
-    """
-    raw = {}
-    for config, fn in zip(configs, counter_files):
-        df = load_pickle(fn)
-        # Filter to iterations that have counter data
-        if "GRBM_GUI_ACTIVE" in df.columns:
-            has_counters = df.groupby("iteration")["GRBM_GUI_ACTIVE"].apply(
-                lambda x: x.notna().any()
-            )
-            counter_iters = has_counters[has_counters].index.tolist()
-            assert len(counter_iters) > 0, f"no iterations with counter data in {fn}"
-            df = df[df["iteration"].isin(counter_iters)]
-        raw[config] = df
-    breakdown_data = {}
+def _load_config(fn: str, target_gpu: int) -> dict:
+    """Per-operator metrics and overlap CDFs of one config (see get_data)."""
+    df = load_pickle(fn)
+    # Filter to iterations that have counter data
+    if "GRBM_GUI_ACTIVE" in df.columns:
+        has_counters = df.groupby("iteration")["GRBM_GUI_ACTIVE"].apply(
+            lambda x: x.notna().any()
+        )
+        counter_iters = has_counters[has_counters].index.tolist()
+        assert len(counter_iters) > 0, f"no iterations with counter data in {fn}"
+        df = df[df["iteration"].isin(counter_iters)]
 
     derive_cols = (
         derive_duration,
@@ -129,38 +108,57 @@ def get_data(
 
     dummy_flops = _calc_thr_flops(1, 4)
 
-    for config in configs:
-        df = raw[config]
-        gpu_mask = df["gpu"] == target_gpu
-        overlap_mask = no_overlap_mask(df)
+    gpu_mask = df["gpu"] == target_gpu
+    overlap_mask = no_overlap_mask(df)
 
-        df = assign_chunks(df)
-        df = assign_operator_type(df)
-        df = fix_names(df)
+    df = assign_chunks(df)
+    df = assign_operator_type(df)
+    df = fix_names(df)
 
-        nan_chunk_mask = df["chunk"].isna()
-        op_mask = df["operator-name"].isin(dummy_flops.keys())
+    nan_chunk_mask = df["chunk"].isna()
+    op_mask = df["operator-name"].isin(dummy_flops.keys())
 
-        agg_data = _agg(
-            df[overlap_mask & gpu_mask & ~nan_chunk_mask & op_mask],
-            ["gpu", "chunk", "iteration", "operator-name", "layer"],
-            derive_cols_after=derive_cols,
-            sum_cols_map=sum_cols_map,
-        )
+    agg_data = _agg(
+        df[overlap_mask & gpu_mask & ~nan_chunk_mask & op_mask],
+        ["gpu", "chunk", "iteration", "operator-name", "layer"],
+        derive_cols_after=derive_cols,
+        sum_cols_map=sum_cols_map,
+    )
 
-        cdf_input_kernels = df[~nan_chunk_mask & gpu_mask & ~overlap_mask]
-        breakdown_data[config] = {
-            "data": agg_data,
-            "cdf": {
-                op: compute_overlap_cdf(
-                    agg_data[agg_data["operator-name"] == op],
-                    cdf_input_kernels,
-                )
-                for op in dummy_flops.keys()
-            },
-        }
+    cdf_input_kernels = df[~nan_chunk_mask & gpu_mask & ~overlap_mask]
+    return {
+        "data": agg_data,
+        "cdf": {
+            op: compute_overlap_cdf(
+                agg_data[agg_data["operator-name"] == op],
+                cdf_input_kernels,
+            )
+            for op in dummy_flops.keys()
+        },
+    }
 
-    return breakdown_data
+
+def get_data(
+    counter_files: list[str] = ["./counters.pkl"],
+    configs: list[str] = ["default"],
+    target_gpu: int = 0,
+):
+    """Load counters and pre-aggregate per-operator metrics for one GPU.
+
+    For each config, filters to non-overlapping compute kernels of the target
+    GPU, aggregates by (chunk, iteration, operator-name, layer), derives Tensor
+    Flops / Tensor Util / Cycle Duration via rocm_metrics, and additionally
+    computes the per-operator overlap CDF against communication kernels.
+
+    Args:
+        counter_files: List of paths to counters.pkl files
+        configs: Config labels (e.g. "b1s4", "b2s8")
+        target_gpu: Single GPU index to extract (matches paper figure)
+
+    Returns:
+        Dict mapping config -> {"data": agg DataFrame, "cdf": {op -> overlap CDF DataFrame}}
+    """
+    return load_configs(_load_config, counter_files, configs, target_gpu)
 
 
 def draw(
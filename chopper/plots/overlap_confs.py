@@ -13,7 +13,7 @@ from matplotlib.figure import Figure
 from matplotlib.ticker import FuncFormatter
 
 from chopper.common.colors import rgb
-from chopper.common.load import get_overlap_df
+from chopper.common.load import get_overlap_df, load_configs
 from chopper.common.annotations import PaperMode, apply_paper_rcparams, paper_figsize
 
 
@@ -42,11 +42,7 @@ def get_data(
         config -> DataFrame of operator entries with normalized 'elapsed'
         and 'op_idx'
     """
-    data = {}
-    for ts_file, config in zip(ts_files, configs):
-        data[config] = get_overlap_df(
-            ts_file, iter_idxs=list(iter_idxs)
-        )
+    data = load_configs(get_overlap_df, ts_files, configs, list(iter_idxs))
 
     overlap_data = {}
     config_min_elapsed = {}
@@ -56,7 +52,7 @@ def get_data(
         assert operator in operators, f"operator {operator} not found in {config}"
 
         op_mask = data[config]["operator-name"] == operator
-        sub = data[config][op_mask].copy()
+        sub = data[config][op_mask]
         sub["op_idx"] = sub.groupby("gpu").cumcount()
         overlap_data[config] = sub
 
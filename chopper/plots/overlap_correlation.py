@@ -10,7 +10,7 @@ import matplotlib.patches as mpatches
 from matplotlib.figure import Figure
 from scipy.stats import pearsonr
 
-from chopper.common.load import get_overlap_df
+from chopper.common.load import get_overlap_df, load_configs
 from chopper.common.annotations import PaperMode, apply_paper_rcparams, paper_figsize
 
 
@@ -38,12 +38,10 @@ def get_data(
     for op in operators:
         all_ops.extend([f"f_{op}", f"b_{op}"])
 
-    data = {}
-    for ts_file, config in zip(ts_files, configs):
-        data[config] = get_overlap_df(
-            ts_file,
-            iter_idxs=list(iter_idxs) if iter_idxs is not None else None,
-        )
+    data = load_configs(
+        get_overlap_df, ts_files, configs,
+        list(iter_idxs) if iter_idxs is not None else None,
+    )
 
     overlap_data = {config: {} for config in configs}
     config_min_elapsed = {config: {} for config in configs}
@@ -51,7 +49,7 @@ def get_data(
     for config in configs:
         for op in all_ops:
             op_mask = data[config]["operator-name"] == op
-            sub = data[config][op_mask].copy()
+            sub = data[config][op_mask]
             sub = sub.sort_values(["gpu", "iteration", "layer"]).reset_index(drop=True)
             sub["op_idx"] = sub.groupby("gpu").cumcount()
             overlap_data[config][op] = sub
@@ -11,7 +11,7 @@ from matplotlib.lines import Line2D
 from matplotlib.figure import Figure
 
 from chopper.common.colors import rgb
-from chopper.common.load import get_overlap_df
+from chopper.common.load import get_overlap_df, load_configs
 from chopper.common.annotations import PaperMode, apply_paper_rcparams, paper_figsize
 
 
@@ -35,11 +35,7 @@ def get_data(
         Tuple (overlap_data, gpus, operator) where overlap_data maps config ->
         DataFrame of operator entries with normalized 'elapsed' and 'op_idx'
     """
-    data = {}
-    for ts_file, config in zip(ts_files, configs):
-        data[config] = get_overlap_df(
-            ts_file, iter_idxs=list(iter_idxs)
-        )
+    data = load_configs(get_overlap_df, ts_files, configs, list(iter_idxs))
 
     overlap_data = {}
     config_min_elapsed = {}
@@ -55,7 +51,7 @@ def get_data(
             assert gpus == cur_gpus, "GPUs do not match across configs"
 
         op_mask = data[config]["operator-name"] == operator
-        sub = data[config][op_mask].copy()
+        sub = data[config][op_mask]
         sub["op_idx"] = sub.groupby("gpu").cumcount()
         overlap_data[config] = sub
 
@@ -123,7 +119,7 @@ def draw(
     for i, gpu in enumerate(gpus):
         ax = axs[i // n_cols][i % n_cols]
         for setup in data.keys():
-            tmp_df = data[setup][data[setup]["gpu"] == gpu].copy()
+            tmp_df = data[setup][data[setup]["gpu"] == gpu]
             tmp_df["overlap_ratio"] /= 100
 
             overlap_ratio = (
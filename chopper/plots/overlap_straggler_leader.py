@@ -11,7 +11,7 @@ from matplotlib.figure import Figure
 from matplotlib.ticker import FuncFormatter
 
 from chopper.common.colors import okabe_ito
-from chopper.common.load import get_overlap_df
+from chopper.common.load import get_overlap_df, load_configs
 from chopper.common.annotations import PaperMode
 
 
@@ -45,18 +45,14 @@ def get_data(
     """
     overlap_data = {}
 
-    for ts_file, variant in zip(ts_files, variants):
-        data = get_overlap_df(
-            ts_file,
-            iter_idxs=list(iter_idxs),
-        )
-
+    loaded = load_configs(get_overlap_df, ts_files, variants, list(iter_idxs))
+    for variant, data in loaded.items():
         min_dur = {}
         for op in operators:
             op_mask = data["operator-name"] == op
             if not op_mask.any():
                 continue
-            op_data = data[op_mask].copy()
+            op_data = data[op_mask]
             op_data["op_idx"] = op_data.groupby("gpu").cumcount()
             min_dur[op] = np.min(op_data["dur"])
             overlap_data[(variant, op)] = op_data
@@ -9,10 +9,31 @@ import matplotlib.patches as mpatches
 from matplotlib.figure import Figure
 
 from chopper.common.colors import rgb
-from chopper.common.load import get_df
+from chopper.common.load import TraceQuery, load_configs
 from chopper.common.annotations import PaperMode, apply_paper_rcparams, paper_figsize
 
 
+def _load_config(ts_file: str):
+    """Vec operator kernels of one config, grouped per operator."""
+    group_arr = ["iteration", "chunk", "layer", "operator-type", "operator-name"]
+    return (
+        TraceQuery(ts_file)
+        .with_chunks()
+        .without_overlap()
+        .of_types("Vec")
+        .with_fixed_names()
+        .group_by(
+            ["gpu"] + group_arr,
+            {
+                "ts": ["first", "last"],
+                "dur": ["sum", "last"],
+            },
+            sort_value="ts_first",
+        )
+        .collect()
+    )
+
+
 def get_data(
     ts_files: list[str] = ["./ts.pkl"],
     configs: list[str] = ["default"],
@@ -33,24 +54,7 @@ def get_data(
         Tuple of (data, fops, bops, oops) where data maps config -> aggregated
         DataFrame normalized by global maximum elapsed time
     """
-    group_arr = ["iteration", "chunk", "layer", "operator-type", "operator-name"]
-    data = {}
-    for ts_file, config in zip(ts_files, configs):
-        df = get_df(
-            ts_file,
-            assign_chunks=True,
-            remove_nan_chunks=True,
-            remove_overlap=True,
-            assign_optype=True,
-            fix_names=True,
-            group_arr=["gpu"] + group_arr,
-            group_map={
-                "ts": ["first", "last"],
-                "dur": ["sum", "last"],
-            },
-            sort_value="ts_first",
-        )
-        data[config] = df
+    data = load_configs(_load_config, ts_files, configs)
 
     max_dur = 0
     for setup in data.keys():
@@ -62,11 +66,11 @@ def get_data(
             .groupby(
                 ["gpu", "iteration", "chunk", "operator-type", "operator-name"],
                 dropna=False,
+                observed=True,
             )
             .agg(elapsed_time=("elapsed_time", "sum"))
             .reset_index()
         )
-        data[setup] = data[setup][data[setup]["operator-type"] == "Vec"]
         max_dur = max(data[setup]["elapsed_time"].max(), max_dur)
 
     for setup in data.keys():
@@ -13,7 +13,9 @@ def main(program,
          device,
          telemetry_on=0.0,
          telemetry_off=0.1,
-         sample_ms=1):
+         sample_ms=1,
+         watch_traces=None,
+         store=False):
     if len(program) == 0:
         logger.error("Please pass a program to run")
         return -1
@@ -40,6 +42,15 @@ def main(program,
             off=telemetry_off,
         )
 
+    if watch_traces:
+        from chopper.profile import merge
+        runner.add(
+            merge.watch,
+            False,
+            watch_traces,
+            f"{outdir}/ts" if store else f"{outdir}/ts.pkl",
+        )
+
     if device:
         from chopper.profile.telemetry import device_counters
         runner.add(
@@ -136,6 +147,18 @@ if __name__ == "__main__":
         default=0.1,
         help='sleep duration (seconds) between samples (default: 0.1 = 10 Hz)',
     )
+    parser.add_argument(
+        '--watch-traces',
+        required=False,
+        help='parse PyTorch profiler traces written to this directory while the program runs, '
+             'merging them into <output-dir>/ts.pkl',
+    )
+    parser.add_argument(
+        '--store',
+        action='store_true',
+        help='merge watched traces into the column store <output-dir>/ts instead of ts.pkl; '
+             'loaders memory-map it rather than reading it whole',
+    )
     parser.add_argument(
         'program',
         nargs='*',
@@ -154,4 +177,6 @@ if __name__ == "__main__":
         args.telemetry_on,
         args.telemetry_off,
         args.sample_ms,
+        args.watch_traces,
+        args.store,
     ))
@@ -1,222 +1,449 @@
-"""Full trace merge: parse PyTorch Chrome traces into a kernel DataFrame."""
+"""Full trace merge: parse PyTorch Chrome traces into a kernel DataFrame.
+
+Events are held column-wise: every table is a dict of equal-length NumPy
+arrays, strings are interned into integer codes, and cpu ops are addressed by
+row. Labeling stages are vectorized joins over these columns.
+"""
+import fnmatch
+import hashlib
 import json
+import os
+import pickle
+import shutil
+import tempfile
 import time
 import re
+import psutil
 import numpy as np
 import pandas as pd
+from array import array
 from concurrent.futures import ProcessPoolExecutor
+from ctypes import c_bool
+from dataclasses import dataclass
+from functools import partial
+from itertools import repeat
+from multiprocessing import Value
 from loguru import logger
 
+from chopper.common.intervals import innermost
+from chopper.common.index import TraceIndex, index_path
+from chopper.common.store import (
+    KERNEL_SCHEMA, categorical, compact, is_store, load_column, read_store, save_column, write_store,
+)
+from chopper.profile.stream import iter_events, iter_range, split_events
+
+# Bump when parse_trace output changes; invalidates cached parses
+PARSER_VERSION = 2
+
+# Missing id, sequence number or label in integer columns
+NONE = -1
+
+_COLUMNS = {
+    'cpu_ops': ('ext', 'ts', 'dur', 'seq', 'name'),
+    'annotations': ('ts', 'end_ts', 'name'),
+    'fwdbwd': ('id', 'ts', 'bwd'),
+    'kernels': ('name', 'ts', 'dur', 'correlation'),
+    'runtime': ('correlation', 'ext', 'ts'),
+}
+
+
+@dataclass
+class Events:
+    """Columnar trace events in file order.
+
+    Attributes:
+        names: Interned strings; every 'name' column holds codes into it
+        cpu_ops: ext, ts, dur, seq (NONE if absent), name
+        annotations: ts, end_ts, name
+        fwdbwd: flow id, ts, bwd (1 for the backward endpoint)
+        kernels: name, ts, dur, correlation
+        runtime: correlation, ext (NONE if absent), ts
+    """
+    names: list[str]
+    cpu_ops: dict[str, np.ndarray]
+    annotations: dict[str, np.ndarray]
+    fwdbwd: dict[str, np.ndarray]
+    kernels: dict[str, np.ndarray]
+    runtime: dict[str, np.ndarray]
 
-def assign_ranges(timestamps, ranges):
-    """Assign labels from (start, end, label) ranges to timestamps.
-    Ranges must be sorted longest-first so innermost overwrites."""
-    ts_arr = np.array(timestamps)
-    sort_idx = ts_arr.argsort()
-    sorted_ts = ts_arr[sort_idx]
-    result = np.empty(len(sorted_ts), dtype=object)
-    for start, end, label in ranges:
-        lo = np.searchsorted(sorted_ts, start, side='left')
-        hi = np.searchsorted(sorted_ts, end, side='right')
-        result[lo:hi] = label
-    final = np.empty_like(result)
-    final[sort_idx] = result
-    return final
-
-
-def parse(filename):
-    with open(filename) as f:
-        trace = json.load(f)
 
-    cpu_ops = {}
-    annotations = []
-    fwdbwd = {}
-    kernels = []
-    runtime = {}
+@dataclass
+class Labels:
+    """Per-cpu-op label column.
 
-    for e in trace['traceEvents']:
+    rank records assignment order (NONE: unassigned), which later stages use
+    to break ties. An assigned value may itself be NONE (e.g. no layer).
+    """
+    value: np.ndarray
+    rank: np.ndarray
+
+    @property
+    def assigned(self):
+        return self.rank != NONE
+
+    def extend(self, rows, values):
+        """Assign unassigned `rows` in order, after all existing labels."""
+        out = Labels(self.value.copy(), self.rank.copy())
+        out.value[rows] = values
+        out.rank[rows] = self.rank.max(initial=NONE) + 1 + np.arange(len(rows))
+        return out
+
+
+def _dict_rows(keys):
+    """Rows reproducing `d[key] = row` over `keys`: one row per key, ordered by
+    first occurrence, pointing at the last occurrence."""
+    _, first = np.unique(keys, return_index=True)
+    _, last = np.unique(keys[::-1], return_index=True)
+    last = len(keys) - 1 - last
+    return last[np.argsort(first, kind='stable')]
+
+
+def _lookup(keys, queries):
+    """Position of each query in unique `keys`, NONE where absent."""
+    out = np.full(len(queries), NONE, dtype=np.int64)
+    if len(keys) == 0:
+        return out
+    order = np.argsort(keys, kind='stable')
+    pos = np.searchsorted(keys, queries, sorter=order).clip(max=len(keys) - 1)
+    hit = keys[order[pos]] == queries
+    out[hit] = order[pos[hit]]
+    return out
+
+
+def _take(values, idx):
+    """values[idx] with NONE passed through."""
+    out = np.full(len(idx), NONE, dtype=np.int64)
+    hit = idx != NONE
+    out[hit] = values[idx[hit]]
+    return out
+
+
+def _select(table, rows):
+    return {k: v[rows] for k, v in table.items()}
+
+
+def _prefixed(names, codes, prefix):
+    """Codes of prefix + names[code], interning new strings into `names`."""
+    index = {n: i for i, n in enumerate(names)}
+    uniq, inv = np.unique(codes, return_inverse=True)
+    new = np.array([index.setdefault(prefix + names[c], len(index)) for c in uniq], dtype=np.int64)
+    names.extend(list(index)[len(names):])
+    return new[inv]
+
+
+def collect(events):
+    """Collect the events parse_trace needs into columns."""
+    names: dict[str, int] = {}
+    cols = {t: {c: array('q') for c in cs} for t, cs in _COLUMNS.items()}
+    op, ann, fb, kern, rt = (cols[t] for t in _COLUMNS)
+
+    for e in events:
         cat = e.get('cat', '')
         if cat == 'cpu_op':
-            cpu_ops[e['args']['External id']] = {
-                'name': e['name'],
-                'ts': int(e['ts'] * 1000),
-                'dur': int(e['dur'] * 1000),
-                'seq': e['args'].get('Sequence number'),
-            }
+            args = e['args']
+            seq = args.get('Sequence number')
+            op['ext'].append(args['External id'])
+            op['ts'].append(int(e['ts'] * 1000))
+            op['dur'].append(int(e['dur'] * 1000))
+            op['seq'].append(NONE if seq is None else seq)
+            op['name'].append(names.setdefault(e['name'], len(names)))
         elif cat == 'user_annotation':
             ts = int(e['ts'] * 1000)
             dur = int(e['dur'] * 1000)
-            annotations.append({'name': e['name'], 'ts': ts, 'end_ts': ts + dur})
+            ann['ts'].append(ts)
+            ann['end_ts'].append(ts + dur)
+            ann['name'].append(names.setdefault(e['name'], len(names)))
         elif cat == 'fwdbwd':
-            fid = e['id']
-            if fid not in fwdbwd:
-                fwdbwd[fid] = {}
-            fwdbwd[fid]['bwd' if 'bp' in e else 'fwd'] = int(e['ts'] * 1000)
+            fb['id'].append(e['id'])
+            fb['ts'].append(int(e['ts'] * 1000))
+            fb['bwd'].append('bp' in e)
         elif cat == 'kernel':
-            kernels.append({
-                'name': e['name'],
-                'ts': int(e['ts'] * 1000),
-                'dur': int(e['dur'] * 1000),
-                'correlation': e['args']['correlation'],
-            })
+            kern['name'].append(names.setdefault(e['name'], len(names)))
+            kern['ts'].append(int(e['ts'] * 1000))
+            kern['dur'].append(int(e['dur'] * 1000))
+            kern['correlation'].append(e['args']['correlation'])
         elif cat == 'cuda_runtime':
-            runtime[e['args']['correlation']] = {
-                'ext_id': e['args'].get('External id'),
-                'ts': int(e['ts'] * 1000),
-            }
-
-    return cpu_ops, annotations, fwdbwd, kernels, runtime
-
-
-def classify_annotations(annotations):
-    """Split annotations into layers, iterations, and operator annotations."""
-    layers = []
-    iterations = []
-    ops = []
-    for a in annotations:
-        if (m := re.fullmatch(r'Layer(\d+)', a['name'])):
-            layers.append((a['ts'], a['end_ts'], int(m.group(1))))
-            continue
-        if (m := re.fullmatch(r'Iteration(\d+)', a['name'])):
-            iterations.append((a['ts'], a['end_ts'], int(m.group(1))))
-            continue
-        ops.append((a['ts'], a['end_ts'], a['name']))
+            ext = e['args'].get('External id')
+            rt['correlation'].append(e['args']['correlation'])
+            rt['ext'].append(NONE if ext is None else ext)
+            rt['ts'].append(int(e['ts'] * 1000))
 
-    # Sort longest-first so innermost overwrites
-    layers.sort(key=lambda r: r[1] - r[0], reverse=True)
-    iterations.sort(key=lambda r: r[1] - r[0], reverse=True)
-    ops.sort(key=lambda r: r[1] - r[0], reverse=True)
-    return layers, iterations, ops
+    return Events(list(names), **{
+        t: {c: np.frombuffer(a, dtype=np.int64) for c, a in cs.items()}
+        for t, cs in cols.items()
+    })
 
 
-def link_fwdbwd(cpu_ops, op_ranges, fwdbwd, layer_ranges):
-    """Link fwd<->bwd cpu_ops.
-    Returns (ext_id -> f_/b_ annotation name, ext_id -> layer)."""
-    ts_to_ext = {op['ts']: eid for eid, op in cpu_ops.items()}
-    fwd_data = []
-    fwd_timestamps = []
-
-    for fid, ep in fwdbwd.items():
-        assert 'fwd' in ep and 'bwd' in ep, f"fwdbwd {fid} missing endpoint: {ep}"
-        fwd_ext = ts_to_ext.get(ep['fwd'])
-        bwd_ext = ts_to_ext.get(ep['bwd'])
-        assert fwd_ext is not None, f"fwdbwd {fid} fwd ts {ep['fwd']} not in cpu_ops"
-        assert bwd_ext is not None, f"fwdbwd {fid} bwd ts {ep['bwd']} not in cpu_ops"
-        fwd_data.append((fwd_ext, bwd_ext))
-        fwd_timestamps.append(cpu_ops[fwd_ext]['ts'])
-
-    anns = assign_ranges(fwd_timestamps, op_ranges)
-    fwd_layers = assign_ranges(fwd_timestamps, layer_ranges)
-
-    results = {}
-    fwdbwd_layers = {}
-    for i, (fwd_ext, bwd_ext) in enumerate(fwd_data):
-        ann = anns[i]
-        assert ann is not None, f"cpu_op {fwd_ext} ({cpu_ops[fwd_ext]['name']}) has no annotation"
-        results[fwd_ext] = 'f_' + ann
-        results[bwd_ext] = 'b_' + ann
-        fwdbwd_layers[fwd_ext] = fwd_layers[i]
-        fwdbwd_layers[bwd_ext] = fwd_layers[i]
+def parse(filename, stream=False):
+    """Parse a trace file into columnar Events.
+
+    With stream=True events are decoded one at a time instead of loading the
+    whole JSON document, so memory does not grow with the raw file size.
+    """
+    if stream:
+        return collect(iter_events(filename))
+    with open(filename) as f:
+        return collect(json.load(f)['traceEvents'])
+
 
+def parse_range(filename, start, stop):
+    """Parse the events in one byte range from split_events."""
+    return collect(iter_range(filename, start, stop))
+
+
+def concat_events(parts):
+    """Concatenate Events parsed from consecutive ranges of one trace.
+
+    Name codes are re-interned into a shared table; rows stay in file order,
+    so later deduplication sees the same order as a sequential parse.
+    """
+    names: dict[str, int] = {}
+    tables: dict[str, dict[str, list]] = {t: {c: [] for c in cs} for t, cs in _COLUMNS.items()}
+    for part in parts:
+        remap = np.array([names.setdefault(n, len(names)) for n in part.names], dtype=np.int64)
+        for t, cs in tables.items():
+            for c, arrs in cs.items():
+                col = getattr(part, t)[c]
+                arrs.append(remap[col] if c == 'name' else col)
+    return Events(list(names), **{
+        t: {c: np.concatenate(arrs) if arrs else np.empty(0, dtype=np.int64) for c, arrs in cs.items()}
+        for t, cs in tables.items()
+    })
+
+
+def parse_parallel(filename, jobs):
+    """Parse one trace on `jobs` processes, each decoding a byte range."""
+    bounds = split_events(filename, jobs)
+    with ProcessPoolExecutor(max_workers=len(bounds) - 1) as ex:
+        parts = list(ex.map(parse_range, repeat(filename), bounds[:-1], bounds[1:]))
+    return concat_events(parts)
+
+
+def classify_annotations(names, annotations):
+    """Split annotations into layer, iteration, and operator ranges.
+
+    Each is a (start, end, label) tuple of arrays in trace order. Labels are
+    layer/iteration numbers, or name codes for operator annotations.
+    """
+    codes = annotations['name']
+    kind = np.zeros(len(names), dtype=np.int8)
+    number = np.full(len(names), NONE, dtype=np.int64)
+    # Match once per distinct name rather than per annotation
+    for c in np.unique(codes):
+        if (m := re.fullmatch(r'Layer(\d+)', names[c])):
+            kind[c], number[c] = 1, int(m.group(1))
+        elif (m := re.fullmatch(r'Iteration(\d+)', names[c])):
+            kind[c], number[c] = 2, int(m.group(1))
+
+    def ranges(mask, labels):
+        return annotations['ts'][mask], annotations['end_ts'][mask], labels[mask]
+
+    k = kind[codes]
+    return ranges(k == 1, number[codes]), ranges(k == 2, number[codes]), ranges(k == 0, codes)
+
+
+def iteration_spans(names, annotations, iters=None, iter_idxs=None):
+    """(start, end) arrays of the selected Iteration(N) annotations.
+
+    Args:
+        iters: Iteration numbers N to keep
+        iter_idxs: Positions among the trace's iterations in order of
+            appearance, as in load.select_iters (e.g. range(-5, -2))
+    """
+    starts, ends, numbers = classify_annotations(names, annotations)[1]
+    keep = np.zeros(len(numbers), dtype=bool)
+    if iters is not None:
+        keep |= np.isin(numbers, list(iters))
+    if iter_idxs is not None:
+        order = np.argsort(starts, kind='stable')
+        uniq, first = np.unique(numbers[order], return_index=True)
+        in_order = uniq[np.argsort(first)]
+        keep |= np.isin(numbers, [in_order[i] for i in iter_idxs])
+    assert keep.any(), f"no Iteration annotations match iters={iters} iter_idxs={iter_idxs}"
+    return starts[keep], ends[keep]
+
+
+def select_window(events, starts, ends):
+    """Drop events outside the [start, end] spans, before any labeling.
+
+    cpu ops, fwdbwd flows and runtime calls are kept by timestamp; kernels
+    follow their launching runtime call and annotations are kept if they
+    overlap a span. Flows are kept only if both endpoints are in a span, so
+    fwd/bwd linking never sees half a pair.
+    """
+    def inside(ts):
+        return innermost(ts, starts, ends) != NONE
+
+    cpu_ops = _select(events.cpu_ops, inside(events.cpu_ops['ts']))
+    ann = events.annotations
+    overlap = (ann['end_ts'] >= starts.min()) & (ann['ts'] <= ends.max())
+    fb = events.fwdbwd
+    outside = np.unique(fb['id'][~inside(fb['ts'])])
+    fwdbwd = _select(fb, ~np.isin(fb['id'], outside))
+    rt = events.runtime
+    runtime = _select(rt, inside(rt['ts']) & np.isin(rt['ext'], cpu_ops['ext']))
+    kernels = _select(events.kernels, np.isin(events.kernels['correlation'], runtime['correlation']))
+    return Events(events.names, cpu_ops, _select(ann, overlap), fwdbwd, kernels, runtime)
+
+
+def link_fwdbwd(cpu_ops, names, op_ranges, fwdbwd, layer_ranges):
+    """Link fwd<->bwd cpu_ops.
+    Returns (f_/b_ annotation label, layer) Labels over cpu_ops rows."""
+    ids, bwd = fwdbwd['id'], fwdbwd['bwd'].astype(bool)
+    fids = ids[_dict_rows(ids)]
+
+    def endpoint_ts(mask, which):
+        rows = np.flatnonzero(mask)
+        rows = rows[_dict_rows(ids[rows])]
+        idx = _lookup(ids[rows], fids)
+        assert (idx != NONE).all(), f"fwdbwd {fids[idx == NONE][0]} missing {which} endpoint"
+        return fwdbwd['ts'][rows[idx]]
+
+    fwd_ts, bwd_ts = endpoint_ts(~bwd, 'fwd'), endpoint_ts(bwd, 'bwd')
+
+    # ts -> cpu_op row, later rows win like a dict keyed by ts
+    ts_rows = _dict_rows(cpu_ops['ts'])
+
+    def op_rows(ts, which):
+        idx = _lookup(cpu_ops['ts'][ts_rows], ts)
+        miss = idx == NONE
+        assert not miss.any(), f"fwdbwd {fids[miss][0]} {which} ts {ts[miss][0]} not in cpu_ops"
+        return ts_rows[idx]
+
+    fwd_rows, bwd_rows = op_rows(fwd_ts, 'fwd'), op_rows(bwd_ts, 'bwd')
+    fwd_ts = cpu_ops['ts'][fwd_rows]
+
+    anns = innermost(fwd_ts, op_ranges[0], op_ranges[1])
+    miss = anns == NONE
+    assert not miss.any(), (f"cpu_op {cpu_ops['ext'][fwd_rows[miss][0]]} "
+                            f"({names[cpu_ops['name'][fwd_rows[miss][0]]]}) has no annotation")
+    fwd_layers = _take(layer_ranges[2], innermost(fwd_ts, layer_ranges[0], layer_ranges[1]))
+
+    ann_codes = op_ranges[2][anns]
+    rows = np.column_stack([fwd_rows, bwd_rows]).ravel()
+    labels = np.column_stack([_prefixed(names, ann_codes, 'f_'),
+                              _prefixed(names, ann_codes, 'b_')]).ravel()
+    layers = np.repeat(fwd_layers, 2)
+
+    # Later pairs overwrite earlier ones but keep their first position
+    order = _dict_rows(rows)
+    empty = np.full(len(cpu_ops['ts']), NONE, dtype=np.int64)
+    results = Labels(empty, empty).extend(rows[order], labels[order])
+    fwdbwd_layers = Labels(empty, empty).extend(rows[order], layers[order])
     return results, fwdbwd_layers
 
 
 def promote(cpu_ops, labeled):
     """Promote fwdbwd labels up to parent cpu_ops with the same sequence number.
     This ensures siblings of the linked op also get covered when we propagate down."""
-    seq_to_label = {}
-    for eid, label in labeled.items():
-        seq = cpu_ops[eid].get('seq')
-        if seq is not None:
-            seq_to_label[seq] = label
-
-    result = dict(labeled)
-    for eid, op in cpu_ops.items():
-        if eid in result:
-            continue
-        seq = op.get('seq')
-        if seq is not None and seq in seq_to_label:
-            result[eid] = seq_to_label[seq]
-    return result
+    seq = cpu_ops['seq']
+    src = np.flatnonzero(labeled.assigned & (seq != NONE))
+    src = src[np.argsort(labeled.rank[src], kind='stable')]
+    # Last label in assignment order wins per sequence number
+    src = src[_dict_rows(seq[src])]
 
+    dst = np.flatnonzero(~labeled.assigned & (seq != NONE))
+    idx = _lookup(seq[src], seq[dst])
+    hit = idx != NONE
+    return labeled.extend(dst[hit], labeled.value[src[idx[hit]]])
 
-def propagate(cpu_ops, labeled):
-    """Propagate labels to child cpu_ops. Returns ext_id -> label (expanded)."""
-    parents = [(cpu_ops[eid]['ts'], cpu_ops[eid]['ts'] + cpu_ops[eid]['dur'], label)
-               for eid, label in labeled.items()]
-    parents.sort(key=lambda p: p[1] - p[0], reverse=True)
 
-    unlabeled_eids = [eid for eid in cpu_ops if eid not in labeled]
-    unlabeled_ts = [cpu_ops[eid]['ts'] for eid in unlabeled_eids]
-    assigned = assign_ranges(unlabeled_ts, parents)
+def propagate(cpu_ops, labeled):
+    """Propagate labels to child cpu_ops."""
+    parents = np.flatnonzero(labeled.assigned)
+    parents = parents[np.argsort(labeled.rank[parents], kind='stable')]
+    starts = cpu_ops['ts'][parents]
+    ends = starts + cpu_ops['dur'][parents]
 
-    result = dict(labeled)
-    for i, eid in enumerate(unlabeled_eids):
-        # None is expected: some autograd backward ops (e.g. DivBackward0) aren't
-        # contained by any fwdbwd-labeled parent. These get picked up by assign_unlabeled.
-        if assigned[i] is not None:
-            result[eid] = assigned[i]
-    return result
+    rows = np.flatnonzero(~labeled.assigned)
+    assigned = _take(labeled.value[parents], innermost(cpu_ops['ts'][rows], starts, ends))
+    # NONE is expected: some autograd backward ops (e.g. DivBackward0) aren't
+    # contained by any fwdbwd-labeled parent. These get picked up by assign_unlabeled.
+    hit = assigned != NONE
+    return labeled.extend(rows[hit], assigned[hit])
 
 
 def assign_unlabeled(cpu_ops, labeled, op_ranges):
     """Assign annotations to cpu_ops not covered by fwdbwd (opt, FSDP, etc)."""
-    unlabeled_eids = [eid for eid in cpu_ops if eid not in labeled]
-    unlabeled_ts = [cpu_ops[eid]['ts'] for eid in unlabeled_eids]
-    assigned = assign_ranges(unlabeled_ts, op_ranges)
+    rows = np.flatnonzero(~labeled.assigned)
+    assigned = _take(op_ranges[2], innermost(cpu_ops['ts'][rows], op_ranges[0], op_ranges[1]))
+    # NONE is expected: some cpu_ops occur outside any user_annotation range
+    # (e.g. during profiler init before training starts). These remain unlabeled.
+    hit = assigned != NONE
+    return labeled.extend(rows[hit], assigned[hit])
 
-    result = dict(labeled)
-    for i, eid in enumerate(unlabeled_eids):
-        # None is expected: some cpu_ops occur outside any user_annotation range
-        # (e.g. during profiler init before training starts). These remain unlabeled.
-        if assigned[i] is not None:
-            result[eid] = assigned[i]
-    return result
 
+def _nullable(values, dtype):
+    """Nullable integer array (e.g. dtype 'Int16') with NONE as missing."""
+    return pd.arrays.IntegerArray(values.astype(pd.api.types.pandas_dtype(dtype).numpy_dtype), values == NONE)
 
-def build_kernel_df(cpu_ops, kernels, runtime, labels, layer_ranges, iter_ranges, fwdbwd_layers):
+
+def _categorical(names, codes):
+    """Categorical of names[code] with only the used names, NONE as missing."""
+    used, inv = np.unique(codes, return_inverse=True)
+    # NONE sorts first
+    skip = int(len(used) > 0 and used[0] == NONE)
+    return categorical(inv - skip, [names[c] for c in used[skip:]])
+
+
+def build_kernel_df(cpu_ops, names, kernels, runtime, labels, layer_ranges, iter_ranges, fwdbwd_layers):
     """Build final kernel DataFrame with all context."""
     # Assign layer and iteration to all cpu_ops via timestamp ranges
-    all_eids = list(cpu_ops.keys())
-    all_ts = [cpu_ops[eid]['ts'] for eid in all_eids]
-    layers = assign_ranges(all_ts, layer_ranges)
-    iterations = assign_ranges(all_ts, iter_ranges)
-    eid_to_layer = {eid: layers[i] for i, eid in enumerate(all_eids)}
-    eid_to_iter = {eid: iterations[i] for i, eid in enumerate(all_eids)}
+    ts = cpu_ops['ts']
+    layers = _take(layer_ranges[2], innermost(ts, layer_ranges[0], layer_ranges[1]))
+    iterations = _take(iter_ranges[2], innermost(ts, iter_ranges[0], iter_ranges[1]))
 
     # fwdbwd_layers covers both fwd and bwd ops (bwd gets fwd's layer).
     # Overwrite timestamp-based layers with these authoritative values.
-    eid_to_layer.update(fwdbwd_layers)
-
-    rows = []
-    for k in kernels:
-        rt = runtime.get(k['correlation'])
-        assert rt is not None, f"kernel {k['correlation']} has no runtime match"
-        ext_id = rt['ext_id']
-        cpu_op = cpu_ops.get(ext_id)
-        assert cpu_op is not None, f"ext_id {ext_id} not in cpu_ops"
-
-        rows.append({
-            'name': k['name'],
-            'ts': k['ts'],
-            'dur': k['dur'],
-            'ts_cuda_runtime': rt['ts'],
-            'name_cpu_op': cpu_op['name'],
-            'operator-name': labels.get(ext_id),
-            'layer': eid_to_layer.get(ext_id),
-            'iteration': eid_to_iter.get(ext_id),
-        })
-
-    return pd.DataFrame(rows)
-
-
-def parse_trace(filename):
-    """Full pipeline: parse trace -> kernel DataFrame."""
-    cpu_ops, annotations, fwdbwd, kernels, runtime = parse(filename)
-    layer_ranges, iter_ranges, op_ranges = classify_annotations(annotations)
+    layers = np.where(fwdbwd_layers.assigned, fwdbwd_layers.value, layers)
+
+    rt = _lookup(runtime['correlation'], kernels['correlation'])
+    miss = rt == NONE
+    assert not miss.any(), f"kernel {kernels['correlation'][miss][0]} has no runtime match"
+    ext = runtime['ext'][rt]
+    op = _lookup(cpu_ops['ext'], ext)
+    miss = op == NONE
+    if miss.any():
+        ext_id = ext[miss][0]
+        raise AssertionError(f"ext_id {None if ext_id == NONE else ext_id} not in cpu_ops")
+
+    # Compact schema (store.KERNEL_SCHEMA): strings stay as codes
+    return pd.DataFrame({
+        'name': _categorical(names, kernels['name']),
+        'ts': kernels['ts'],
+        'dur': kernels['dur'],
+        'ts_cuda_runtime': runtime['ts'][rt],
+        'name_cpu_op': _categorical(names, cpu_ops['name'][op]),
+        'operator-name': _categorical(names, labels.value[op]),
+        'layer': _nullable(layers[op], KERNEL_SCHEMA['layer']),
+        'iteration': _nullable(iterations[op], KERNEL_SCHEMA['iteration']),
+    })
+
+
+def parse_trace(filename, stream=False, jobs=1, iters=None, iter_idxs=None, ts_range=None):
+    """Full pipeline: parse trace -> kernel DataFrame.
+
+    jobs > 1 splits the trace into byte ranges parsed on a process pool; the
+    partial results are merged before labeling.
+
+    iters/iter_idxs (see iteration_spans) or ts_range=(start, end) in ns
+    restrict the output to kernels launched by cpu ops in that window. Events
+    outside it are dropped before labeling, so the labeling cost scales with
+    the window rather than the whole trace.
+    """
+    events = parse_parallel(filename, jobs) if jobs > 1 else parse(filename, stream)
+    if iters is not None or iter_idxs is not None:
+        events = select_window(events, *iteration_spans(events.names, events.annotations, iters, iter_idxs))
+    elif ts_range is not None:
+        events = select_window(events, np.array([ts_range[0]]), np.array([ts_range[1]]))
+    names = events.names
+    # Duplicate ids keep the last event, like the dicts they replace
+    cpu_ops = _select(events.cpu_ops, _dict_rows(events.cpu_ops['ext']))
+    runtime = _select(events.runtime, _dict_rows(events.runtime['correlation']))
+    layer_ranges, iter_ranges, op_ranges = classify_annotations(names, events.annotations)
 
     # Step 1: fwd/bwd linking (also assigns layers to both fwd and bwd ops)
-    labeled, fwdbwd_layers = link_fwdbwd(cpu_ops, op_ranges, fwdbwd, layer_ranges)
+    labeled, fwdbwd_layers = link_fwdbwd(cpu_ops, names, op_ranges, events.fwdbwd, layer_ranges)
 
     # Step 2: promote labels up to parent cpu_ops with same sequence number
     labeled = promote(cpu_ops, labeled)
@@ -227,22 +454,22 @@ def parse_trace(filename):
     # they are spawned by other operations (e.g., residual add launches bwd all gathers)
     # Need to use timestamp based promotion of sibling fwdbwd labels to parents, instead of seq number
     # Then, parent propogate layers to all gather in the bwd pass
-    autograd_eids = [
-        eid for eid, op in cpu_ops.items()
-        if eid not in fwdbwd_layers
-        and op['name'].startswith('autograd::engine::evaluate_function:')
-        and op.get('seq') is None
-    ]
-    if autograd_eids:
-        labeled_ts = [cpu_ops[eid]['ts'] for eid in fwdbwd_layers]
-        labeled_layers = list(fwdbwd_layers.values())
-        autograd_ranges = [(cpu_ops[eid]['ts'], cpu_ops[eid]['ts'] + cpu_ops[eid]['dur'], eid)
-                           for eid in autograd_eids]
-        autograd_ranges.sort(key=lambda r: r[1] - r[0], reverse=True)
-        parent_eids = assign_ranges(labeled_ts, autograd_ranges)
-        for i, parent_eid in enumerate(parent_eids):
-            if parent_eid is not None and parent_eid not in fwdbwd_layers:
-                fwdbwd_layers[parent_eid] = labeled_layers[i]
+    is_autograd = np.array([n.startswith('autograd::engine::evaluate_function:') for n in names], dtype=bool)
+    autograd_rows = np.flatnonzero(
+        ~fwdbwd_layers.assigned
+        & is_autograd[cpu_ops['name']]
+        & (cpu_ops['seq'] == NONE)
+    )
+    if len(autograd_rows):
+        children = np.flatnonzero(fwdbwd_layers.assigned)
+        children = children[np.argsort(fwdbwd_layers.rank[children], kind='stable')]
+        starts = cpu_ops['ts'][autograd_rows]
+        parents = innermost(cpu_ops['ts'][children], starts, starts + cpu_ops['dur'][autograd_rows])
+        hit = parents != NONE
+        children, parents = children[hit], autograd_rows[parents[hit]]
+        # First child (in label order) decides each parent's layer
+        first = np.sort(np.unique(parents, return_index=True)[1])
+        fwdbwd_layers = fwdbwd_layers.extend(parents[first], fwdbwd_layers.value[children[first]])
     # end of HACK
 
     # Step 3: propagate labels and layers to children
@@ -253,7 +480,332 @@ def parse_trace(filename):
     labeled = assign_unlabeled(cpu_ops, labeled, op_ranges)
 
     # Step 5: build kernel DataFrame
-    return build_kernel_df(cpu_ops, kernels, runtime, labeled, layer_ranges, iter_ranges, fwdbwd_layers)
+    return build_kernel_df(cpu_ops, names, events.kernels, runtime, labeled,
+                           layer_ranges, iter_ranges, fwdbwd_layers)
+
+
+# Rough peak parse memory per byte of trace JSON, for json.load vs --stream
+_PARSE_MEM_FACTOR = {False: 6, True: 2}
+
+
+def parse_workers(traces, stream=False, mem_budget=None, jobs=1):
+    """Number of traces to parse at once within mem_budget bytes.
+
+    Defaults to the currently available memory. Each trace parsed with
+    jobs > 1 runs that many processes, so the budget is shared among them.
+    Always at least one.
+    """
+    if mem_budget is None:
+        mem_budget = psutil.virtual_memory().available
+    per_worker = max(os.path.getsize(t) for t in traces) * _PARSE_MEM_FACTOR[stream]
+    return int(max(1, min(len(traces), mem_budget // max(jobs, 1) // max(per_worker, 1))))
+
+
+def merge_sorted(runs):
+    """Stable merge order of k individually sorted key arrays.
+
+    Adjacent runs are merged pairwise, each merge placing both sides with one
+    vectorized searchsorted, so k runs take log2(k) passes over the keys
+    instead of a full re-sort. Ties keep run order, then row order.
+
+    Returns:
+        Index into the concatenation of runs, in merged order
+    """
+    merged = []
+    offset = 0
+    for r in runs:
+        merged.append((np.asarray(r), np.arange(offset, offset + len(r))))
+        offset += len(r)
+    if not merged:
+        return np.empty(0, dtype=np.int64)
+    while len(merged) > 1:
+        pairs = []
+        for (ka, ia), (kb, ib) in zip(merged[::2], merged[1::2]):
+            pa = np.arange(len(ka)) + np.searchsorted(kb, ka, side='left')
+            pb = np.arange(len(kb)) + np.searchsorted(ka, kb, side='right')
+            keys = np.empty(len(ka) + len(kb), dtype=np.result_type(ka, kb))
+            idx = np.empty(len(keys), dtype=np.int64)
+            keys[pa], keys[pb] = ka, kb
+            idx[pa], idx[pb] = ia, ib
+            pairs.append((keys, idx))
+        if len(merged) % 2:
+            pairs.append(merged[-1])
+        merged = pairs
+    return merged[0][1]
+
+
+def save_columns(df, outdir):
+    """Write each column of df, sorted by ts, to an .npy file under outdir.
+
+    Columns are written by store.save_column, so strings are stored as
+    codes plus categories and nullable integers as values plus a mask.
+    Returns (rows, spec) where spec maps column -> (path, categories or None,
+    mask path or None).
+    """
+    if not df['ts'].is_monotonic_increasing:
+        df = df.sort_values('ts', kind='stable')
+    os.makedirs(outdir, exist_ok=True)
+    spec = {col: save_column(df[col], outdir, str(i)) for i, col in enumerate(df.columns)}
+    # Spec keeps file names only, so a directory can be moved or cached
+    with open(os.path.join(outdir, 'spec.pkl'), 'wb') as f:
+        pickle.dump((len(df), spec), f)
+    return load_columns(outdir)
+
+
+def load_columns(outdir):
+    """Read back the (rows, spec) of a save_columns directory, with full paths."""
+    with open(os.path.join(outdir, 'spec.pkl'), 'rb') as f:
+        rows, spec = pickle.load(f)
+    return rows, {
+        col: (os.path.join(outdir, fn), cats, mask and os.path.join(outdir, mask))
+        for col, (fn, cats, mask) in spec.items()
+    }
+
+
+def parse_to_files(filename, outdir, stream=False, jobs=1, window=None):
+    """parse_trace, with the result written by save_columns instead of returned.
+
+    window holds parse_trace's iters/iter_idxs/ts_range keywords, if any.
+    """
+    return save_columns(parse_trace(filename, stream, jobs, **(window or {})), outdir)
+
+
+def trace_key(filename, window=None):
+    """Cache key for a trace: hash of its bytes plus PARSER_VERSION and window."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(filename, 'rb') as f:
+        while (block := f.read(1 << 24)):
+            h.update(block)
+    key = f'{h.hexdigest()}-v{PARSER_VERSION}'
+    if window:
+        spec = repr(sorted((k, list(v)) for k, v in window.items() if v is not None))
+        key += '-' + hashlib.blake2b(spec.encode(), digest_size=8).hexdigest()
+    return key
+
+
+def parse_cached(filename, cache_dir, stream=False, jobs=1, window=None):
+    """parse_to_files through a content-addressed cache under cache_dir.
+
+    Entries are keyed by trace_key, so renamed or copied traces still hit and
+    rewritten ones miss. New entries are written to a scratch directory and
+    renamed into place, so an interrupted or concurrent parse never leaves a
+    partial entry.
+    """
+    entry = os.path.join(cache_dir, trace_key(filename, window))
+    if os.path.exists(os.path.join(entry, 'spec.pkl')):
+        logger.info(f"Reusing cached parse of {filename}")
+        return load_columns(entry)
+    scratch = tempfile.mkdtemp(dir=cache_dir, prefix='.partial-')
+    try:
+        parse_to_files(filename, scratch, stream, jobs, window)
+        os.rename(scratch, entry)
+    except OSError:
+        # Another process cached the same trace first
+        if not os.path.exists(os.path.join(entry, 'spec.pkl')):
+            raise
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return load_columns(entry)
+
+
+def assemble(parts, gpus=None):
+    """Combine save_columns parts into one frame sorted by ts.
+
+    Column files are memory-mapped, the per-part ts runs are k-way merged
+    with merge_sorted, and every value is scattered straight to its final
+    row. Columns missing from a part are filled as missing, like pd.concat.
+    String columns come out as one Categorical over the union of the parts'
+    categories, and nullable integer columns keep their mask.
+
+    Args:
+        parts: (rows, spec) per input, from save_columns
+        gpus: If given, add a 'gpu' column holding gpus[i] for rows of part i
+    """
+    sizes = [n for n, _ in parts]
+    offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+    total = int(offsets[-1])
+    order = merge_sorted([load_column('', spec['ts']) for _, spec in parts])
+    dest = np.empty(total, dtype=np.int64)
+    dest[order] = np.arange(total)
+    slices = [dest[offsets[i]:offsets[i + 1]] for i in range(len(parts))]
+
+    names = list(dict.fromkeys(col for _, spec in parts for col in spec))
+    columns = {}
+    for col in names:
+        # (path, categories, mask) per part; None marks an absent column
+        specs = [spec.get(col) for _, spec in parts]
+        if any(sp and sp[1] for sp in specs):
+            # Union the per-part categories; numeric or absent parts are all-missing
+            union: dict = {}
+            codes = np.empty(total, dtype=np.int64)
+            for sp, d in zip(specs, slices):
+                if sp and sp[1]:
+                    remap = np.array([union.setdefault(v, len(union)) for v in sp[1]] + [-1], dtype=np.int64)
+                    codes[d] = remap[np.load(sp[0], mmap_mode='r')]
+                else:
+                    codes[d] = -1
+            columns[col] = categorical(codes, list(union))
+            continue
+        # Parts with empty categories hold only missing strings
+        numeric = [sp for sp in specs if sp and sp[1] is None]
+        if not numeric:
+            columns[col] = pd.Categorical.from_codes(np.full(total, -1, dtype=np.int8), categories=[])
+            continue
+        dtypes = [np.load(sp[0], mmap_mode='r').dtype for sp in numeric]
+        if any(sp[2] for sp in numeric) and all(t.kind in 'iu' for t in dtypes):
+            out = np.zeros(total, dtype=np.result_type(*dtypes))
+            missing = np.ones(total, dtype=bool)
+            for sp, d in zip(specs, slices):
+                if sp and sp[1] is None:
+                    out[d] = np.load(sp[0], mmap_mode='r')
+                    missing[d] = np.load(sp[2], mmap_mode='r') if sp[2] else False
+            columns[col] = pd.arrays.IntegerArray(out, missing)
+            continue
+        # All-missing parts (empty categories) and masked values become NaN
+        dtype = np.result_type(*dtypes, *([np.float64] if len(numeric) < len(parts) or
+                                          any(sp[2] for sp in numeric) else []))
+        out = np.empty(total, dtype=dtype)
+        for sp, d in zip(specs, slices):
+            if sp and sp[1] is None:
+                out[d] = np.load(sp[0], mmap_mode='r')
+                if sp[2]:
+                    out[d[np.load(sp[2], mmap_mode='r')]] = np.nan
+            else:
+                out[d] = np.nan
+        columns[col] = out
+
+    if gpus is not None:
+        columns['gpu'] = np.repeat(np.asarray(gpus, dtype=KERNEL_SCHEMA['gpu']), sizes)[order]
+    return pd.DataFrame(columns, copy=False)
+
+
+def combine_pickles(pickles, tmpdir):
+    """Merge kernel pickles (e.g. one per iteration) into one ts-sorted frame.
+
+    Inputs are loaded one at a time and spilled to column files, so only the
+    output and one input are in memory at once.
+    """
+    parts = []
+    for i, p in enumerate(pickles):
+        df = read_kernels(p)
+        parts.append(save_columns(df, os.path.join(tmpdir, str(i))))
+        del df
+    return assemble(parts)
+
+
+def write_kernels(df, output):
+    """Write a kernel table: a pickle for a .pkl path, else a column store.
+
+    Both use the compact store.KERNEL_SCHEMA dtypes. The column store
+    (chopper.common.store) is partitioned by gpu and iteration, so loaders
+    can read only the partitions and columns they use. Either way a
+    TraceIndex (chopper.common.index) is written with the table.
+    """
+    if output.endswith('.pkl'):
+        compact(df).to_pickle(output)
+        TraceIndex.build(df).save(index_path(output), table=output)
+    else:
+        write_store(df, output)
+
+
+def read_kernels(path):
+    """Read a kernel table written by write_kernels (or an older ts.pkl)."""
+    return read_store(path) if is_store(path) else pd.read_pickle(path)
+
+
+def trace_closed(filename):
+    """True if the file holds a complete JSON object (its writer is done).
+
+    The profiler writes a trace in one pass and closes it, so a trace whose
+    last non-whitespace byte is the closing '}' is complete.
+    """
+    with open(filename, 'rb') as f:
+        f.seek(max(0, os.path.getsize(filename) - 256))
+        return f.read().rstrip().endswith(b'}')
+
+
+def trace_rank(filename, pattern=r'rank(\d+)'):
+    """Rank a trace file belongs to: the pattern's number, else its worker name.
+
+    Per-step traces from torch.profiler.tensorboard_trace_handler are named
+    <worker>.<timestamp>.pt.trace.json, so without a rank in the name the
+    text before the first '.' identifies the writer.
+    """
+    base = os.path.basename(filename)
+    if (m := re.search(pattern, base)):
+        return int(m.group(1))
+    return base.split('.')[0]
+
+
+def watch(stop, directory, output, glob='*.json', poll=1.0, settle=2.0, rank_pattern=r'rank(\d+)',
+          stream=True, cache_dir=None, window=None):
+    """Parse traces as they appear in directory until stop is set, then merge.
+
+    Runs as a Runner child (stop is the shared stop flag) or standalone. A
+    trace is parsed once its size and mtime have not changed for `settle`
+    seconds and it ends in a complete JSON object. Each result is spilled
+    with save_columns right away, so when stop is set only the remaining
+    traces and the final k-way merge of the spilled parts are left to do.
+
+    GPU ids number the distinct trace_rank values in sorted order, the same
+    way sorted -t traces are numbered.
+    """
+    tmp_parent = os.path.dirname(os.path.abspath(output))
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    seen: dict = {}   # path -> ((size, mtime), first time seen with it)
+    parts = {}        # path -> (rows, spec)
+    with tempfile.TemporaryDirectory(dir=tmp_parent) as tmp:
+        while True:
+            # Read the flag before scanning, so traces closed before the stop
+            # are picked up by this last pass
+            stopping = stop.value
+            try:
+                now = time.monotonic()
+                names = sorted(fnmatch.filter(os.listdir(directory), glob)) if os.path.isdir(directory) else []
+                for name in names:
+                    path = os.path.join(directory, name)
+                    if path in parts:
+                        continue
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    sig = (st.st_size, st.st_mtime_ns)
+                    if seen.get(path, (None,))[0] != sig:
+                        seen[path] = (sig, now)
+                        if not stopping:
+                            continue
+                    if not stopping and now - seen[path][1] < settle:
+                        continue
+                    if not trace_closed(path):
+                        if stopping:
+                            logger.warning(f"Skipping incomplete trace {path}")
+                        continue
+                    if cache_dir:
+                        parts[path] = parse_cached(path, cache_dir, stream, window=window)
+                    else:
+                        parts[path] = parse_to_files(path, os.path.join(tmp, str(len(parts))), stream, window=window)
+                    logger.info(f"Parsed {path}: {parts[path][0]} kernels ({len(parts)} traces so far)")
+                if stopping:
+                    break
+                time.sleep(poll)
+            except KeyboardInterrupt:
+                # Ctrl-C or a Runner shutdown, wherever it lands: make the
+                # last pass, or merge what is parsed if that pass was cut short
+                if stopping:
+                    break
+                stop.value = True
+
+        if not parts:
+            logger.warning(f"No traces found in {directory}")
+            return
+        paths = list(parts)
+        ranks = [trace_rank(p, rank_pattern) for p in paths]
+        ids = {r: i for i, r in enumerate(sorted(set(ranks), key=lambda r: (isinstance(r, str), r)))}
+        df = assemble([parts[p] for p in paths], gpus=[ids[r] for r in ranks])
+    write_kernels(df, output)
+    logger.info(f"Wrote {len(df)} kernels from {len(paths)} traces to {output}")
 
 
 def get_pivoted(csv_filename):
@@ -425,7 +977,7 @@ def merge_device_with_traces(device_dir, trace_pkl, output):
     t0 = time.time()
 
     # Load ts.pkl for annotations
-    df_ts = pd.read_pickle(trace_pkl)
+    df_ts = read_kernels(trace_pkl)
     last_iter = df_ts["iteration"].dropna().unique().max()
     logger.info(f"Stealing annotations from iteration {last_iter} of {trace_pkl}")
     df_last = df_ts[df_ts["iteration"] == last_iter].copy()
@@ -604,7 +1156,14 @@ def merge_device_counters(device_dir, output):
     logger.info(f"  Counter -> group: {counter_to_group}")
 
 
-def main(traces, pickles, counters, device_dir, output):
+def main(traces, pickles, counters, device_dir, output, stream=False, jobs=1, mem_budget=None,
+         cache_dir=None, watch_dir=None, window=None):
+    if watch_dir:
+        assert not (traces or pickles or counters or device_dir), "--watch cannot be combined with other inputs"
+        logger.info(f"Watching {watch_dir} for traces; press Ctrl-C after the last step to merge")
+        watch(Value(c_bool, False), watch_dir, output, stream=True, cache_dir=cache_dir, window=window)
+        return
+
     if device_dir and pickles:
         assert len(pickles) == 1, "pass exactly one pickle with --device-dir"
         merge_device_with_traces(device_dir, pickles[0], output)
@@ -622,34 +1181,46 @@ def main(traces, pickles, counters, device_dir, output):
 
     if pickles and counters:
         assert len(pickles) == 1, "pass exactly one pickle with -c"
-        df = pd.read_pickle(pickles[0])
+        df = read_kernels(pickles[0])
         df = merge_counters(df, counters)
-        df.to_pickle(output)
+        write_kernels(df, output)
         t1 = time.time()
         logger.info(f"Merged counters into {len(df)} kernels -> {output} in {t1-t0:.2f}s")
         return
 
+    # Column files go next to the output; /tmp is often RAM-backed
+    tmp_parent = os.path.dirname(os.path.abspath(output))
+
     if pickles:
-        dfs = [pd.read_pickle(p) for p in pickles]
-        df = pd.concat(dfs, ignore_index=True)
-        df = df.sort_values('ts').reset_index(drop=True)
-        df.to_pickle(output)
+        with tempfile.TemporaryDirectory(dir=tmp_parent) as tmp:
+            df = combine_pickles(pickles, tmp)
+        write_kernels(df, output)
         t1 = time.time()
         logger.info(f"Merged {len(pickles)} pickles, {len(df)} kernels -> {output} in {t1-t0:.2f}s")
         return
 
-    if len(traces) == 1:
-        df = parse_trace(traces[0])
-        df['gpu'] = 0
+    if len(traces) == 1 and not cache_dir:
+        df = parse_trace(traces[0], stream, jobs, **(window or {}))
+        df['gpu'] = np.zeros(len(df), dtype=KERNEL_SCHEMA['gpu'])
+        df = df.sort_values('ts').reset_index(drop=True)
     else:
-        with ProcessPoolExecutor(max_workers=len(traces)) as ex:
-            dfs = list(ex.map(parse_trace, traces))
-        for i, d in enumerate(dfs):
-            d['gpu'] = i
-        df = pd.concat(dfs, ignore_index=True)
-
-    df = df.sort_values('ts').reset_index(drop=True)
-    df.to_pickle(output)
+        # Traces already parse in parallel; splitting each one as well would
+        # start a pool per worker
+        if len(traces) > 1:
+            jobs = 1
+        workers = parse_workers(traces, stream, mem_budget, jobs)
+        logger.info(f"Parsing {len(traces)} traces with {workers} workers")
+        with tempfile.TemporaryDirectory(dir=tmp_parent) as tmp, \
+                ProcessPoolExecutor(max_workers=workers) as ex:
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+                parts = list(ex.map(partial(parse_cached, cache_dir=cache_dir, stream=stream, jobs=jobs, window=window), traces))
+            else:
+                dirs = [os.path.join(tmp, str(i)) for i in range(len(traces))]
+                parts = list(ex.map(partial(parse_to_files, stream=stream, jobs=jobs, window=window), traces, dirs))
+            df = assemble(parts, gpus=range(len(parts)))
+
+    write_kernels(df, output)
     t1 = time.time()
 
     logger.info(f"Wrote {len(df)} kernels to {output} in {t1-t0:.2f}s")
@@ -662,10 +1233,12 @@ if __name__ == '__main__':
         "Merge PyTorch traces into a kernel pickle, combine pickles, "
         "join hardware counters, or merge device sampling data.\n"
         "  1) -t trace*.json -o ts.pkl                       (parse traces)\n"
+        "     -t trace*.json -o ts                           (same, as a partitioned column store)\n"
         "  2) -p iter*.pkl -o ts.pkl                          (combine pickles)\n"
         "  3) -p ts.pkl -c batch0/*.csv -o out.pkl            (add counters)\n"
         "  4) --device-dir outputs/run -o device.pkl           (raw device CSVs)\n"
         "  5) --device-dir outputs/run -p ts.pkl -o merged.pkl (device + traces)\n"
+        "  6) --watch profiler_out/ -o ts.pkl                  (parse traces as they are written)\n"
     ))
     parser.add_argument('-t', '--traces', nargs='+')
     parser.add_argument('-p', '--pickles', nargs='+')
@@ -674,9 +1247,39 @@ if __name__ == '__main__':
     parser.add_argument('--device-dir',
                         help='Device sampling output directory (chopper --device)')
     parser.add_argument('-o', '--output', required=True)
+    parser.add_argument('--store', action='store_true',
+                        help='Write the kernel table as a column store, dropping a .pkl suffix from -o '
+                             '(loaders memory-map it rather than reading it whole)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Decode trace events incrementally instead of json.load (bounded memory)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Processes for a single trace; >1 parses byte-range chunks of it in parallel '
+                             '(several traces are parsed one per process instead)')
+    parser.add_argument('--mem-budget', type=float,
+                        help='GiB of memory for parallel trace parsing (default: available memory)')
+    parser.add_argument('--cache-dir',
+                        help='Reuse per-trace parse results cached here, keyed by trace content')
+    parser.add_argument('--watch', metavar='DIR',
+                        help='Parse traces as the profiler writes them to DIR; merge on Ctrl-C')
+    parser.add_argument('--iters', type=int, nargs='+',
+                        help='Keep only kernels of these Iteration(N) annotation numbers')
+    parser.add_argument('--iter-idxs', type=int, nargs='+',
+                        help='Keep only these iterations by position, e.g. -5 -4 -3 (like get_df iter_idxs)')
+    parser.add_argument('--ts-range', type=int, nargs=2, metavar=('START', 'END'),
+                        help='Keep only kernels launched by cpu ops in [START, END] (ns, trace clock)')
     args = parser.parse_args()
+    assert not (args.store and args.device_dir), "--store applies to kernel tables, not --device-dir output"
+    output = args.output.removesuffix('.pkl') if args.store else args.output
+    window = {k: v for k, v in [('iters', args.iters), ('iter_idxs', args.iter_idxs),
+                                ('ts_range', args.ts_range)] if v is not None}
     main(sorted(args.traces) if args.traces else None,
          sorted(args.pickles) if args.pickles else None,
          args.counters,
          args.device_dir,
-         args.output)
+         output,
+         args.stream,
+         args.jobs,
+         args.mem_budget * 2**30 if args.mem_budget else None,
+         args.cache_dir,
+         args.watch,
+         window or None)
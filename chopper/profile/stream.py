@@ -0,0 +1,205 @@
+"""Incremental reader for the traceEvents array of Chrome trace JSON files.
+
+`json.load` materializes the whole trace before a single event can be
+inspected, so peak memory is several times the file size. The reader here
+decodes one event at a time from a fixed-size text buffer; memory is bounded
+by the buffer size plus the largest single event.
+
+The array can also be cut into byte ranges that start on event boundaries,
+so several processes can decode one trace in parallel.
+"""
+import codecs
+import json
+import os
+import re
+
+_decoder = json.JSONDecoder()
+_WS = ' \t\n\r'
+
+
+class _Reader:
+    """Sliding text buffer over a `read(n) -> str` callable."""
+
+    def __init__(self, read, chunk_size):
+        self.read = read
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, need=None):
+        """Drop consumed text and append the next chunk. False at EOF."""
+        if self.eof:
+            return False
+        data = self.read(max(self.chunk_size, need or 0))
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        self.eof = not data
+        return not self.eof
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars):
+        c = self.peek()
+        assert c and c in chars, f"expected one of {chars!r}, got {c!r}"
+        self.pos += 1
+        return c
+
+    def value(self):
+        """Decode the next JSON value, reading more text until it is complete."""
+        self.peek()
+        need = None
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+                # A value ending exactly at the buffer end may be a truncated number
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow the read size so huge values are not re-decoded chunk by chunk
+            need = 2 * (need or len(self.buf) - self.pos)
+            self.fill(need)
+
+    def array(self):
+        """Yield the elements of an array whose '[' was already consumed."""
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+
+def iter_events(filename, chunk_size=1 << 22):
+    """Yield the events of `traceEvents` one at a time.
+
+    Other top-level keys are decoded and discarded, so the file may put them
+    before or after `traceEvents`.
+    """
+    with open(filename) as f:
+        reader = _Reader(f.read, chunk_size)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        while True:
+            key = reader.value()
+            reader.expect(':')
+            if key == 'traceEvents':
+                reader.expect('[')
+                yield from reader.array()
+            else:
+                reader.value()
+            if reader.expect(',}') == '}':
+                return
+
+
+def events_offset(filename, chunk_size=1 << 22):
+    """Byte offset just past the '[' that opens `traceEvents`."""
+    pattern = re.compile(rb'"traceEvents"\s*:\s*\[')
+    with open(filename, 'rb') as f:
+        base = 0
+        tail = b''
+        while True:
+            data = f.read(chunk_size)
+            assert data, f"no traceEvents array in {filename}"
+            window = tail + data
+            if (m := pattern.search(window)):
+                return base - len(tail) + m.end()
+            # Keep enough of the tail to match a pattern split across reads
+            tail = window[-256:]
+            base += len(data)
+
+
+def _is_event_start(window, i, max_event=1 << 20):
+    """True if window[i] is the '{' of a traceEvents element."""
+    j = i - 1
+    while j >= 0 and window[j] in b' \t\n\r':
+        j -= 1
+    if j < 0 or window[j] not in b',[':
+        return False
+    try:
+        # '{' is ASCII, so decoding from it never starts mid-character
+        obj, _ = _decoder.raw_decode(window[i:i + max_event].decode('utf-8', errors='ignore'))
+    except json.JSONDecodeError:
+        # A '{' inside a string, or an event cut off by the window. Skipping
+        # a real event only moves the boundary to the next one.
+        return False
+    return isinstance(obj, dict) and 'ph' in obj
+
+
+def event_start(filename, pos, window_size=1 << 22):
+    """Byte offset of the first event starting at or after `pos`.
+
+    JSON offers no way to resynchronize at an arbitrary byte, so candidates
+    are '{' bytes preceded by ',' or '[' that decode to an object with a
+    "ph" key (every Chrome trace event has one; args and other nested objects
+    do not). Returns the file size if no event follows.
+    """
+    lookback = 256
+    size = os.path.getsize(filename)
+    with open(filename, 'rb') as f:
+        while pos < size:
+            base = max(0, pos - lookback)
+            f.seek(base)
+            window = f.read(pos - base + window_size)
+            i = window.find(b'{', pos - base)
+            while i != -1:
+                if _is_event_start(window, i):
+                    return base + i
+                i = window.find(b'{', i + 1)
+            pos = base + len(window)
+    return size
+
+
+def split_events(filename, n):
+    """Cut the traceEvents array into at most n byte ranges on event starts.
+
+    Returns sorted boundaries [b0, ..., bk]; range i is [b_i, b_{i+1}).
+    """
+    start = events_offset(filename)
+    size = os.path.getsize(filename)
+    step = (size - start) // n
+    bounds = [start]
+    for k in range(1, n):
+        b = event_start(filename, start + k * step)
+        if b > bounds[-1]:
+            bounds.append(b)
+    if size > bounds[-1]:
+        bounds.append(size)
+    return bounds
+
+
+def iter_range(filename, start, stop, chunk_size=1 << 22):
+    """Yield the events whose '{' lies in bytes [start, stop).
+
+    `start` must be an event boundary from split_events. Reading stops at
+    `stop` or at the ']' that closes the array, whichever comes first.
+    """
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        remaining = stop - start
+        decoder = codecs.getincrementaldecoder('utf-8')()
+
+        def read(n):
+            nonlocal remaining
+            data = f.read(min(n, remaining))
+            remaining -= len(data)
+            return decoder.decode(data, final=not data)
+
+        reader = _Reader(read, chunk_size)
+        while reader.peek() not in ('', ']'):
+            yield reader.value()
+            if reader.expect(',]') == ']':
+                return
@@ -5,6 +5,7 @@ configuring parameters, and generating visualizations. Supports hot-reloading
 of plot modules for rapid development iteration.
 """
 import sys
+from argparse import ArgumentParser
 from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -12,6 +13,7 @@ from PyQt6.QtWidgets import (
     QHBoxLayout,
     QWidget,
     QPushButton,
+    QCheckBox,
     QLabel,
     QScrollArea,
     QGroupBox,
@@ -28,6 +30,9 @@ from matplotlib.figure import Figure
 import chopper.plots
 
 from chopper.common.annotations import PaperMode
+from chopper.common.cache import cache_stats, set_disk_cache
+from chopper.common.parallel import set_workers
+from chopper.common.sampling import Preview, clear_samples, samples, set_preview
 from chopper.selectors import (
     PlotSelection,
     BoolSelection,
@@ -253,9 +258,20 @@ class MatplotlibWidget(QWidget):
         self.save_button = QPushButton("save figure")
         self.save_button.clicked.connect(self.save_figure)
         self.save_button.setDisabled(True)
+        # Previews load a sample of each trace; "load full" reloads it all
+        self.preview_box = QCheckBox("preview")
+        self.full_button = QPushButton("load full")
+        self.full_button.clicked.connect(self.load_full)
+        self.full_button.setDisabled(True)
+        self.preview_label = QLabel()
+        refresh_layout.addWidget(self.preview_box)
         refresh_layout.addWidget(self.data_button)
+        refresh_layout.addWidget(self.full_button)
         refresh_layout.addWidget(self.draw_button)
         refresh_layout.addWidget(self.save_button)
+        refresh_layout.addWidget(self.preview_label)
+        self.cache_label = QLabel(str(cache_stats()))
+        refresh_layout.addWidget(self.cache_label)
 
         layout.addLayout(refresh_layout)
         self.plot_modules = tuple(
@@ -284,11 +300,13 @@ class MatplotlibWidget(QWidget):
         if self.loading_plot == self.plot:
             self.data_button.setEnabled(False)
             self.data_button.setText("loading...")
+            self.full_button.setEnabled(False)
             self.draw_button.setEnabled(False)
             self.save_button.setEnabled(False)
         else:
             self.data_button.setEnabled(True)
             self.data_button.setText("load data")
+            self.full_button.setEnabled(True)
             self.draw_button.setEnabled(self.plot in self.plot_data)
             self.save_button.setEnabled(self.plot in self.plot_data)
         self.plot_selection.reload_button.setEnabled(True)
@@ -332,12 +350,20 @@ class MatplotlibWidget(QWidget):
                 selection_map[ann](cache_vals, name, ann), SelectionType.draw
             )
 
+    def load_full(self):
+        """Reload the current plot's data from the full traces."""
+        self.preview_box.setChecked(False)
+        self.load_data()
+
     def load_data(self):
         self.data_selections[self.plot] = self.selections.get_data_sels()
+        set_preview(Preview() if self.preview_box.isChecked() else None)
+        clear_samples()
 
         # Disable buttons and show loading status
         self.data_button.setEnabled(False)
         self.data_button.setText("loading...")
+        self.full_button.setEnabled(False)
         self.draw_button.setEnabled(False)
 
         # Track which plot is loading
@@ -350,20 +376,25 @@ class MatplotlibWidget(QWidget):
     def on_load_finished(self, loaded_plot, result):
         self.plot_data[loaded_plot] = result
         self.loading_plot = None
+        self.cache_label.setText(str(cache_stats()))
+        self.show_samples()
         # Only update UI if we're still on the same plot
         if loaded_plot == self.plot:
             self.draw_button.setEnabled(True)
             self.save_button.setEnabled(True)
             self.data_button.setEnabled(True)
             self.data_button.setText("load data")
+            self.full_button.setEnabled(True)
         self.save_cache()
 
     def on_load_error(self, loaded_plot, e):
         self.loading_plot = None
+        self.cache_label.setText(str(cache_stats()))
         # Only show error if we're still on the same plot
         if loaded_plot == self.plot:
             self.data_button.setEnabled(True)
             self.data_button.setText("load data")
+            self.full_button.setEnabled(True)
             error_msg = QMessageBox(self)
             error_msg.setIcon(QMessageBox.Icon.Critical)
             error_msg.setWindowTitle("Error Loading Data")
@@ -372,6 +403,17 @@ class MatplotlibWidget(QWidget):
             error_msg.setStandardButtons(QMessageBox.StandardButton.Ok)
             error_msg.exec()
 
+    def show_samples(self):
+        """Show how much of the traces the loaded data covers."""
+        drawn = samples()
+        if not drawn:
+            self.preview_label.setText("")
+            self.preview_label.setToolTip("")
+            return
+        factor = min(s.factor for s in drawn)
+        self.preview_label.setText(f"preview: {factor:.2%} of kernels")
+        self.preview_label.setToolTip("\n".join(dict.fromkeys(str(s) for s in drawn)))
+
     def draw_plot(self):
         try:
             if self.plot not in self.plot_data:
@@ -557,7 +599,35 @@ class MainWindow(QMainWindow):
 
 
 def main():
-    app = QApplication(sys.argv)
+    parser = ArgumentParser(description="Select and view chopper plots")
+    parser.add_argument(
+        '--disk-cache',
+        nargs='?',
+        const=os.path.join("chopper_cache", "derived"),
+        metavar='DIR',
+        help='keep derived frames under DIR (default: chopper_cache/derived) so reopening a run '
+             'skips recomputing them',
+    )
+    parser.add_argument(
+        '--disk-cache-gb',
+        type=float,
+        default=4.0,
+        help='size bound of the disk cache; the least recently used frames go first (default: 4)',
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='worker processes for loading configs and per-GPU stages (0: load in-process; '
+             'default: one per config, up to one per core, with per-GPU stages in-process)',
+    )
+    # The rest (e.g. -platform) is for Qt
+    args, qt_args = parser.parse_known_args()
+    if args.disk_cache:
+        set_disk_cache(args.disk_cache, int(args.disk_cache_gb * 2**30))
+    if args.workers is not None:
+        set_workers(args.workers)
+
+    app = QApplication(sys.argv[:1] + qt_args)
     window = MainWindow()
     window.show()
     sys.exit(app.exec())
@@ -0,0 +1,83 @@
+"""Scaling benchmark for chopper.common.intervals.innermost.
+
+Builds a synthetic annotation hierarchy (iterations > layers > operators),
+like the user_annotation ranges of a PyTorch trace, and labels a fixed set
+of cpu op timestamps with it. Compares the sweep-line engine against the
+longest-first overwrite that merge.assign_ranges used to do, and checks that
+both agree.
+
+  python examples/benchmarks/innermost_scaling.py --points 1000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from chopper.common.intervals import innermost
+
+
+def overwrite_innermost(points, starts, ends):
+    """Reference: sort ranges longest-first and overwrite covered points."""
+    sort_idx = points.argsort(kind='stable')
+    sorted_pts = points[sort_idx]
+    result = np.full(len(points), -1, dtype=np.int64)
+    for i in np.argsort(starts - ends, kind='stable'):
+        lo = np.searchsorted(sorted_pts, starts[i], side='left')
+        hi = np.searchsorted(sorted_pts, ends[i], side='right')
+        result[lo:hi] = i
+    final = np.empty_like(result)
+    final[sort_idx] = result
+    return final
+
+
+def make_ranges(n_ranges, rng, iter_ns=100_000_000, ops_per_layer=16, layers=32):
+    """Nested iteration/layer/op ranges, roughly n_ranges in total."""
+    per_iter = 1 + layers * (1 + ops_per_layer)
+    n_iters = max(1, n_ranges // per_iter)
+    starts, ends = [], []
+    layer_ns = iter_ns // (layers + 1)
+    op_ns = layer_ns // ops_per_layer
+    for it in range(n_iters):
+        t0 = it * iter_ns
+        starts.append(t0)
+        ends.append(t0 + iter_ns - 1)
+        for layer in range(layers):
+            l0 = t0 + layer * layer_ns
+            starts.append(l0)
+            ends.append(l0 + layer_ns - 1)
+            op0 = l0 + np.arange(ops_per_layer) * op_ns
+            starts.extend(op0.tolist())
+            ends.extend((op0 + rng.integers(op_ns // 2, op_ns, ops_per_layer)).tolist())
+    starts = np.asarray(starts[:n_ranges], dtype=np.int64)
+    ends = np.asarray(ends[:n_ranges], dtype=np.int64)
+    return starts, ends, n_iters * iter_ns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="innermost() scaling over annotation count")
+    parser.add_argument("--points", type=int, default=1_000_000,
+                        help="number of cpu op timestamps to label")
+    parser.add_argument("--ranges", type=int, nargs="+",
+                        default=[100, 1_000, 10_000, 50_000, 200_000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'ranges':>10s} {'overwrite (s)':>14s} {'sweep (s)':>10s} {'speedup':>8s}")
+    for n_ranges in args.ranges:
+        starts, ends, span = make_ranges(n_ranges, rng)
+        points = rng.integers(0, span, args.points)
+
+        t0 = time.perf_counter()
+        ref = overwrite_innermost(points, starts, ends)
+        t1 = time.perf_counter()
+        got = innermost(points, starts, ends)
+        t2 = time.perf_counter()
+
+        assert np.array_equal(ref, got), f"mismatch at {n_ranges} ranges"
+        print(f"{len(starts):10d} {t1 - t0:14.3f} {t2 - t1:10.3f} {(t1 - t0) / (t2 - t1):7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
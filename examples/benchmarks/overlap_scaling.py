@@ -0,0 +1,95 @@
+"""Scaling benchmark for chopper.common.intervals.union_overlap.
+
+Builds a synthetic FSDP-like timeline per GPU: compute operators back to
+back, and two communication streams (all-gather and reduce-scatter) whose
+kernels overlap the operators and each other. Compares the sweep-line
+engine against the per-operator iterrows() loop that load.get_overlap_df
+and trace_metrics.compute_overlap_cdf used to run, and checks that the
+engine matches an exact union wherever the loop did not double count.
+
+  python examples/benchmarks/overlap_scaling.py --gpus 8 --iters 1 2 5
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from chopper.common.intervals import union_overlap
+
+
+def loop_overlap(comp_df, comm_df):
+    """Reference: per operator, sum its overlap with every comm kernel."""
+    out = np.zeros(len(comp_df))
+    for gpu, group in comp_df.groupby('gpu'):
+        gpu_comm_df = comm_df[comm_df['gpu'] == gpu]
+        for i, op in group.iterrows():
+            hit = gpu_comm_df[(gpu_comm_df['ts'] <= op['end_ts']) & (gpu_comm_df['end_ts'] >= op['ts_first'])]
+            total = 0
+            for _, k in hit.iterrows():
+                total += max(0, min(op['end_ts'], k['end_ts']) - max(op['ts_first'], k['ts']))
+            out[i] = min(op['end_ts'] - op['ts_first'], total)
+    return out
+
+
+def make_timeline(n_gpus, n_iters, rng, layers=32, ops_per_layer=12, op_ns=200_000):
+    """Compute operators and two overlapping comm streams per GPU."""
+    comp, comm = [], []
+    n_ops = n_iters * layers * ops_per_layer
+    for gpu in range(n_gpus):
+        durs = rng.integers(op_ns // 2, op_ns * 2, n_ops)
+        starts = np.cumsum(np.r_[0, durs[:-1] + rng.integers(0, op_ns // 10, n_ops - 1)])
+        comp.append(pd.DataFrame({'gpu': gpu, 'ts_first': starts, 'end_ts': starts + durs}))
+        span = starts[-1] + durs[-1]
+        for n_kernels in (layers * n_iters, layers * n_iters * 2):
+            ts = np.sort(rng.integers(0, span, n_kernels))
+            comm.append(pd.DataFrame({'gpu': gpu, 'ts': ts, 'end_ts': ts + rng.integers(op_ns, op_ns * 8, n_kernels)}))
+    return pd.concat(comp, ignore_index=True), pd.concat(comm, ignore_index=True)
+
+
+def exact_union(comp_df, comm_df):
+    """Covered time by painting every comm kernel onto a per-GPU bitmap."""
+    out = np.zeros(len(comp_df), dtype=np.int64)
+    for gpu, group in comp_df.groupby('gpu'):
+        kernels = comm_df[comm_df['gpu'] == gpu]
+        t0 = min(group['ts_first'].min(), kernels['ts'].min())
+        covered = np.zeros(max(group['end_ts'].max(), kernels['end_ts'].max()) - t0 + 1, dtype=np.int8)
+        for s, e in zip(kernels['ts'] - t0, kernels['end_ts'] - t0):
+            covered[s:e] = 1
+        prefix = np.r_[0, np.cumsum(covered)]
+        out[group.index] = prefix[group['end_ts'] - t0] - prefix[group['ts_first'] - t0]
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="union_overlap() against the iterrows() overlap loop")
+    parser.add_argument("--gpus", type=int, default=8)
+    parser.add_argument("--iters", type=int, nargs="+", default=[1, 2, 5])
+    parser.add_argument("--check", action="store_true",
+                        help="also compare against an exact bitmap union (slow, small sizes only)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'operators':>10s} {'comm':>8s} {'loop (s)':>9s} {'sweep (s)':>10s} {'speedup':>8s} {'double counted':>15s}")
+    for n_iters in args.iters:
+        comp_df, comm_df = make_timeline(args.gpus, n_iters, rng)
+
+        t0 = time.perf_counter()
+        ref = loop_overlap(comp_df, comm_df)
+        t1 = time.perf_counter()
+        got = union_overlap(comp_df['ts_first'].to_numpy(), comp_df['end_ts'].to_numpy(), comp_df['gpu'].to_numpy(),
+                            comm_df['ts'].to_numpy(), comm_df['end_ts'].to_numpy(), comm_df['gpu'].to_numpy())
+        t2 = time.perf_counter()
+
+        # The loop sums overlapping kernels, so it can only over-count
+        assert (got <= ref).all(), "union overlap exceeds the summed overlap"
+        if args.check:
+            assert np.array_equal(got, exact_union(comp_df, comm_df)), f"mismatch at {n_iters} iterations"
+        print(f"{len(comp_df):10d} {len(comm_df):8d} {t1 - t0:9.3f} {t2 - t1:10.4f} {(t1 - t0) / (t2 - t1):7.0f}x "
+              f"{(got < ref).mean():14.1%}")
+
+
+if __name__ == "__main__":
+    main()
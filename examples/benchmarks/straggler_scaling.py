@@ -0,0 +1,95 @@
+"""Scaling benchmark for load.straggler_values over many ranks.
+
+Builds a synthetic operator table like get_straggler_df's grouped frame:
+every GPU runs the same operators each iteration, with per-rank jitter and
+a few slow ranks, and the rows are in ts_first order. Compares the
+vectorized straggler_values against the aggregate-and-merge path with a
+per-GPU transform(lambda) that get_straggler_df used to run, checks that
+both agree, and reports time per rank so linear scaling shows as a flat
+column.
+
+  python examples/benchmarks/straggler_scaling.py --gpus 8 64 256 1024
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from chopper.common.load import straggler_values
+
+GROUP_ARR = ['iteration', 'layer', 'operator-name']
+
+
+def merge_stragglers(df, group_arr, agg_meth):
+    """Reference: aggregate across GPUs, merge back, shift with a lambda."""
+    agg_df = df.groupby(group_arr, dropna=False).agg(
+        **{f'ts_first_{agg_meth}': ('ts_first', agg_meth)}
+    ).sort_values(f'ts_first_{agg_meth}').reset_index()
+    df = df.merge(agg_df, on=group_arr, how='left')
+    df['s-value'] = df[f'ts_first_{agg_meth}'] - df['ts_first']
+    df['s-delta'] = df.groupby('gpu')['s-value'].transform(lambda x: x.shift(-1) - x)
+    last_op_of_iter_mask = df.groupby(['gpu', 'iteration']).cumcount(ascending=False) == 0
+    df.loc[last_op_of_iter_mask, 's-delta'] = 0
+    return df
+
+
+def make_operators(n_gpus, n_iters, rng, layers=32, ops_per_layer=12, op_ns=200_000):
+    """One row per GPU and operator, sorted by ts_first."""
+    ops = [f'{phase}_layer_op{i}' for phase in ('f', 'b') for i in range(ops_per_layer // 2)]
+    n_ops = n_iters * layers * len(ops)
+    # Every rank runs the same schedule; a few ranks are slower throughout
+    schedule = np.cumsum(rng.integers(op_ns // 2, op_ns * 2, n_ops))
+    slow = rng.random(n_gpus) < 0.05
+    ts_first = (1_700_000_000_000_000_000 + schedule[None, :]
+                + rng.integers(0, op_ns // 4, (n_gpus, n_ops))
+                + np.where(slow, op_ns, 0)[:, None] * np.arange(n_ops)[None, :] // n_ops)
+    dur = rng.integers(op_ns // 2, op_ns, (n_gpus, n_ops))
+    op_idx = np.tile(np.arange(n_ops), n_gpus)
+    df = pd.DataFrame({
+        'gpu': np.repeat(np.arange(n_gpus), n_ops).astype(np.int16),
+        'iteration': pd.array(op_idx // (layers * len(ops)), dtype='Int32'),
+        'layer': pd.array(op_idx // len(ops) % layers, dtype='Int16'),
+        'operator-name': pd.Categorical.from_codes(op_idx % len(ops), categories=sorted(ops)),
+        'ts_first': ts_first.ravel(),
+        'ts_last': ts_first.ravel() + dur.ravel() // 2,
+        'dur': dur.ravel(),
+        'dur_last': dur.ravel() // 2,
+    })
+    return df.sort_values('ts_first').reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="straggler_values() against the aggregate-and-merge path")
+    parser.add_argument("--gpus", type=int, nargs="+", default=[8, 64, 256, 1024])
+    parser.add_argument("--iters", type=int, default=2)
+    parser.add_argument("--agg", default="max", help="agg_meth, as in get_straggler_df")
+    parser.add_argument("--skip-reference", action="store_true",
+                        help="time only straggler_values (the reference is slow at 1024 ranks)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'gpus':>6s} {'operators':>10s} {'merge (s)':>10s} {'vector (s)':>11s} {'speedup':>8s} {'us/rank':>8s}")
+    for n_gpus in args.gpus:
+        df = make_operators(n_gpus, args.iters, rng)
+
+        t0 = time.perf_counter()
+        got = straggler_values(df, GROUP_ARR, args.agg)
+        t1 = time.perf_counter()
+        if args.skip_reference:
+            ref_s, speedup = float('nan'), float('nan')
+        else:
+            ref = merge_stragglers(df, GROUP_ARR, args.agg)
+            ref_s = time.perf_counter() - t1
+            speedup = ref_s / (t1 - t0)
+            # A float64 mean of epoch nanoseconds is only good to 256 ns
+            tolerance = dict(check_exact=False, atol=1024, rtol=0) if args.agg == 'mean' else {}
+            pd.testing.assert_frame_equal(got, ref, **tolerance)
+        print(f"{n_gpus:6d} {len(df):10d} {ref_s:10.3f} {t1 - t0:11.4f} {speedup:7.1f}x "
+              f"{(t1 - t0) / n_gpus * 1e6:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Synthetic PyTorch traces and merged kernel tables shared by the tests.
+
+write_trace emits a small trace with the structure merge has to untangle:
+nested Iteration/Layer/operator annotations, fwd/bwd flow events, parent
+ops carrying sequence numbers for their unnumbered children, autograd ops
+without one launching collectives, and events in shuffled order. It
+returns the labels merge should give each kernel, in launch order.
+"""
+
+import json
+import os
+import random
+
+import pytest
+
+from chopper.profile.merge import assemble, parse_trace, save_columns, write_kernels
+
+OPERATORS = (
+    ('attn_qkv_p', 'Cijk_gemm_a'),
+    ('attn_fa', 'fmha_fwd'),
+    ('mlp_fc_p', 'Cijk_gemm_b'),
+    ('norm', 'elementwise_kernel'),
+)
+
+RANKS = 4
+
+
+def write_trace(path, n_iters=4, n_layers=3, seed=0, indent=None):
+    """Write a synthetic trace to path.
+
+    Returns:
+        (kernel name, operator-name, layer, iteration) of every kernel, in
+        launch order, None where merge leaves the label missing
+    """
+    rnd = random.Random(seed)
+    events = []
+    labels = []
+    counters = {'ext': 0, 'corr': 0, 'seq': 0, 'flow': 0}
+    clock = {'cpu': 1000.0, 'gpu': 0.0}
+
+    def next_id(kind):
+        counters[kind] += 1
+        return counters[kind]
+
+    def op(name, ts, dur, seq=None):
+        ext = next_id('ext')
+        args = {'External id': ext}
+        if seq is not None:
+            args['Sequence number'] = seq
+        events.append({'ph': 'X', 'cat': 'cpu_op', 'name': name, 'ts': ts, 'dur': dur, 'args': args})
+        return ext
+
+    def launch(ext, ts, name, label):
+        corr = next_id('corr')
+        args = {'correlation': corr, 'External id': ext}
+        events.append({'ph': 'X', 'cat': 'cuda_runtime', 'name': 'hipLaunchKernel', 'ts': ts + 0.5, 'dur': 1.0,
+                       'args': args})
+        start = max(clock['gpu'], ts + 1)
+        dur = rnd.randint(2, 40) + 0.125
+        events.append({'ph': 'X', 'cat': 'kernel', 'name': name, 'ts': start, 'dur': dur, 'args': dict(args)})
+        clock['gpu'] = start + dur + rnd.random() * 3
+        labels.append((name, *label))
+
+    def annotate(name, ts, end):
+        events.append({'ph': 'X', 'cat': 'user_annotation', 'name': name, 'ts': ts, 'dur': end - ts})
+
+    # A kernel before the first iteration gets no labels
+    t = clock['cpu']
+    launch(op('aten::empty', t, 2.0), t, 'fill_kernel', (None, None, None))
+    t += 10
+
+    for it in range(n_iters):
+        it_start = t
+        forward = []
+        for layer in range(n_layers):
+            layer_start = t
+            for name, kernel in OPERATORS:
+                op_start = t
+                t += 0.5
+                seq = next_id('seq')
+                op('aten::linear', t, 6.0, seq)
+                launch(op('aten::addmm', t + 1, 4.0), t + 1, kernel, (f'f_{name}', layer, it))
+                flow = next_id('flow')
+                events.append({'ph': 's', 'cat': 'fwdbwd', 'id': flow, 'name': 'fwdbwd', 'ts': t})
+                forward.append((flow, seq, layer))
+                t += 7
+                annotate(name, op_start, t + 0.25)
+                t += 0.5
+            annotate(f'Layer{layer}', layer_start - 0.1, t + 0.2)
+            t += 1
+
+        start = t
+        launch(op('nccl:all_gather', t + 0.2, 3.0), t + 0.2, 'ncclDevKernel_Generic',
+               ('FSDP::all_gather', None, it))
+        t += 4
+        annotate('FSDP::all_gather', start, t)
+
+        for (flow, seq, layer), (name, _) in zip(reversed(forward), reversed(OPERATORS * n_layers)):
+            t += 0.5
+            op('autograd::engine::evaluate_function: AddmmBackward0', t, 10.0)
+            op('AddmmBackward0', t + 0.5, 8.0, seq)
+            events.append({'ph': 'f', 'bp': 'e', 'cat': 'fwdbwd', 'id': flow, 'name': 'fwdbwd', 'ts': t + 0.5})
+            launch(op('aten::mm', t + 1, 5.0), t + 1, 'Cijk_gemm_bwd', (f'b_{name}', layer, it))
+            # Launched under the autograd op but without a sequence number
+            launch(op('nccl:all_gather', t + 8.7, 1.0), t + 8.7, 'ncclDevKernel_Generic', (None, layer, it))
+            t += 11
+
+        start = t
+        launch(op('aten::_foreach_add_', t + 0.3, 2.0), t + 0.3, 'multi_tensor_apply_kernel',
+               ('Optimizer.step#AdamW.step', None, it))
+        t += 3
+        annotate('Optimizer.step#AdamW.step', start, t)
+        t = max(t, clock['gpu']) + 5
+        annotate(f'Iteration{it}', it_start - 0.2, t)
+        t += 3
+
+    events.append({'ph': 'X', 'cat': 'gpu_user_annotation', 'name': 'x', 'ts': 1.0, 'dur': 1.0})
+    rnd.shuffle(events)
+    with open(path, 'w') as f:
+        json.dump({'schemaVersion': 1, 'deviceProperties': [{'id': 0, 'name': 'MI300X'}], 'traceEvents': events},
+                  f, indent=indent)
+    return labels
+
+
+@pytest.fixture(scope='session')
+def traces(tmp_path_factory):
+    """One trace per rank, alternately compact and indented JSON, with their labels."""
+    root = tmp_path_factory.mktemp('traces')
+    out = {}
+    for rank in range(RANKS):
+        path = str(root / f'rank{rank}.json')
+        out[path] = write_trace(path, seed=rank, indent=1 if rank % 2 else None)
+    return out
+
+
+@pytest.fixture(scope='session')
+def kernels(traces, tmp_path_factory):
+    """The traces merged into one kernel table, as merge writes it."""
+    root = tmp_path_factory.mktemp('kernels')
+    parts = [save_columns(parse_trace(t), str(root / str(i))) for i, t in enumerate(traces)]
+    return assemble(parts, gpus=range(len(parts)))
+
+
+@pytest.fixture(scope='session', params=['pickle', 'store'])
+def kernel_file(request, kernels, tmp_path_factory):
+    """kernels written as a pickle and as a column store, each with its index."""
+    root = tmp_path_factory.mktemp(request.param)
+    path = os.path.join(root, 'ts.pkl' if request.param == 'pickle' else 'ts')
+    write_kernels(kernels, path)
+    return path
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chopper.common.annotations import (
+    assign_chunks,
+    assign_operator_type,
+    chunk_mask,
+    fix_names,
+    kernel_classes,
+    no_overlap_mask,
+    operator_mask,
+)
+
+EXTRA_OPERATORS = ['f_b_attn_fa', 'f_mlp_fc_p', 'b_ffn_p', 'opt_step', 'FSDP::pre_forward',
+                   'FSDP::post_backward_reduce_x', 'Optimizer.zero_grad', None]
+EXTRA_KERNELS = ['ncclDevKernel_AllReduce', 'Cijk_Alik', 'NCCL_copy', 'Cijk_nccl', None, 'x']
+
+
+@pytest.fixture(params=['category', 'object'])
+def table(request, kernels):
+    rng = np.random.default_rng(0)
+    n = len(kernels)
+    ops = kernels['operator-name'].astype(object).where(rng.random(n) > 0.2, rng.choice(EXTRA_OPERATORS, n))
+    names = kernels['name'].astype(object).where(rng.random(n) > 0.2, rng.choice(EXTRA_KERNELS, n))
+    return pd.DataFrame({'name': names, 'operator-name': ops}).astype(request.param)
+
+
+def strings(col):
+    """The column as object strings, as the rules matched them before."""
+    return col.astype(object).where(col.notna(), np.nan).astype(object)
+
+
+def assert_labels(got, expected):
+    pd.testing.assert_series_equal(strings(got), strings(expected), check_names=False)
+
+
+def test_chunks(table):
+    op = strings(table['operator-name'])
+    opt = op.str.startswith('opt_', na=False) | op.str.startswith('Optimizer.', na=False)
+    bwd = op.str.startswith('b_', na=False) & ~opt
+    expected = pd.Series(np.where(opt, 'opt', np.where(bwd, 'bwd', 'fwd')), index=op.index).where(op.notna())
+    chunks = assign_chunks(table)['chunk']
+    assert_labels(chunks, expected)
+    pd.testing.assert_series_equal(chunk_mask(table, ['fwd', 'opt']), expected.isin(['fwd', 'opt']),
+                                   check_names=False)
+    assert 'chunk' not in table.columns
+
+
+def test_no_overlap_mask(table):
+    pattern = 'FSDP::post_backward_reduce|FSDP::pre_forward|FSDP::all_gather_copy_out|FSDP::all_gather'
+    expected = ~(strings(table['operator-name']).str.contains(pattern, na=False)
+                 | strings(table['name']).str.startswith('ncclDevKernel', na=False))
+    pd.testing.assert_series_equal(no_overlap_mask(table), expected, check_names=False)
+
+
+def test_fix_names(table):
+    op = strings(table['operator-name'])
+    expected = op.str.replace('^f_b_', 'b_', regex=True)
+    expected = expected.where(~expected.str.endswith('Optimizer.step#AdamW.step', na=False), 'opt_step')
+    expected = expected.str.replace('_fc_', '_mlp_').str.replace('_ffn_', '_mlp_')
+    fixed = fix_names(table)['operator-name']
+    assert isinstance(fixed.dtype, pd.CategoricalDtype) == isinstance(table['operator-name'].dtype, pd.CategoricalDtype)
+    assert_labels(fixed, expected)
+
+
+def test_operator_types(table):
+    op = strings(table['operator-name'])
+    gemm = op.str.endswith('p', na=False) & ~op.str.endswith('Optimizer.step#AdamW.step', na=False)
+    fa = op.str.endswith('attn_fa', na=False)
+    expected = pd.Series(np.where(fa, 'FA', np.where(gemm, 'GEMM', 'Vec')), index=op.index)
+    assert_labels(assign_operator_type(table)['operator-type'], expected)
+    pd.testing.assert_series_equal(operator_mask(table, types=['FA']), fa, check_names=False)
+    names = ['b_mlp_p', 'f_attn_fa']
+    pd.testing.assert_series_equal(operator_mask(table, names=names, fixed=True),
+                                   strings(fix_names(table)['operator-name']).isin(names), check_names=False)
+
+
+def test_kernel_classes(table):
+    name = strings(table['name'])
+    expected = pd.Series('other', index=name.index)
+    expected[name.str.contains('Cijk', na=False)] = 'gemm'
+    expected[name.str.contains('nccl', case=False, na=False)] = 'nccl'
+    assert_labels(kernel_classes(table['name']), expected)
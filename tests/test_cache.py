@@ -0,0 +1,158 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from chopper.common import cache
+from chopper.common.cache import LRUCache, cache_stats, clear_cache, load_pickle
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    clear_cache()
+    yield
+    clear_cache()
+
+
+def write(path, n, stamp):
+    pd.DataFrame({'a': np.arange(n)}).to_pickle(path)
+    os.utime(path, ns=(stamp, stamp))
+
+
+def test_hits_and_invalidation(tmp_path):
+    path = str(tmp_path / 'a.pkl')
+    write(path, 10, 1)
+    assert len(load_pickle(path)) == 10
+    assert len(load_pickle(path)) == 10
+    write(path, 20, 2)
+    assert len(load_pickle(path)) == 20
+    stats = cache_stats()
+    assert (stats.hits, stats.misses, stats.invalidations, stats.entries) == (1, 2, 1, 1)
+
+
+def test_eviction_keeps_recent(tmp_path):
+    paths = [str(tmp_path / f'{i}.pkl') for i in range(4)]
+    for p in paths:
+        write(p, 1000, 1)
+    lru = LRUCache(budget=2 * cache.nbytes(pd.read_pickle(paths[0])))
+    loads = []
+
+    def get(p):
+        return lru.get((p,), lambda _: loads.append(p) or pd.read_pickle(p))
+
+    for p in paths[:3]:
+        get(p)
+    assert list(lru.entries) == [(paths[1],), (paths[2],)]
+    get(paths[1])
+    get(paths[3])
+    assert list(lru.entries) == [(paths[1],), (paths[3],)]
+    assert loads == paths
+    assert (lru.stats.evictions, lru.stats.hits) == (2, 1)
+    assert lru.stats.nbytes <= lru.budget
+
+
+def test_oversized_entry_is_kept(tmp_path):
+    path = str(tmp_path / 'a.pkl')
+    write(path, 1000, 1)
+    lru = LRUCache(budget=1)
+    lru.get((path,), lambda _: pd.read_pickle(path))
+    assert list(lru.entries) == [(path,)]
+
+
+def test_writes_do_not_reach_the_cache(tmp_path):
+    path = str(tmp_path / 'a.pkl')
+    write(path, 10, 1)
+    expected = pd.read_pickle(path)
+    df = load_pickle(path)
+    df.loc[0, 'a'] = -1
+    df['a'] += 1
+    df['b'] = 0
+    df.drop(index=[1, 2], inplace=True)
+    pd.testing.assert_frame_equal(load_pickle(path), expected)
+
+
+def test_string_columns_count_characters():
+    df = pd.DataFrame({'name': [f'kernel_{i:0100d}' for i in range(100)], 'dur': np.arange(100)})
+    strs = df.astype({'name': object})
+    for frame in (df, strs):
+        assert cache.nbytes(frame) == frame.memory_usage(deep=True).sum()
+    # Not just the object pointers
+    assert cache.nbytes(strs) > strs.memory_usage(deep=False).sum() + 100 * 100
+
+
+def test_dicts_are_sized_and_evicted(tmp_path):
+    # Shaped like a device-merged pickle: groups of sample and kernel frames
+    paths = [str(tmp_path / f'device{i}.pkl') for i in range(3)]
+    frame = pd.DataFrame({'ts': np.arange(1000)})
+    device = {'counter_to_group': {'GRBM_GUI_ACTIVE': 0}, 'groups': [{'samples': frame, 'kernels': frame}]}
+    for p in paths:
+        pd.to_pickle(device, p)
+    assert cache.nbytes(device) == 2 * cache.nbytes(frame)
+    lru = LRUCache(budget=2 * cache.nbytes(device))
+    for p in paths:
+        lru.get((p,), lambda _, p=p: pd.read_pickle(p))
+    assert list(lru.entries) == [(paths[1],), (paths[2],)]
+    assert lru.stats.evictions == 1
+
+
+calls = []
+
+
+@cache.memoize
+def scaled(path, scale=1):
+    calls.append(scale)
+    return pd.read_pickle(path) * scale
+
+
+@pytest.fixture
+def disk(tmp_path):
+    directory = str(tmp_path / 'derived')
+    budget = cache.disk_budget()
+    cache.set_disk_cache(directory)
+    calls.clear()
+    yield directory
+    cache.set_disk_cache(None, budget)
+
+
+def test_disk_cache_drops_stale_results(tmp_path, disk):
+    path = str(tmp_path / 'a.pkl')
+    write(path, 10, 1)
+    scaled(path), scaled(path, 2)
+    assert len(os.listdir(disk)) == 2
+    write(path, 20, 2)
+    clear_cache()
+    assert len(scaled(path)) == 20
+    # The results of the old file are gone, not just unreachable
+    (name,) = os.listdir(disk)
+    assert name.startswith('scaled-')
+    clear_cache()
+    pd.testing.assert_frame_equal(scaled(path), pd.read_pickle(path))
+    assert calls == [1, 2, 1]
+
+
+def test_disk_cache_budget(tmp_path, disk):
+    path = str(tmp_path / 'a.pkl')
+    write(path, 1000, 1)
+    scaled(path)
+    size = os.path.getsize(os.path.join(disk, os.listdir(disk)[0]))
+    cache.set_disk_cache(disk, 2 * size)
+    for scale in range(2, 6):
+        scaled(path, scale)
+    assert len(os.listdir(disk)) == 2
+    # The least recently read go first
+    clear_cache()
+    calls.clear()
+    scaled(path, 4), scaled(path, 5), scaled(path, 3)
+    assert calls == [3] and len(os.listdir(disk)) == 2
+    clear_cache()
+    scaled(path, 3), scaled(path, 5)
+    assert calls == [3]
+
+
+def test_intermediate_frames_stay_off_disk(kernel_file, disk):
+    from chopper.common.load import get_df, get_straggler_df
+    get_df(kernel_file, group_arr=['gpu'], group_map={'dur': ['sum']})
+    assert not os.path.exists(disk)
+    get_straggler_df(kernel_file)
+    assert {name.split('-')[0] for name in os.listdir(disk)} == {'get_straggler_df'}
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pytest
+
+from chopper.common.index import TraceIndex, index_path
+from chopper.common.intervals import union_overlap
+from chopper.common.load import select_iters
+
+
+@pytest.mark.parametrize('gpus', [None, [0], [1, 3]])
+@pytest.mark.parametrize('iterations', [None, [2], [0, 3]])
+@pytest.mark.parametrize('iter_idxs', [None, [-1], [0, 2]])
+def test_iteration_rows(kernels, gpus, iterations, iter_idxs):
+    # Rows out of ts order; iteration positions still count in ts order
+    df = kernels.sample(frac=1, random_state=0).reset_index(drop=True)
+    expected = df
+    if gpus is not None:
+        expected = expected[expected['gpu'].isin(gpus)]
+    if iterations is not None:
+        expected = expected[expected['iteration'].isin(iterations)]
+    if iter_idxs:
+        selected = select_iters(df.sort_values('ts'), iter_idxs)['iteration'].unique()
+        expected = expected[expected['iteration'].isin(selected)]
+    rows = TraceIndex.build(df).iteration_rows(gpus, iterations, iter_idxs)
+    np.testing.assert_array_equal(rows, expected.index.to_numpy())
+
+
+def test_index_goes_stale(kernels, tmp_path):
+    table = str(tmp_path / 'ts.pkl')
+    kernels.to_pickle(table)
+    TraceIndex.build(kernels).save(index_path(table), table=table)
+    index = TraceIndex.load(index_path(table), table=table)
+    np.testing.assert_array_equal(index.iteration_rows(), np.arange(len(kernels)))
+    kernels.iloc[:10].to_pickle(table)
+    os.utime(table, ns=(0, 0))
+    assert TraceIndex.load(index_path(table), table=table) is None
+
+
+@pytest.fixture(scope='module')
+def windows(kernels):
+    """Time windows across the trace: empty, instants, spanning many kernels."""
+    rng = np.random.default_rng(0)
+    lo, hi = kernels['ts'].min() - 10, (kernels['ts'] + kernels['dur']).max() + 10
+    t0 = rng.integers(lo, hi, 50)
+    return t0, t0 + rng.choice([0, 1, 1000, 10**6], 50)
+
+
+def test_active_rows(kernels, windows):
+    df = kernels.sample(frac=1, random_state=0).reset_index(drop=True)
+    index = TraceIndex.build(df)
+    ts, end = df['ts'].to_numpy(), (df['ts'] + df['dur']).to_numpy()
+    for gpu in [0, 3, 99]:
+        on_gpu = df['gpu'].to_numpy() == gpu
+        for t0, t1 in zip(*windows):
+            expected = np.flatnonzero(on_gpu & (ts <= t1) & (end >= t0))
+            rows = index.active_rows(gpu, t0, t1)
+            np.testing.assert_array_equal(np.sort(rows), expected)
+            assert (np.diff(ts[rows]) >= 0).all()
+        covered = [(on_gpu & (ts <= t) & (end >= t)).any() for t in windows[0]]
+        np.testing.assert_array_equal(index.active_at(gpu, windows[0]), covered)
+
+
+def test_index_overlap(kernels, windows):
+    index = TraceIndex.build(kernels)
+    starts, ends = windows
+    for gpu in [1, 99]:
+        expected = union_overlap(starts, ends, np.full(len(starts), gpu), kernels['ts'].to_numpy(),
+                                 (kernels['ts'] + kernels['dur']).to_numpy(), kernels['gpu'].to_numpy())
+        np.testing.assert_array_equal(index.overlap(gpu, starts, ends), expected)
+
+
+def test_saved_index_answers_windows(kernels, windows, tmp_path):
+    TraceIndex.build(kernels).save(str(tmp_path / 'index'))
+    index, built = TraceIndex.load(str(tmp_path / 'index')), TraceIndex.build(kernels)
+    for t0, t1 in zip(*windows):
+        np.testing.assert_array_equal(index.active_rows(2, t0, t1), built.active_rows(2, t0, t1))
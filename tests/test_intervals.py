@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chopper.common.intervals import innermost, union_overlap
+from chopper.common.load import get_overlap_df
+from chopper.profile.merge import write_kernels
+
+
+def overwrite_longest_first(points, starts, ends):
+    """The labeling innermost replaces: paint ranges longest first, later ranges winning ties."""
+    out = np.full(len(points), -1, dtype=np.int64)
+    for i in np.argsort(-(ends - starts), kind='stable'):
+        out[(points >= starts[i]) & (points <= ends[i])] = i
+    return out
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_innermost_matches_overwrite(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(0, 60))
+    starts = rng.integers(0, 100, n)
+    # Zero-length, nested, partially overlapping and equal-length ranges
+    ends = starts + rng.integers(0, 30, n)
+    points = rng.integers(-5, 135, 200)
+    np.testing.assert_array_equal(innermost(points, starts, ends), overwrite_longest_first(points, starts, ends))
+    fpoints, fstarts, fends = points / 4, starts / 4, ends / 4
+    np.testing.assert_array_equal(innermost(fpoints, fstarts, fends), overwrite_longest_first(fpoints, fstarts, fends))
+
+
+def test_innermost_empty():
+    empty = np.empty(0, dtype=np.int64)
+    np.testing.assert_array_equal(innermost([1, 2], empty, empty), [-1, -1])
+    assert len(innermost(empty, [0], [1])) == 0
+
+
+def covered(start, end, starts, ends):
+    """Length of [start, end] under the union of the ranges, one range at a time."""
+    total, reach = 0, start
+    for s, e in sorted(zip(starts, ends)):
+        s, e = max(s, reach), min(e, end)
+        if e > s:
+            total += e - s
+            reach = e
+    return total
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_union_overlap_matches_merge(seed):
+    rng = np.random.default_rng(seed)
+    n, r = int(rng.integers(0, 40)), int(rng.integers(0, 40))
+    starts = rng.integers(0, 200, n) / 8
+    ends = starts + rng.integers(0, 300, n) / 8
+    groups = rng.integers(0, 3, n)
+    # Nested, chained and concurrent ranges, some in groups with no queries
+    other_starts = rng.integers(0, 200, r) / 8
+    other_ends = other_starts + rng.integers(0, 80, r) / 8
+    other_groups = rng.integers(0, 4, r)
+    expected = [covered(s, e, other_starts[other_groups == g], other_ends[other_groups == g])
+                for s, e, g in zip(starts, ends, groups)]
+    got = union_overlap(starts, ends, groups, other_starts, other_ends, other_groups)
+    np.testing.assert_allclose(got, np.array(expected, dtype=float).reshape(-1))
+
+
+def test_union_overlap_disjoint_is_pairwise_sum():
+    # With no concurrent ranges the union is the old per-kernel sum
+    starts, ends = np.array([0, 5, 12, 30]), np.array([10, 25, 13, 31])
+    other_starts, other_ends = np.array([2, 9, 20, 40]), np.array([4, 15, 22, 45])
+    pairwise = [sum(max(0, min(e, oe) - max(s, os_)) for os_, oe in zip(other_starts, other_ends))
+                for s, e in zip(starts, ends)]
+    zeros = np.zeros(4, dtype=int)
+    np.testing.assert_array_equal(union_overlap(starts, ends, zeros, other_starts, other_ends, zeros), pairwise)
+
+
+def test_overlap_df_counts_concurrent_comm_once(kernels, tmp_path):
+    # Pull every collective back over the compute kernels before it, and
+    # double it up on a second stream
+    comm = kernels['name'].astype(str).str.startswith('ncclDevKernel')
+    shifted = kernels.assign(ts=kernels['ts'].where(~comm, kernels['ts'] - 60))
+    doubled = shifted[comm].assign(ts=lambda d: d['ts'] + 10, stream=-1)
+    table = pd.concat([shifted, doubled], ignore_index=True).sort_values('ts', ignore_index=True)
+    path = str(tmp_path / 'ts.pkl')
+    write_kernels(table, path)
+    ovr_df, comm_df = get_overlap_df(path, include_comm_df=True)
+    expected = [
+        100 * covered(s, e, *comm_df.loc[comm_df['gpu'] == g, ['ts', 'end_ts']].to_numpy().T) / elapsed
+        for s, e, g, elapsed in ovr_df[['ts_first', 'end_ts', 'gpu', 'elapsed']].itertuples(index=False)
+    ]
+    assert (ovr_df['overlap_ratio'] > 0).any()
+    assert (ovr_df['overlap_ratio'] <= 100).all()
+    np.testing.assert_allclose(ovr_df['overlap_ratio'].to_numpy(), expected)
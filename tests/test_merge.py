@@ -0,0 +1,187 @@
+import json
+import os
+import shutil
+from ctypes import c_bool
+from multiprocessing import Value
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from chopper.common.store import compact
+from chopper.profile import merge
+from chopper.profile.merge import (
+    assemble, iteration_spans, main, merge_sorted, parse, parse_parallel, parse_trace, parse_workers, read_kernels, save_columns,
+    trace_key,
+)
+from chopper.profile.stream import iter_events, split_events
+
+
+def assert_events_equal(a, b):
+    assert a.names == b.names
+    for table in ('cpu_ops', 'annotations', 'fwdbwd', 'kernels', 'runtime'):
+        x, y = getattr(a, table), getattr(b, table)
+        assert x.keys() == y.keys()
+        for col in x:
+            np.testing.assert_array_equal(x[col], y[col], err_msg=f'{table}.{col}')
+
+
+@pytest.mark.parametrize('chunk_size', [64, 1000, 1 << 22])
+def test_iter_events_matches_json_load(traces, chunk_size):
+    for path in traces:
+        with open(path) as f:
+            expected = json.load(f)['traceEvents']
+        assert list(iter_events(path, chunk_size=chunk_size)) == expected
+
+
+def test_stream_parse_matches_json_load(traces):
+    for path in traces:
+        assert_events_equal(parse(path, stream=True), parse(path))
+
+
+def labels(df):
+    """(name, operator-name, layer, iteration) per kernel in ts order, None if missing."""
+    df = df.sort_values('ts', kind='stable')
+    cols = [df[c].astype(object).where(df[c].notna(), None) for c in ('name', 'operator-name', 'layer', 'iteration')]
+    return list(zip(*cols))
+
+
+def test_parse_trace_labels(traces):
+    for path, expected in traces.items():
+        df = parse_trace(path)
+        assert labels(df) == expected
+        assert (df['ts_cuda_runtime'] <= df['ts']).all()
+        assert isinstance(df['name'].dtype, pd.CategoricalDtype)
+
+
+@pytest.mark.parametrize('jobs', [2, 3, 7])
+def test_parallel_parse_matches_sequential(traces, jobs):
+    for path in traces:
+        bounds = split_events(path, jobs)
+        assert bounds == sorted(bounds) and len(bounds) <= jobs + 1
+        assert_events_equal(parse_parallel(path, jobs), parse(path))
+    pd.testing.assert_frame_equal(parse_trace(path, jobs=jobs), parse_trace(path))
+
+
+def test_parse_workers_share_budget(traces):
+    size = max(os.path.getsize(t) for t in traces) * 6
+    assert parse_workers(traces, mem_budget=3 * size) == 3
+    assert parse_workers(traces, mem_budget=3 * size, jobs=3) == 1
+    assert parse_workers(traces, mem_budget=100 * size) == len(traces)
+    assert parse_workers(traces, mem_budget=0) == 1
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_merge_traces(traces, kernels, tmp_path, jobs):
+    out = str(tmp_path / 'ts.pkl')
+    main(list(traces), None, None, None, out, jobs=jobs, mem_budget=1 << 30)
+    pd.testing.assert_frame_equal(read_kernels(out), compact(kernels))
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_merge_sorted_matches_stable_sort(seed):
+    rng = np.random.default_rng(seed)
+    runs = [np.sort(rng.integers(0, 50, int(rng.integers(0, 40)))) for _ in range(int(rng.integers(1, 9)))]
+    expected = np.argsort(np.concatenate(runs), kind='stable')
+    np.testing.assert_array_equal(merge_sorted(runs), expected)
+
+
+def as_objects(df):
+    strings = [c for c in df.columns if not pd.api.types.is_numeric_dtype(df[c].dtype)]
+    df = df.astype({c: object for c in strings})
+    # Missing strings as one null, whichever the columns started with
+    df[strings] = df[strings].where(df[strings].notna(), None)
+    return df
+
+
+def test_assemble_matches_concat(traces, kernels):
+    frames = [parse_trace(t).assign(gpu=i) for i, t in enumerate(traces)]
+    expected = pd.concat(frames, ignore_index=True).sort_values('ts', kind='stable', ignore_index=True)
+    pd.testing.assert_frame_equal(as_objects(kernels), as_objects(expected), check_dtype=False)
+
+
+def test_assemble_fills_missing_columns(tmp_path):
+    a = pd.DataFrame({'ts': [1, 4, 6], 'name': ['x', 'y', None], 'n': pd.array([1, None, 3], dtype='Int64')})
+    b = pd.DataFrame({'ts': [2, 4, 9], 'name': ['z', 'x', 'z'], 'f': [0.5, 1.5, 2.5]})
+    parts = [save_columns(df, str(tmp_path / str(i))) for i, df in enumerate((a, b))]
+    expected = pd.concat([a, b], ignore_index=True).sort_values('ts', kind='stable', ignore_index=True)
+    pd.testing.assert_frame_equal(as_objects(assemble(parts)), as_objects(expected), check_dtype=False)
+
+
+def test_trace_key(traces, tmp_path):
+    path = next(iter(traces))
+    copy = str(tmp_path / 'renamed.json')
+    shutil.copy(path, copy)
+    assert trace_key(copy) == trace_key(path)
+    assert trace_key(path, {'iter_idxs': [1]}) == trace_key(copy, {'iter_idxs': (1,)})
+    assert len({trace_key(path), trace_key(path, {'iter_idxs': [1]}), trace_key(path, {'iter_idxs': [2]}),
+                trace_key(path, {'iters': [1]})}) == 4
+    with open(copy, 'r+b') as f:
+        f.seek(-2, os.SEEK_END)
+        f.write(b' ')
+    assert trace_key(copy) != trace_key(path)
+
+
+def test_parse_cached_reuses_entries(traces, tmp_path, monkeypatch):
+    path = next(iter(traces))
+    rows, spec = merge.parse_cached(path, str(tmp_path))
+    expected = assemble([(rows, spec)])
+
+    def fail(*args, **kwargs):
+        raise AssertionError('parsed again')
+
+    copy = str(tmp_path / 'renamed.json')
+    shutil.copy(path, copy)
+    monkeypatch.setattr(merge, 'parse_to_files', fail)
+    cached = merge.parse_cached(copy, str(tmp_path))
+    pd.testing.assert_frame_equal(assemble([cached]), expected)
+    assert [p for p in os.listdir(tmp_path) if p.startswith('.partial-')] == []
+
+
+@pytest.fixture
+def watched(traces, tmp_path):
+    """A profiler output directory holding the traces and one still being written."""
+    directory = tmp_path / 'profiler'
+    directory.mkdir()
+    for path in traces:
+        shutil.copy(path, directory)
+    with open(path) as f:
+        (directory / 'rank9.json').write_text(f.read()[:5000])
+    return str(directory)
+
+
+def test_watch_merges_on_stop(watched, kernels, tmp_path):
+    out = str(tmp_path / 'ts.pkl')
+    merge.watch(Value(c_bool, True), watched, out, settle=0, poll=0)
+    pd.testing.assert_frame_equal(read_kernels(out), compact(kernels))
+
+
+def test_watch_merges_on_interrupt(watched, kernels, tmp_path, monkeypatch):
+    parse_to_files = merge.parse_to_files
+    calls = []
+
+    def interrupted(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise KeyboardInterrupt
+        return parse_to_files(*args, **kwargs)
+
+    monkeypatch.setattr(merge, 'parse_to_files', interrupted)
+    out = str(tmp_path / 'ts.pkl')
+    merge.watch(Value(c_bool, False), watched, out, settle=0, poll=0)
+    pd.testing.assert_frame_equal(read_kernels(out), compact(kernels))
+
+
+@pytest.mark.parametrize('window', [{'iters': [1, 2]}, {'iter_idxs': [-1]}, {'iter_idxs': [0, 2]}])
+def test_parse_window_matches_filtered_parse(traces, window):
+    for path, expected in traces.items():
+        iterations = window.get('iters') or [[0, 1, 2, 3][i] for i in window['iter_idxs']]
+        kept = [label for label in expected if label[3] in iterations]
+        assert labels(parse_trace(path, **window)) == kept
+
+
+def test_parse_ts_range_matches_iteration(traces):
+    for path in traces:
+        events = parse(path)
+        (start,), (end,) = iteration_spans(events.names, events.annotations, iters=[2])
+        pd.testing.assert_frame_equal(parse_trace(path, ts_range=(start, end)), parse_trace(path, iters=[2]))
@@ -0,0 +1,117 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from chopper.common import parallel
+from chopper.common.cache import clear_cache
+from chopper.common.load import get_df, get_overlap_df, get_straggler_df, load_configs
+from chopper.common.parallel import map_partitions, map_tasks
+from chopper.common.sampling import Preview, clear_samples, samples, set_preview
+from chopper.profile.merge import write_kernels
+
+
+@pytest.fixture(scope='module')
+def pool():
+    """Two worker processes, used for tables of any size."""
+    min_rows, workers = parallel.MIN_ROWS, parallel._workers
+    parallel.MIN_ROWS = 0
+    parallel.set_workers(2)
+    yield
+    parallel.set_workers(0)
+    parallel.MIN_ROWS, parallel._workers = min_rows, workers
+
+
+def in_process(load, *args):
+    """load(*args) without the pool and the cache."""
+    clear_cache()
+    workers, parallel._workers = parallel._workers, 0
+    try:
+        return load(*args)
+    finally:
+        parallel._workers = workers
+        clear_cache()
+
+
+def first_and_total(df, other):
+    """A per-GPU stage: each GPU's first kernel name and its total time under the other frame's kernels."""
+    totals = other.groupby('gpu', dropna=False, observed=True)['dur'].sum()
+    out = df.groupby('gpu', dropna=False, observed=True).agg(name=('name', 'first'), n=('dur', 'size'))
+    return out.assign(other=totals.reindex(out.index, fill_value=0).to_numpy())
+
+
+def identity(df):
+    return df
+
+
+def test_map_partitions_matches_in_process(pool, kernels):
+    # Every column kind crosses shared memory: categorical, masked, object
+    # strings, numpy; a missing gpu; a non-default index
+    df = kernels.assign(gpu=kernels['gpu'].astype('Int16').mask(kernels.index % 97 == 0),
+                        label=kernels['operator-name'].astype(object), frac=kernels['dur'] / 7)
+    df.index = np.arange(len(df))[::-1] * 3
+    other = df[df['name'].astype(str).str.startswith('ncclDevKernel')]
+    expected = in_process(first_and_total, df, other)
+    pd.testing.assert_frame_equal(map_partitions(first_and_total, [df, other]), expected)
+
+    rows = map_partitions(identity, df, by=['gpu', 'iteration'])
+    pd.testing.assert_frame_equal(rows.sort_index(), df.sort_index())
+
+
+@pytest.mark.parametrize('load', [
+    lambda fn: get_df(fn, group_arr=['gpu', 'iteration', 'operator-name'], group_map={'dur': ['sum', 'max']}),
+    lambda fn: get_straggler_df(fn),
+    lambda fn: get_overlap_df(fn, kernel_name=True),
+])
+def test_pooled_loads_match_in_process(pool, kernel_file, load):
+    expected = in_process(load, kernel_file)
+    clear_cache()
+    pd.testing.assert_frame_equal(load(kernel_file), expected)
+
+
+@pytest.fixture
+def configs(kernel_file, kernels, tmp_path):
+    """Two configs: the kernel file, and a pickle of half its GPUs."""
+    half = str(tmp_path / 'half.pkl')
+    write_kernels(kernels[kernels['gpu'] < 2], half)
+    return [kernel_file, half], ['all', 'half']
+
+
+@pytest.mark.parametrize('preview', [None, Preview(iterations=2, gpus=1, kernels=20)])
+def test_load_configs_matches_in_process(pool, configs, preview):
+    set_preview(preview)
+    try:
+        clear_samples()
+        expected = in_process(load_configs, get_straggler_df, *configs)
+        drawn = samples()
+        clear_samples()
+        got = load_configs(get_straggler_df, *configs)
+        # Samples the workers drew are recorded in the caller
+        assert samples() == drawn and len(drawn) == (2 if preview else 0)
+    finally:
+        set_preview(None)
+        clear_samples()
+    assert list(got) == ['all', 'half']
+    for config in got:
+        pd.testing.assert_frame_equal(got[config], expected[config])
+
+
+def test_map_tasks_order(pool):
+    assert map_tasks(divmod, [(n, 3) for n in range(10)]) == [divmod(n, 3) for n in range(10)]
+
+
+def pid(fn):
+    return os.getpid()
+
+
+def test_load_configs_pools_by_default(monkeypatch):
+    monkeypatch.setattr(parallel, '_workers', None)
+    monkeypatch.setattr(os, 'cpu_count', lambda: 4)
+    try:
+        got = load_configs(pid, ['a.pkl', 'b.pkl'], ['a', 'b'])
+        assert os.getpid() not in got.values()
+        parallel.set_workers(0)
+        assert load_configs(pid, ['a.pkl', 'b.pkl'], ['a', 'b']) == {'a': os.getpid(), 'b': os.getpid()}
+    finally:
+        parallel.set_workers(0)
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chopper.common.cache import clear_cache
+from chopper.common.load import get_df
+from chopper.common.sampling import Preview, Sample, clear_samples, sample_kernels, samples, set_preview, spread
+
+
+@pytest.fixture(autouse=True)
+def fresh():
+    clear_cache()
+    clear_samples()
+    yield
+    set_preview(None)
+    clear_samples()
+    clear_cache()
+
+
+@pytest.mark.parametrize('n', [1, 4, 7, 100])
+@pytest.mark.parametrize('k', [None, 1, 3, 4, 200])
+def test_spread(n, k):
+    got = spread(n, k)
+    if k is None or k >= n:
+        np.testing.assert_array_equal(got, np.arange(n))
+        return
+    # One item from each of k equal strata
+    np.testing.assert_array_equal(np.floor(got * k / n), np.arange(k))
+
+
+@pytest.mark.parametrize('kernels', [1, 3, 1000])
+def test_sample_kernels(kernels):
+    rng = np.random.default_rng(1)
+    keys = pd.Series(rng.choice(['a', 'b', 'c', None], 500, p=[0.6, 0.3, 0.05, 0.05]))
+    keep = sample_kernels(keys, kernels, seed=7)
+    # The rows with the lowest priorities of each key, as a reservoir sample keeps
+    priority = pd.Series(np.random.default_rng(7).random(len(keys)))
+    rank = priority.groupby(keys.fillna('<NA>')).rank(method='first')
+    np.testing.assert_array_equal(keep, (rank <= kernels).to_numpy())
+    counts = keys[keep].value_counts(dropna=False)
+    pd.testing.assert_series_equal(counts.sort_index(), keys.value_counts(dropna=False).clip(upper=kernels).sort_index())
+
+
+def test_preview_selects_strata(kernel_file):
+    full = get_df(kernel_file)
+    n_iters, n_gpus = full['iteration'].nunique(), full['gpu'].nunique()
+    expected = get_df(kernel_file, iter_idxs=spread(n_iters, 2).tolist(), gpus=spread(n_gpus, 3).tolist())
+    clear_samples()
+    set_preview(Preview(iterations=2, gpus=3))
+    got = get_df(kernel_file)
+    pd.testing.assert_frame_equal(got, expected)
+    assert samples() == [Sample(kernel_file, (2, n_iters), (3, n_gpus))]
+    assert samples()[0].factor == pytest.approx(len(got) / len(full), rel=0.1)
+    # Previews bypass the cache: the full table is still what get_df returns
+    set_preview(None)
+    pd.testing.assert_frame_equal(get_df(kernel_file), full)
+
+
+def test_preview_kernels(kernel_file):
+    full = get_df(kernel_file, iter_idxs=[1], fix_names=True)
+    got = get_df(kernel_file, iter_idxs=[1], fix_names=True, preview=Preview(iterations=None, gpus=None, kernels=5))
+    assert (got['operator-name'].value_counts(dropna=False) <= 5).all()
+    assert got.index.isin(full.index).all()
+    pd.testing.assert_frame_equal(got, full.loc[got.index])
+    (sample,) = samples()
+    assert sample.kernels == (len(got), len(full))
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chopper.common.cache import cache_stats, clear_cache, load_mapped, load_pickle, load_rows, nbytes
+from chopper.common.load import select_iters
+from chopper.common.store import KERNEL_SCHEMA, compact, iter_store, read_store, write_store
+
+
+@pytest.fixture(scope='module')
+def store(kernels, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('store') / 'ts')
+    write_store(kernels, path)
+    return path
+
+
+def test_store_round_trip(store, kernels):
+    pd.testing.assert_frame_equal(read_store(store), compact(kernels))
+
+
+@pytest.mark.parametrize('columns', [None, ['ts', 'operator-name']])
+@pytest.mark.parametrize('gpus', [None, [1, 3]])
+@pytest.mark.parametrize('iter_idxs', [None, [0], [1, -1]])
+def test_read_store_selection(store, kernels, columns, gpus, iter_idxs):
+    expected = compact(kernels)
+    if gpus is not None:
+        expected = expected[expected['gpu'].isin(gpus)]
+    if iter_idxs:
+        expected = select_iters(expected, iter_idxs)
+    if columns is not None:
+        expected = expected[columns]
+    got = read_store(store, columns=columns, gpus=gpus, iter_idxs=iter_idxs)
+    pd.testing.assert_frame_equal(got, expected.reset_index(drop=True))
+
+
+def test_compact_schema(kernels):
+    assert {c: str(t) for c, t in compact(kernels).dtypes.items()} == KERNEL_SCHEMA
+    # Tables from older merges: object strings, float layers and iterations
+    old = kernels.astype({c: object for c in ('name', 'name_cpu_op', 'operator-name')})
+    old = old.astype({'layer': 'float64', 'iteration': 'float64', 'gpu': 'int64'})
+    pd.testing.assert_frame_equal(compact(old), compact(kernels))
+
+
+def test_mapped_store(store):
+    mapped = read_store(store, mmap=True)
+    # Only the category labels are read into memory
+    labels = [mapped[c].cat.categories.array for c in mapped.select_dtypes('category')]
+    assert nbytes(mapped) == sum(nbytes(a) for a in labels)
+    pd.testing.assert_frame_equal(mapped.sort_values('ts', kind='stable', ignore_index=True), read_store(store))
+    pd.testing.assert_frame_equal(load_mapped(store), mapped)
+
+
+def test_load_rows(store):
+    clear_cache()
+    pd.testing.assert_frame_equal(load_pickle(store), read_store(store))
+    pd.testing.assert_frame_equal(load_pickle(store, columns=['ts', 'name']), read_store(store, columns=['ts', 'name']))
+    mapped = load_mapped(store)
+    rows = np.flatnonzero(mapped['gpu'].isin([1, 3]).to_numpy())
+    pd.testing.assert_frame_equal(load_rows(store, rows, ['dur', 'ts']),
+                                  read_store(store, columns=['dur', 'ts'], gpus=[1, 3]))
+    # Only the mapping and the ts order are cached, not the copies
+    assert cache_stats().nbytes == nbytes(mapped) + 8 * len(mapped)
+    clear_cache()
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 100, 1 << 22])
+def test_iter_store_chunks(store, chunk_rows):
+    chunks = list(iter_store(store, gpus=[0, 2], chunk_rows=chunk_rows))
+    assert all(len(chunk) <= chunk_rows for _, chunk in chunks)
+    rows = np.concatenate([rows for rows, _ in chunks])
+    mapped = read_store(store, mmap=True)
+    expected = mapped.iloc[rows].reset_index(drop=True)
+    assert expected['gpu'].isin([0, 2]).all() and len(expected) == mapped['gpu'].isin([0, 2]).sum()
+    pd.testing.assert_frame_equal(pd.concat([c for _, c in chunks], ignore_index=True), expected)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chopper.common.annotations import no_overlap_mask
+from chopper.common.trace_metrics import (
+    derive_call_overhead,
+    derive_launch_overhead,
+    derive_overheads,
+    derive_prep_overhead,
+)
+
+GRP = ['gpu', 'iteration']
+
+
+def shifted(df):
+    """The overhead code derive_overheads replaces: a groupby().shift() per metric."""
+    df = df.sort_values(GRP + ['ts']).reset_index(drop=True)
+    prev_end = df.groupby(GRP)['ts'].shift(1) + df.groupby(GRP)['dur'].shift(1)
+    first = df.groupby(GRP).head(1).index
+    df['Launch Overhead'] = np.maximum(0, df['ts'] - prev_end).astype(float) * 1e-6
+    df.loc[first, 'Launch Overhead'] = 0
+    df['Prep Overhead'] = np.maximum(0, df['ts_cuda_runtime'] - prev_end).astype(float) * 1e-6
+    df.loc[first, 'Prep Overhead'] = 0
+    call = df['ts'] - df['ts_cuda_runtime']
+    df['Call Overhead'] = np.minimum(call, np.maximum(0, df['ts'] - prev_end)).astype(float) * 1e-6
+    df.loc[first, 'Call Overhead'] = call[first].astype(float) * 1e-6
+    return df, first
+
+
+@pytest.fixture
+def compute(kernels):
+    """Compute kernels out of ts order, as the plots pass them, and where each iteration starts."""
+    iter_start = kernels.groupby(GRP)['ts'].min()
+    # Without each layer's first GEMM, iterations start before their first compute kernel
+    keep = no_overlap_mask(kernels) & (kernels['name'] != 'Cijk_gemm_a')
+    return kernels[keep].sample(frac=1, random_state=0), iter_start
+
+
+def test_overheads_match_shift(compute):
+    df, _ = compute
+    expected, _ = shifted(df)
+    got = derive_overheads(df)
+    pd.testing.assert_frame_equal(got, expected)
+    # Kernels before the first iteration have no overhead
+    assert got.loc[got['iteration'].isna(), ['Launch Overhead', 'Call Overhead']].isna().all().all()
+    for derive, metric in [(derive_launch_overhead, 'Launch Overhead'), (derive_prep_overhead, 'Prep Overhead'),
+                           (derive_call_overhead, 'Call Overhead')]:
+        pd.testing.assert_series_equal(derive(df)[metric], expected[metric])
+
+
+def test_iteration_start_correction(compute):
+    df, iter_start = compute
+    expected, first = shifted(df)
+    # The per-row override launch_overhead.get_data used to apply
+    for idx in first:
+        row = expected.loc[idx]
+        gap = max(0, row['ts'] - iter_start.loc[(row['gpu'], row['iteration'])]) * 1e-6
+        expected.loc[idx, 'Launch Overhead'] = gap
+        expected.loc[idx, 'Prep Overhead'] = gap - expected.loc[idx, 'Call Overhead']
+    got = derive_overheads(df, iter_start=iter_start)
+    assert (got.loc[first, 'Launch Overhead'] > 0).any()
+    pd.testing.assert_frame_equal(got, expected)